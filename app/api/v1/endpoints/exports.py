@@ -0,0 +1,160 @@
+import asyncio
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Iterator, List, Optional
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from peewee import Field, ModelSelect
+from app.config import settings
+from app.database import for_read
+from app.models.favorites import Favorite
+from app.models.medicine import Medicine
+from app.models.review import Review
+from app.services.limiter import ConcurrencyLimiter
+
+router = APIRouter()
+
+# Rows are serialized and flushed in batches of this size
+EXPORT_BATCH_SIZE = 500
+
+# Bounds export threads and connections; further exports queue for a slot
+export_limiter = ConcurrencyLimiter("export", settings.EXPORT_MAX_CONCURRENCY)
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+def _ndjson_lines(rows: Iterator[dict]) -> Iterator[str]:
+    batch: List[str] = []
+    for row in rows:
+        batch.append(json.dumps(row, default=str))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+def _csv_lines(rows: Iterator[dict], columns: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+async def _on_one_thread(chunks: Iterator[str]) -> AsyncIterator[str]:
+    """
+    Drive a blocking generator from a single dedicated thread.
+
+    Peewee connections are per thread, so the cursor must be opened, read and
+    closed on the same thread for the whole export. The thread is only created
+    once the export holds an `export_limiter` slot.
+    """
+    async with export_limiter:
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(executor, next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            # Also runs when the client disconnects mid-export
+            await loop.run_in_executor(executor, chunks.close)
+            executor.shutdown(wait=False)
+
+
+def _stream(query: ModelSelect, fields: List[Field], export_format: ExportFormat, name: str) -> StreamingResponse:
+    """
+    Stream a query as NDJSON or CSV.
+
+    `.iterator()` keeps a server-side cursor, so only the current batch is held
+    in memory, and the first rows are sent before the query finishes.
+    """
+    columns = [field.name for field in fields]
+    query = for_read(query.select(*fields))
+
+    def rows() -> Iterator[dict]:
+        database = query._database
+        with database.connection_context():
+            yield from query.dicts().iterator()
+
+    if export_format == ExportFormat.csv:
+        content, media_type = _csv_lines(rows(), columns), "text/csv"
+    else:
+        content, media_type = _ndjson_lines(rows()), "application/x-ndjson"
+    return StreamingResponse(
+        _on_one_thread(content),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format.value}"'}
+    )
+
+
+def _time_range(query: ModelSelect, field: Field, after: Optional[datetime], before: Optional[datetime]) -> ModelSelect:
+    if after is not None:
+        query = query.where(field >= after)
+    if before is not None:
+        query = query.where(field < before)
+    return query
+
+
+@router.get("/reviews")
+async def export_reviews(
+    format: ExportFormat = ExportFormat.ndjson,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    medicine_id: Optional[int] = None,
+    user_id: Optional[int] = None
+):
+    query = _time_range(Review.select(), Review.created_at, created_after, created_before)
+    if medicine_id is not None:
+        query = query.where(Review.medicine == medicine_id)
+    if user_id is not None:
+        query = query.where(Review.user == user_id)
+    fields = [Review.id, Review.user, Review.medicine, Review.rating, Review.comment,
+              Review.sentiment_score, Review.created_at]
+    return _stream(query.order_by(Review.id), fields, format, "reviews")
+
+
+@router.get("/medicines")
+async def export_medicines(
+    format: ExportFormat = ExportFormat.ndjson,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+):
+    query = _time_range(Medicine.select(), Medicine.created_at, created_after, created_before)
+    fields = [Medicine.id, Medicine.name, Medicine.description, Medicine.fda_id,
+              Medicine.created_at, Medicine.updated_at]
+    return _stream(query.order_by(Medicine.id), fields, format, "medicines")
+
+
+@router.get("/favorites")
+async def export_favorites(
+    format: ExportFormat = ExportFormat.ndjson,
+    added_after: Optional[datetime] = None,
+    added_before: Optional[datetime] = None,
+    medicine_id: Optional[int] = None,
+    user_id: Optional[int] = None
+):
+    query = _time_range(Favorite.select(), Favorite.added_at, added_after, added_before)
+    if medicine_id is not None:
+        query = query.where(Favorite.medicine == medicine_id)
+    if user_id is not None:
+        query = query.where(Favorite.user == user_id)
+    fields = [Favorite.id, Favorite.user, Favorite.medicine, Favorite.added_at]
+    return _stream(query.order_by(Favorite.id), fields, format, "favorites")
@@ -1,105 +1,161 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Response
+from peewee import IntegrityError, chunked
+from typing import List, Optional
 from app.models.user import User
 from app.models.medicine import Medicine
 from app.models.favorites import Favorite
-from app.schemas.favorites import FavoriteCreate, FavoriteResponse
+from app.schemas.favorites import FavoriteCreate, FavoriteResponse, FavoriteSync, FavoriteSyncResponse
 from app.schemas.medicine import MedicineResponse
+from app.config import settings
+from app.pagination import paginate, set_next_cursor
+from app.db_executor import run_db
+from app.bulk import rows_per_insert
 
 router = APIRouter(
     tags=["favorites"]
 )
 
-@router.post("/users/{user_id}/favorites", response_model=FavoriteResponse)
-async def add_favorite(
-    user_id: int,
-    favorite_data: FavoriteCreate
-):
-    # Retrieve the user using user_id
-    user = User.get_or_none(User.id == user_id)
-    if user is None:
+def _favorite_response(favorite: Favorite) -> FavoriteResponse:
+    # favorite.medicine must already be attached (joined or assigned), never lazy-loaded
+    return FavoriteResponse.model_validate({
+        'id': favorite.id,
+        'user_id': favorite.user_id,
+        'medicine': MedicineResponse.model_validate(favorite.medicine),
+        'added_at': favorite.added_at
+    })
+
+def _require_user(user_id: int) -> None:
+    if not User.select().where(User.id == user_id).exists():
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Check if medicine exists
-    medicine = Medicine.get_or_none(Medicine.id == favorite_data.medicine_id)
+def _require_medicine(medicine_id: int) -> Medicine:
+    medicine = Medicine.get_or_none(Medicine.id == medicine_id)
     if medicine is None:
         raise HTTPException(status_code=404, detail="Medicine not found")
+    return medicine
 
-    # Check if favorite already exists
-    exists = Favorite.select().where(
-        (Favorite.user == user) & (Favorite.medicine == medicine)
-    ).exists()
-    if exists:
-        return {"detail": "Medicine already in favorites"}
+@router.post("/users/{user_id}/favorites", response_model=FavoriteResponse)
+async def add_favorite(
+    user_id: int,
+    favorite_data: FavoriteCreate
+):
+    def add() -> FavoriteResponse:
+        _require_user(user_id)
+        medicine = _require_medicine(favorite_data.medicine_id)
+        # The unique (user, medicine) index rejects duplicates
+        try:
+            favorite = Favorite.create(user=user_id, medicine=medicine)
+        except IntegrityError:
+            raise HTTPException(status_code=400, detail="Medicine already in favorites")
+        return _favorite_response(favorite)
 
-    # Create favorite
-    favorite = Favorite.create(user=user, medicine=medicine)
-    return FavoriteResponse.model_validate({
-        'id': favorite.id,
-        'user_id': favorite.user.id,
-        'medicine': MedicineResponse.model_validate(favorite.medicine),
-        'added_at': favorite.added_at
-    })
+    return await run_db(add)
 
 @router.post("/users/{user_id}/favorites/toggle", response_model=dict)
 async def toggle_favorite(
     user_id: int,
     favorite_data: FavoriteCreate
 ):
-    # Retrieve the user using user_id
-    user = User.get_or_none(User.id == user_id)
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
+    def toggle() -> dict:
+        # Remove the favorite if present; a hit proves both rows exist
+        deleted = Favorite.delete().where(
+            (Favorite.user == user_id) & (Favorite.medicine == favorite_data.medicine_id)
+        ).execute()
+        if deleted:
+            return {"detail": "Favorite removed successfully"}
+        _require_user(user_id)
+        _require_medicine(favorite_data.medicine_id)
+        # Ignored if added concurrently by another request
+        Favorite.insert(user=user_id, medicine=favorite_data.medicine_id).on_conflict_ignore().execute()
+        return {"detail": "Favorite added successfully"}
 
-    # Check if medicine exists
-    medicine = Medicine.get_or_none(Medicine.id == favorite_data.medicine_id)
-    if medicine is None:
-        raise HTTPException(status_code=404, detail="Medicine not found")
+    return await run_db(toggle)
 
-    # Check if favorite already exists
-    favorite = Favorite.get_or_none(
-        (Favorite.user == user) & (Favorite.medicine == medicine)
-    )
-    if favorite:
-        favorite.delete_instance()
-        return {"detail": "Favorite removed successfully"}
-    else:
-        Favorite.create(user=user, medicine=medicine)
-        return {"detail": "Favorite added successfully"}
+@router.post("/users/{user_id}/favorites/sync", response_model=FavoriteSyncResponse)
+async def sync_favorites(
+    user_id: int,
+    sync: FavoriteSync
+):
+    """
+    Apply a batch of favorite additions and removals in one transaction.
+
+    Additions use INSERT OR IGNORE, so re-sending a change that was already
+    applied is harmless; removals are a single DELETE ... IN. Medicine ids that
+    do not exist are skipped and reported back.
+    """
+    add_ids = set(sync.add)
+    remove_ids = set(sync.remove)
+    conflicting = add_ids & remove_ids
+    if conflicting:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Medicine ids both added and removed: {sorted(conflicting)}"
+        )
+
+    def apply() -> dict:
+        with Favorite._meta.database.atomic():
+            _require_user(user_id)
+            known = {
+                medicine_id
+                for (medicine_id,) in Medicine.select(Medicine.id).where(Medicine.id.in_(list(add_ids))).tuples()
+            } if add_ids else set()
+
+            added = 0
+            rows = [{"user": user_id, "medicine": medicine_id} for medicine_id in sorted(known)]
+            for batch in chunked(rows, rows_per_insert(Favorite)):
+                added += Favorite.insert_many(batch).on_conflict_ignore().as_rowcount().execute()
+
+            removed = Favorite.delete().where(
+                (Favorite.user == user_id) & (Favorite.medicine.in_(list(remove_ids)))
+            ).execute() if remove_ids else 0
+
+        return {
+            "added": added,
+            "removed": removed,
+            "unknown_medicine_ids": sorted(add_ids - known)
+        }
+
+    return await run_db(apply)
 
 @router.get("/users/{user_id}/favorites", response_model=List[FavoriteResponse])
-async def get_user_favorites(user_id: int):
-    # Retrieve the user
-    user = User.get_or_none(User.id == user_id)
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
+async def get_user_favorites(
+    user_id: int,
+    response: Response,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    def load_page():
+        _require_user(user_id)
+        # Favorite and medicine columns in one query; the medicine is attached from the join
+        favorites, next_cursor = paginate(
+            Favorite.select(
+                Favorite.id, Favorite.user, Favorite.added_at,
+                Medicine.id, Medicine.name, Medicine.description, Medicine.fda_id
+            ).join(Medicine).where(Favorite.user == user_id),
+            Favorite.id,
+            limit,
+            cursor
+        )
+        return [_favorite_response(fav) for fav in favorites], next_cursor
 
-    favorites = Favorite.select().where(Favorite.user == user).join(Medicine)
-    return [
-        FavoriteResponse.model_validate({
-            'id': fav.id,
-            'user_id': fav.user.id,
-            'medicine': MedicineResponse.model_validate(fav.medicine),
-            'added_at': fav.added_at
-        })
-        for fav in favorites
-    ]
+    favorites, next_cursor = await run_db(load_page)
+    set_next_cursor(response, next_cursor)
+    return favorites
 
 @router.delete("/users/{user_id}/favorites/{medicine_id}", response_model=dict)
 async def remove_favorite(
     user_id: int,
     medicine_id: int
 ):
-    # Retrieve the user
-    user = User.get_or_none(User.id == user_id)
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
+    def remove() -> int:
+        deleted = Favorite.delete().where(
+            (Favorite.user == user_id) & (Favorite.medicine == medicine_id)
+        ).execute()
+        if deleted == 0:
+            _require_user(user_id)
+        return deleted
 
-    # Remove favorite
-    deleted = Favorite.delete().where(
-        (Favorite.user == user) & (Favorite.medicine_id == medicine_id)
-    ).execute()
-    if deleted == 0:
+    if await run_db(remove) == 0:
         raise HTTPException(status_code=404, detail="Favorite not found")
 
-    return {"detail": "Favorite removed successfully"}
\ No newline at end of file
+    return {"detail": "Favorite removed successfully"}
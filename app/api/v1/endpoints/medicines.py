@@ -1,251 +1,514 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from peewee import DoesNotExist
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from peewee import DoesNotExist, IntegrityError, chunked
 from app.models.medicine import Medicine
-from app.models.profile import MedicalData, PersonalProfile
 from app.models.review import Review
 from app.schemas.medicine import (
     MedicineCreate, 
     MedicineResponse, 
     MedicineSearchResponse,
+    MedicineRatingStats,
+    TopRatedMedicine,
+    BatchSearchRequest,
+    BatchSearchResponse,
 )
 from app.models.user import User
 from app.services.gemini_service import GeminiService
 from app.services.openfda_service import OpenFDAService
-from app.utils import convert_to_string
-from typing import List
+from app.services.openfda_cache import OpenFDALabelCache
+from app.services.safety_cache import safety_verdict_cache, profile_fingerprint
+from app.services.gemini_cache import content_hash
+from app.services.single_flight import SingleFlight
+from app.services.brand_resolver import BrandResolver
+from app.services import rating_stats
+from app.services.pipeline import Pipeline, Stage
+from app.services.user_context import UserContext, load_user_context
+from app.services.safety_prescreen import prescreen
+from app.tracing import logger, span
+from app.services.image_ingest import UploadTooLarge, prepare_image, read_upload
+from app.services.prompt_projection import project_label, project_profile, to_prompt_json, record_size
+from app.utils import convert_to_string, normalize_text
+from app.config import settings
+from app.pagination import paginate, set_next_cursor
+from app.db_executor import run_db
+from app.bulk import read_items, validate_items, item_result, summarize, insert_rows
+from app.schemas.bulk import BulkCreateResponse
+from typing import List, Optional, Tuple
+import asyncio
 import json
 
 router = APIRouter()
 gemini_service = GeminiService()
 openfda_service = OpenFDAService()
+openfda_cache = OpenFDALabelCache(openfda_service)
+# Shares user-independent stages between concurrent identical searches
+search_flight = SingleFlight("search")
+brand_resolver = BrandResolver()
+
+async def get_or_create_medicine(medicine_data: dict):
+    return await run_db(
+        Medicine.get_or_create,
+        fda_id=medicine_data['id'],
+        defaults={
+            'name': medicine_data['openfda']['generic_name'][0] if medicine_data['openfda'].get('generic_name') else medicine_data['openfda']['brand_name'][0],
+            'description': medicine_data.get('indications_and_usage', [''])[0]
+        }
+    )
 
 @router.get("/", response_model=List[MedicineResponse])
-async def get_medicines():
-    medicines = list(Medicine.select().dicts())
+async def get_medicines(
+    response: Response,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    medicines, next_cursor = await run_db(paginate, Medicine.select().dicts(), Medicine.id, limit, cursor)
+    set_next_cursor(response, next_cursor)
     return medicines
 
+@router.get("/top-rated", response_model=List[TopRatedMedicine])
+async def get_top_rated_medicines(
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    min_reviews: int = Query(1, ge=1)
+):
+    return await run_db(rating_stats.top_rated, limit, min_reviews)
+
+@router.get("/{medicine_id}/stats", response_model=MedicineRatingStats)
+async def get_medicine_stats(medicine_id: int):
+    def load():
+        if not Medicine.select().where(Medicine.id == medicine_id).exists():
+            raise HTTPException(status_code=404, detail="Medicine not found")
+        return rating_stats.get_stats(medicine_id)
+
+    return await run_db(load)
+
 @router.get("/{medicine_id}", response_model=MedicineResponse)
 async def get_medicine(medicine_id: int):
     try:
-        medicine = Medicine.get_by_id(medicine_id)
+        medicine = await run_db(Medicine.get_by_id, medicine_id)
         return medicine.__data__
     except DoesNotExist:
         raise HTTPException(status_code=404, detail="Medicine not found")
 
 @router.post("/", response_model=MedicineResponse)
 async def create_medicine(medicine_data: MedicineCreate):
-    return Medicine.create(
-        name=medicine_data.name,
-        description=medicine_data.description,
-        fda_id=medicine_data.fda_id
-    ).__data__
+    try:
+        medicine = await run_db(
+            Medicine.create,
+            name=medicine_data.name,
+            description=medicine_data.description,
+            fda_id=medicine_data.fda_id
+        )
+        return medicine.__data__
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="Medicine with this FDA id already exists")
 
-@router.post("/{user_id}/search/image", response_model=MedicineSearchResponse)
-async def search_by_image(user_id: int, file: UploadFile = File(...)):
+def _bulk_create_medicines(valid: list, results: dict) -> None:
+    seen = set()
+    for chunk in chunked(valid, settings.BULK_INSERT_CHUNK_SIZE):
+        # IMMEDIATE takes the write lock up front, so the duplicate check cannot race an insert
+        with Medicine._meta.database.atomic("IMMEDIATE"):
+            fda_ids = list({item.fda_id for _, item in chunk if item.fda_id})
+            existing = dict(
+                Medicine.select(Medicine.fda_id, Medicine.id).where(Medicine.fda_id.in_(fda_ids)).tuples()
+            ) if fda_ids else {}
+
+            rows, indexes = [], []
+            for index, item in chunk:
+                if item.fda_id and (item.fda_id in existing or item.fda_id in seen):
+                    results[index] = item_result(
+                        index, "duplicate", id=existing.get(item.fda_id),
+                        detail="Medicine with this FDA id already exists"
+                    )
+                    continue
+                if item.fda_id:
+                    seen.add(item.fda_id)
+                rows.append({"name": item.name, "description": item.description, "fda_id": item.fda_id})
+                indexes.append(index)
+            if not rows:
+                continue
+            for index, medicine_id in zip(indexes, insert_rows(Medicine, rows)):
+                results[index] = item_result(index, "created", id=medicine_id)
+
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def bulk_create_medicines(request: Request):
     """
-    Search for medicine information using an uploaded image of the medicine label/packaging.
+    Create many medicines from a JSON array or NDJSON body of MedicineCreate objects.
+
+    Returns one result per item, in input order: created (with its id), duplicate
+    (FDA id already present, in the database or earlier in the batch) or invalid.
     """
+    items = await read_items(request)
+    valid, results = validate_items(items, MedicineCreate)
+    await run_db(_bulk_create_medicines, valid, results)
+    return summarize(results, len(items))
+
+async def _load_context(user_id: int) -> UserContext:
     try:
-        print(f"[DEBUG] Starting image search for user_id: {user_id}")
-        
-        # Validate file type
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="File must be an image")
-        
-        # Get user profile and medical data
-        try:
-            user = User.get_by_id(user_id)
-            print(f"[DEBUG] Found user: {user.__data__}")
-        except DoesNotExist:
-            print("[DEBUG] Failed to find user")
-            raise HTTPException(status_code=404, detail="User not found")
-            
-        try:
-            profile = PersonalProfile.get(PersonalProfile.user == user)
-            print(f"[DEBUG] Found profile: {profile.__data__}")
-        except DoesNotExist:
-            print("[DEBUG] Failed to find profile")
-            profile = None
-            
-        try:
-            medical_data = MedicalData.get(MedicalData.profile == profile)
-            print(f"[DEBUG] Found medical data: {medical_data.__data__}")
-        except DoesNotExist:
-            print("[DEBUG] Failed to find medical data")
-            medical_data = None
+        context = await run_db(load_user_context, user_id)
+    except DoesNotExist:
+        logger.debug("User %s not found", user_id)
+        raise HTTPException(status_code=404, detail="User not found")
+    logger.debug(
+        "Loaded user %s (profile: %s, medical data: %s)",
+        user_id, context.profile is not None, context.medical_data is not None
+    )
+    return context
+
+async def _extract(extract_label) -> str:
+    return await extract_label()
+
+async def _fetch_label(label: str) -> dict:
+    medicine_data = await search_flight.do(
+        ("fda_label", normalize_text(label)),
+        lambda: openfda_cache.find_medicine_by_label(label)
+    )
+    if not medicine_data:
+        logger.debug("No FDA label for %r", label)
+        raise HTTPException(status_code=404, detail="Medicine not found in FDA database")
+    logger.debug("FDA label %s for %r", medicine_data.get("id"), label)
+    brand_resolver.add_label(medicine_data)
+    return medicine_data
+
+def _profile_prompt(profile, medical_data) -> str:
+    # Legacy form: every column of both rows, ids and timestamps included
+    raw = json.dumps({
+        "profile": convert_to_string(profile) if profile else "No profile data",
+        "medical": convert_to_string(medical_data) if medical_data else "No medical data"
+    })
+    if not settings.PROMPT_PROJECTION_ENABLED:
+        return raw
+    compact = to_prompt_json(project_profile(profile, medical_data))
+    record_size("profile", raw, compact)
+    return compact
 
-        # Extract medicine label from image using Gemini
+def _medicine_prompt(medicine_data: dict) -> str:
+    raw = json.dumps(medicine_data)
+    if not settings.PROMPT_PROJECTION_ENABLED:
+        return raw
+    compact = to_prompt_json(project_label(medicine_data))
+    record_size("medicine", raw, compact)
+    return compact
+
+def _build_prompt(context: UserContext, medicine_data: dict) -> Tuple[str, str]:
+    """Compact (medicine, profile) documents for the safety prompt."""
+    medicine_str = _medicine_prompt(medicine_data)
+    profile_data = _profile_prompt(context.profile, context.medical_data)
+    logger.debug("Safety prompt: %d chars of label, %d chars of profile", len(medicine_str), len(profile_data))
+    return medicine_str, profile_data
+
+async def _check_safety(context: UserContext, medicine_data: dict) -> dict:
+    user, profile, medical_data = context
+
+    # Check if medicine is safe for user, reusing a cached verdict for this label and profile
+    fingerprint = profile_fingerprint(profile, medical_data)
+    safety_result = safety_verdict_cache.get(user.id, medicine_data, fingerprint)
+    if safety_result is None:
+        # Clear-cut cases are settled by local rules, the rest by Gemini
+        safety_result = prescreen(medicine_data, profile, medical_data) if settings.SAFETY_PRESCREEN_ENABLED else None
+        if safety_result is None:
+            # Only built (and its size recorded) for prompts that are actually sent
+            with span("prompt"):
+                medicine_str, profile_data = _build_prompt(context, medicine_data)
+            safety_result = await gemini_service.filter_by_profile_async(medicine_str, profile_data)
+        safety_verdict_cache.set(user.id, medicine_data, fingerprint, safety_result)
+    logger.debug("Safety verdict for user %s: can_take=%s", user.id, safety_result.get("can_take"))
+    return safety_result
+
+async def _upsert_medicine(medicine_data: dict) -> Medicine:
+    try:
+        medicine, created = await search_flight.do(
+            ("medicine_upsert", medicine_data['id']),
+            lambda: get_or_create_medicine(medicine_data)
+        )
+    except Exception as e:
+        logger.warning("Error creating/retrieving medicine: %s", e)
+        raise HTTPException(status_code=500, detail="Error processing medicine data")
+    logger.debug("Medicine %s %s", medicine.id, "created" if created else "retrieved")
+    return medicine
+
+async def _load_reviews(medicine: Medicine) -> list:
+    try:
+        reviews = await run_db(list, medicine.reviews.select(
+            Review, User
+        ).join(
+            User
+        ).order_by(
+            Review.created_at.desc()
+        ).dicts())
+    except Exception as e:
+        logger.warning("Error loading reviews: %s", e)
+        raise HTTPException(status_code=500, detail="Error processing medicine data")
+    logger.debug("Found %d reviews", len(reviews))
+    return reviews
+
+# Shared by the text and image searches, which differ only in how the label is extracted.
+# Label extraction and the FDA lookup overlap the user/profile/medical-data query;
+# only the safety check needs the user context. The medicine upsert and review
+# load overlap the safety check.
+search_pipeline = Pipeline("search", inputs=("user_id", "extract_label"), stages=[
+    Stage("context", _load_context, requires=("user_id",)),
+    Stage("label", _extract, requires=("extract_label",)),
+    Stage("medicine_data", _fetch_label, requires=("label",)),
+    Stage("safety", _check_safety, requires=("context", "medicine_data")),
+    Stage("medicine", _upsert_medicine, requires=("medicine_data",)),
+    Stage("reviews", _load_reviews, requires=("medicine",)),
+])
+
+async def run_search(user_id: int, extract_label) -> dict:
+    try:
+        results = await search_pipeline.run(user_id=user_id, extract_label=extract_label)
+    except HTTPException as e:
+        logger.debug("Search failed: %s", e)
+        raise e
+    with span("serialize"):
+        return {
+            "medicine": {
+                **results["medicine"].__data__,
+                "reviews": results["reviews"]
+            },
+            "safety": results["safety"],
+            "fda_data": results["medicine_data"]
+        }
+
+def _image_label_extractor(contents: bytes):
+    # Extract medicine label from image using Gemini
+    async def extract_label() -> str:
         try:
-            contents = await file.read()
-            label = gemini_service.extract_label_from_image(contents)
-            print(f"[DEBUG] Extracted label from image: {label}")
+            label = await search_flight.do(
+                ("image_label", content_hash(contents)),
+                lambda: gemini_service.extract_label_from_image_async(contents)
+            )
         except ValueError as e:
-            print(f"[DEBUG] Failed to extract medicine name: {str(e)}")
+            logger.debug("Failed to extract medicine name: %s", e)
             raise HTTPException(
                 status_code=400, 
                 detail=f"Could not extract medicine name from image: {str(e)}"
             )
+        logger.debug("Extracted label from image: %r", label)
+        return label
+    return extract_label
 
-        # Get medicine data from OpenFDA
-        medicine_data = openfda_service.find_medicine_by_label(label)
-        print(f"[DEBUG] OpenFDA medicine data: {medicine_data}")
-        if not medicine_data:
-            print("[DEBUG] Failed to find medicine in FDA database")
-            raise HTTPException(status_code=404, detail="Medicine not found in FDA database")
-
-        # Convert profile and medical data to strings
-        profile_str = convert_to_string(profile) if profile else "No profile data"
-        medical_str = convert_to_string(medical_data) if medical_data else "No medical data"
-        profile_data = json.dumps({
-            "profile": profile_str,
-            "medical": medical_str
-        })
-        print(f"[DEBUG] Converted profile data: {profile_data}")
-
-        # Convert medicine data to string
-        medicine_str = json.dumps(medicine_data)
-        print(f"[DEBUG] Converted medicine data: {medicine_str}")
-
-        # Check if medicine is safe for user
-        safety_result = gemini_service.filter_by_profile(medicine_str, profile_data)
-        print(f"[DEBUG] Safety check result: {safety_result}")
-        
-        # Get or create medicine record
+def _text_label_extractor(query: str):
+    # Resolve brand names locally, only asking Gemini when the resolver is not confident
+    async def extract_label() -> str:
         try:
-            medicine, created = Medicine.get_or_create(
-                fda_id=medicine_data['id'],
-                defaults={
-                    'name': medicine_data['openfda']['generic_name'][0] if medicine_data['openfda'].get('generic_name') else medicine_data['openfda']['brand_name'][0],
-                    'description': medicine_data.get('indications_and_usage', [''])[0]
-                }
+            label = brand_resolver.resolve(query) if settings.BRAND_RESOLVER_ENABLED else None
+            if label is None:
+                label = await search_flight.do(
+                    ("text_label", normalize_text(query)),
+                    lambda: gemini_service.extract_label_async(query)
+                )
+        except ValueError as e:
+            logger.debug("Failed to extract medicine name: %s", e)
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Could not extract medicine name: {str(e)}"
             )
-            print(f"[DEBUG] Medicine {'created' if created else 'retrieved'}: {medicine.__data__}")
-
-            # Get associated reviews
-            reviews = list(medicine.reviews.select(
-                Review, User
-            ).join(
-                User
-            ).order_by(
-                Review.created_at.desc()
-            ).dicts())
-            
-            print(f"[DEBUG] Found {len(reviews)} reviews")
-
-            return {
-                "medicine": {
-                    **medicine.__data__,
-                    "reviews": reviews
-                },
-                "safety": safety_result,
-                "fda_data": medicine_data
-            }
+        logger.debug("Extracted label: %r", label)
+        return label
+    return extract_label
 
-        except Exception as e:
-            print(f"[DEBUG] Error creating/retrieving medicine: {str(e)}")
-            raise HTTPException(status_code=500, detail="Error processing medicine data")
+async def _read_image(file: UploadFile) -> bytes:
+    # Validate file type
+    if not file.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    try:
+        source = read_upload(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        # Decoding and resizing are CPU-bound; keep them off the event loop
+        loop = asyncio.get_running_loop()
+        with span("image_ingest"):
+            return await loop.run_in_executor(None, prepare_image, source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _sse(event: str, data) -> str:
+    with span("serialize", event=event):
+        return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
 
+async def stream_search(user_id: int, extract_label) -> StreamingResponse:
+    """
+    Server-Sent Events variant of run_search.
+
+    Emits `label`, `fda`, `medicine` (with reviews) and `safety` events as the
+    stages finish, then `done`; a failure after the stream started is sent as
+    an `error` event carrying the status code and detail.
+    """
+    events = search_pipeline.stream(user_id=user_id, extract_label=extract_label)
+    # Waiting for the user context before responding keeps a plain 404 for
+    # unknown users; stages that finished first are replayed in the body
+    finished = []
+    failure = None
+    try:
+        async for name, result in events:
+            finished.append((name, result))
+            if name == "context":
+                break
     except HTTPException as e:
-        print(f"[DEBUG] HTTPException occurred: {str(e)}")
-        raise e
+        logger.debug("Search failed: %s", e)
+        # A stage failed before the context arrived: still 404 for unknown users
+        await _load_context(user_id)
+        failure = e
+
+    async def replay_then_rest():
+        for item in finished:
+            yield item
+        if failure is not None:
+            raise failure
+        async for item in events:
+            yield item
+
+    async def body():
+        results = {}
+        try:
+            async for name, result in replay_then_rest():
+                results[name] = result
+                if name == "label":
+                    yield _sse("label", {"label": result})
+                elif name == "medicine_data":
+                    yield _sse("fda", result)
+                elif name == "reviews":
+                    yield _sse("medicine", {**results["medicine"].__data__, "reviews": result})
+                elif name == "safety":
+                    yield _sse("safety", result)
+        except HTTPException as e:
+            logger.debug("Search failed: %s", e)
+            yield _sse("error", {"status_code": e.status_code, "detail": e.detail})
+            return
+        except Exception as e:
+            logger.exception("Search stream failed")
+            yield _sse("error", {"status_code": 500, "detail": "Error processing search"})
+            return
+        finally:
+            await events.aclose()
+        yield _sse("done", {})
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/{user_id}/search/image", response_model=MedicineSearchResponse)
+async def search_by_image(user_id: int, file: UploadFile = File(...)):
+    """
+    Search for medicine information using an uploaded image of the medicine label/packaging.
+    """
+    logger.debug("Starting image search for user_id: %s", user_id)
+    contents = await _read_image(file)
+    return await run_search(user_id, _image_label_extractor(contents))
+
+@router.post("/{user_id}/search/image/stream")
+async def search_by_image_stream(user_id: int, file: UploadFile = File(...)):
+    """Streaming (text/event-stream) variant of search_by_image."""
+    logger.debug("Starting streamed image search for user_id: %s", user_id)
+    contents = await _read_image(file)
+    return await stream_search(user_id, _image_label_extractor(contents))
 
 @router.post("/{user_id}/search/{query}", response_model=MedicineSearchResponse)
 async def display_list(query: str, user_id: int):
-    try:
-        print(f"[DEBUG] Starting search for query: {query}, user_id: {user_id}")
-        
-        # Get user profile and medical data
-        try:
-            user = User.get_by_id(user_id)
-            print(f"[DEBUG] Found user: {user.__data__}")
-        except DoesNotExist:
-            print("[DEBUG] Failed to find user")
-            raise HTTPException(status_code=404, detail="User not found")
-            
-        try:
-            profile = PersonalProfile.get(PersonalProfile.user == user)
-            print(f"[DEBUG] Found profile: {profile.__data__}")
-        except DoesNotExist:
-            print("[DEBUG] Failed to find profile")
-            profile = None
-            
-        try:
-            medical_data = MedicalData.get(MedicalData.profile == profile)
-            print(f"[DEBUG] Found medical data: {medical_data.__data__}")
-        except DoesNotExist:
-            print("[DEBUG] Failed to find medical data")
-            medical_data = None
+    logger.debug("Starting search for query: %r, user_id: %s", query, user_id)
+    return await run_search(user_id, _text_label_extractor(query))
 
-        # Extract medicine label using Gemini
+@router.post("/{user_id}/search/{query}/stream")
+async def display_list_stream(query: str, user_id: int):
+    """Streaming (text/event-stream) variant of display_list."""
+    logger.debug("Starting streamed search for query: %r, user_id: %s", query, user_id)
+    return await stream_search(user_id, _text_label_extractor(query))
+
+async def _extract_labels(queries: List[str]) -> List[Optional[str]]:
+    """Resolve what the brand resolver can, then extract the rest with one Gemini call."""
+    labels = [
+        brand_resolver.resolve(query) if settings.BRAND_RESOLVER_ENABLED else None
+        for query in queries
+    ]
+    pending = [index for index, label in enumerate(labels) if label is None]
+    if pending:
         try:
-            label = gemini_service.extract_label(query)
-            print(f"[DEBUG] Extracted label from Gemini: {label}")
+            extracted = await gemini_service.extract_labels_async([queries[index] for index in pending])
         except ValueError as e:
-            print(f"[DEBUG] Failed to extract medicine name: {str(e)}")
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Could not extract medicine name: {str(e)}"
-            )
+            logger.warning("Failed to extract medicine names: %s", e)
+            raise HTTPException(status_code=502, detail=f"Could not extract medicine names: {str(e)}")
+        for index, label in zip(pending, extracted):
+            labels[index] = label
+    return labels
 
-        # Get medicine data from OpenFDA
-        medicine_data = openfda_service.find_medicine_by_label(label)
-        print(f"[DEBUG] OpenFDA medicine data: {medicine_data}")
-        if not medicine_data:
-            print("[DEBUG] Failed to find medicine in FDA database")
-            raise HTTPException(status_code=404, detail="Medicine not found in FDA database")
-
-        # Convert profile and medical data to strings
-        profile_str = convert_to_string(profile) if profile else "No profile data"
-        medical_str = convert_to_string(medical_data) if medical_data else "No medical data"
-        profile_data = json.dumps({
-            "profile": profile_str,
-            "medical": medical_str
-        })
-        print(f"[DEBUG] Converted profile data: {profile_data}")
-
-        # Convert medicine data to string
-        medicine_str = json.dumps(medicine_data)
-        print(f"[DEBUG] Converted medicine data: {medicine_str}")
-
-        # Check if medicine is safe for user
-        safety_result = gemini_service.filter_by_profile(medicine_str, profile_data)
-        print(f"[DEBUG] Safety check result: {safety_result}")
-        
-        # Get or create medicine record
-        try:
-            medicine, created = Medicine.get_or_create(
-                fda_id=medicine_data['id'],
-                defaults={
-                    'name': medicine_data['openfda']['generic_name'][0] if medicine_data['openfda'].get('generic_name') else medicine_data['openfda']['brand_name'][0],
-                    'description': medicine_data.get('indications_and_usage', [''])[0]
-                }
-            )
-            print(f"[DEBUG] Medicine {'created' if created else 'retrieved'}: {medicine.__data__}")
-
-            # Get associated reviews
-            reviews = list(medicine.reviews.select(
-                Review, User
-            ).join(
-                User
-            ).order_by(
-                Review.created_at.desc()
-            ).dicts())
-            
-            print(f"[DEBUG] Found {len(reviews)} reviews")
-
-            return {
-                "medicine": {
-                    **medicine.__data__,
-                    "reviews": reviews
-                },
-                "safety": safety_result,
-                "fda_data": medicine_data
-            }
+async def _check_safety_batch(context: UserContext, medicines_data: List[dict]) -> List[dict]:
+    """Safety verdicts for several labels: cached and clear-cut ones settled locally, the rest in one model call."""
+    user, profile, medical_data = context
+    fingerprint = profile_fingerprint(profile, medical_data)
+    verdicts = [safety_verdict_cache.get(user.id, data, fingerprint) for data in medicines_data]
+    if settings.SAFETY_PRESCREEN_ENABLED:
+        for index, data in enumerate(medicines_data):
+            if verdicts[index] is None:
+                verdicts[index] = prescreen(data, profile, medical_data)
+                if verdicts[index] is not None:
+                    safety_verdict_cache.set(user.id, data, fingerprint, verdicts[index])
+    pending = [index for index, verdict in enumerate(verdicts) if verdict is None]
+    if pending:
+        results = await gemini_service.filter_by_profile_batch_async(
+            [_medicine_prompt(medicines_data[index]) for index in pending],
+            _profile_prompt(profile, medical_data)
+        )
+        for index, verdict in zip(pending, results):
+            safety_verdict_cache.set(user.id, medicines_data[index], fingerprint, verdict)
+            verdicts[index] = verdict
+    return verdicts
 
-        except Exception as e:
-            print(f"[DEBUG] Error creating/retrieving medicine: {str(e)}")
-            raise HTTPException(status_code=500, detail="Error processing medicine data")
+async def _medicine_with_reviews(medicine_data: dict) -> dict:
+    medicine = await _upsert_medicine(medicine_data)
+    return {**medicine.__data__, "reviews": await _load_reviews(medicine)}
 
-    except HTTPException as e:
-        print(f"[DEBUG] HTTPException occurred: {str(e)}")
-        raise e
+@router.post("/{user_id}/batch-search", response_model=BatchSearchResponse)
+async def batch_search(user_id: int, request: BatchSearchRequest):
+    """
+    Search several medicines for one user.
+
+    Costs about three upstream round trips regardless of list length: one Gemini
+    extraction for every query, concurrent FDA lookups, and one Gemini safety
+    check for every label found. Each query gets its own result entry.
+    """
+    queries = request.queries
+    context = await _load_context(user_id)
+    labels = await _extract_labels(queries)
+
+    # FDA lookups for distinct labels run concurrently
+    unique_labels = list({normalize_text(label): label for label in labels if label}.values())
+    found = await asyncio.gather(*[
+        search_flight.do(
+            ("fda_label", normalize_text(label)),
+            lambda label=label: openfda_cache.find_medicine_by_label(label)
+        )
+        for label in unique_labels
+    ])
+    fda_by_label = {normalize_text(label): data for label, data in zip(unique_labels, found) if data}
+    for data in fda_by_label.values():
+        brand_resolver.add_label(data)
+
+    # Distinct labels found, by FDA id: medicine rows and safety verdicts overlap
+    medicines_data = list({data["id"]: data for data in fda_by_label.values()}.values())
+    verdicts, medicines = await asyncio.gather(
+        _check_safety_batch(context, medicines_data),
+        asyncio.gather(*[_medicine_with_reviews(data) for data in medicines_data])
+    )
+    by_fda_id = {
+        data["id"]: (medicine, verdict)
+        for data, medicine, verdict in zip(medicines_data, medicines, verdicts)
+    }
+
+    results = []
+    for query, label in zip(queries, labels):
+        if not label:
+            results.append({"query": query, "status": "not_extracted", "detail": "Could not extract medicine name"})
+            continue
+        data = fda_by_label.get(normalize_text(label))
+        if data is None:
+            results.append({"query": query, "status": "not_found", "label": label,
+                            "detail": "Medicine not found in FDA database"})
+            continue
+        medicine, verdict = by_fda_id[data["id"]]
+        results.append({"query": query, "status": "ok", "label": label, "medicine": medicine, "safety": verdict})
+    return {"results": results}
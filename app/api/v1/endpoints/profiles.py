@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from peewee import DoesNotExist
+from peewee import DoesNotExist, IntegrityError
 from datetime import datetime
 from app.models.profile import PersonalProfile, MedicalData
 from app.models.user import User
@@ -9,6 +9,8 @@ from app.schemas.profile import (
     MedicalDataCreate,
     MedicalDataResponse
 )
+from app.services.safety_cache import safety_verdict_cache
+from app.db_executor import run_db
 
 router = APIRouter()
 
@@ -17,24 +19,24 @@ async def create_profile(user_id: int, profile_data: PersonalProfileCreate):
     try:
         # Validate user exists
         try:
-            User.get_by_id(user_id)
+            await run_db(User.get_by_id, user_id)
         except DoesNotExist:
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Check for existing profile
-        if PersonalProfile.select().where(PersonalProfile.user_id == user_id).exists():
+        # Create profile; the unique index on user_id rejects a second profile
+        try:
+            profile = await run_db(
+                PersonalProfile.create,
+                user_id=user_id,
+                **profile_data.model_dump(),
+                created_at=datetime.now(),
+                updated_at=datetime.now()
+            )
+        except IntegrityError:
             raise HTTPException(status_code=400, detail="Profile already exists for this user")
 
-        # Create profile
-        profile = PersonalProfile.create(
-            user_id=user_id,
-            **profile_data.model_dump(),
-            created_at=datetime.now(),
-            updated_at=datetime.now()
-        )
-
         # Initialize empty medical data
-        MedicalData.create(profile=profile)
+        await run_db(MedicalData.create, profile=profile)
         
         return profile
     except HTTPException as e:
@@ -44,7 +46,7 @@ async def create_profile(user_id: int, profile_data: PersonalProfileCreate):
 async def update_profile(profile_id: int, profile_data: PersonalProfileCreate):
     # First check if profile exists
     try:
-        profile = PersonalProfile.get_by_id(profile_id)
+        profile = await run_db(PersonalProfile.get_by_id, profile_id)
     except DoesNotExist:
         raise HTTPException(status_code=404, detail="Profile not found")
 
@@ -54,7 +56,8 @@ async def update_profile(profile_id: int, profile_data: PersonalProfileCreate):
             setattr(profile, field, value)
         
         profile.updated_at = datetime.now()
-        profile.save()
+        await run_db(profile.save)
+        safety_verdict_cache.invalidate_user(profile.user_id)
         
         return profile
     except HTTPException as e:
@@ -64,7 +67,7 @@ async def update_profile(profile_id: int, profile_data: PersonalProfileCreate):
 async def update_medical_data(profile_id: int, medical_data: MedicalDataCreate):
     # First check if medical data exists
     try:
-        data = MedicalData.get(MedicalData.profile_id == profile_id)
+        data = await run_db(MedicalData.get, MedicalData.profile_id == profile_id)
     except DoesNotExist:
         raise HTTPException(status_code=404, detail="Medical data not found")
 
@@ -74,7 +77,11 @@ async def update_medical_data(profile_id: int, medical_data: MedicalDataCreate):
             setattr(data, field, value)
         
         data.updated_at = datetime.now()
-        data.save()
+        def save() -> int:
+            data.save()
+            return data.profile.user_id
+
+        safety_verdict_cache.invalidate_user(await run_db(save))
         
         return data
     except HTTPException as e:
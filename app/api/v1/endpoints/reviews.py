@@ -1,61 +1,158 @@
 from datetime import datetime
-from fastapi import APIRouter, HTTPException
-from peewee import DoesNotExist
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from peewee import DoesNotExist, IntegrityError, chunked
 from app.models.review import Review
-from app.schemas.review import ReviewCreate, ReviewResponse
+from app.schemas.review import ReviewCreate, ReviewBulkCreate, ReviewResponse
+from app.schemas.bulk import BulkCreateResponse
 from app.models.user import User
 from app.models.medicine import Medicine
+from app.config import settings
+from app.pagination import paginate, set_next_cursor
+from app.db_executor import run_db
+from app.bulk import read_items, validate_items, item_result, summarize, insert_rows
+from app.services import rating_stats
+from typing import Optional
 
 router = APIRouter()
 
+def _create_review(user: User, medicine: Medicine, review_data: ReviewCreate) -> Review:
+    # The review and its medicine's rating aggregate commit together
+    with Review._meta.database.atomic():
+        review = Review.create(
+            user=user,
+            medicine=medicine,
+            rating=review_data.rating,
+            comment=review_data.comment,
+            sentiment_score=review_data.sentiment_score,
+        )
+        rating_stats.record_review(medicine.id, review.rating, review.sentiment_score)
+    return review
+
 @router.get("/")
-async def get_reviews():
-    reviews = list(Review.select().dicts())
+async def get_reviews(
+    response: Response,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    reviews, next_cursor = await run_db(paginate, Review.select().dicts(), Review.id, limit, cursor)
+    set_next_cursor(response, next_cursor)
     return reviews
 
 @router.get("/{review_id}")
 async def get_review(review_id: int):
     try:
-        review = Review.get_by_id(review_id)
+        review = await run_db(Review.get_by_id, review_id)
         return review.__data__
     except DoesNotExist:
         raise HTTPException(status_code=404, detail="Review not found")
 
 @router.get("/medicine/{medicine_id}")
-async def get_reviews_by_medicine(medicine_id: int):
-    if not Medicine.select().where(Medicine.id == medicine_id).exists():
+async def get_reviews_by_medicine(
+    medicine_id: int,
+    response: Response,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    if not await run_db(Medicine.select().where(Medicine.id == medicine_id).exists):
         raise HTTPException(status_code=404, detail="Medicine not found")
-    reviews = list(Review.select().where(Review.medicine == medicine_id).dicts())
+    reviews, next_cursor = await run_db(
+        paginate,
+        Review.select().where(Review.medicine == medicine_id).dicts(),
+        Review.id,
+        limit,
+        cursor
+    )
+    set_next_cursor(response, next_cursor)
     return reviews
 
 @router.get("/user/{user_id}")
-async def get_reviews_by_user(user_id: int):
-    if not User.select().where(User.id == user_id).exists():
+async def get_reviews_by_user(
+    user_id: int,
+    response: Response,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    if not await run_db(User.select().where(User.id == user_id).exists):
         raise HTTPException(status_code=404, detail="User not found")
-    reviews = list(Review.select().where(Review.user == user_id).dicts())
+    reviews, next_cursor = await run_db(
+        paginate,
+        Review.select().where(Review.user == user_id).dicts(),
+        Review.id,
+        limit,
+        cursor
+    )
+    set_next_cursor(response, next_cursor)
     return reviews
 
 @router.post("/", response_model=ReviewResponse)
 async def create_review(user_id: int, medicine_id: int, review_data: ReviewCreate):
     try:
-        user = User.get_by_id(user_id)
-        medicine = Medicine.get_by_id(medicine_id)
+        user = await run_db(User.get_by_id, user_id)
+        medicine = await run_db(Medicine.get_by_id, medicine_id)
     except DoesNotExist:
         raise HTTPException(status_code=404, detail="User or Medicine not found")
 
-    if Review.select().where(
-        (Review.user == user_id) & 
-        (Review.medicine == medicine_id)
-    ).exists():
+    try:
+        review = await run_db(_create_review, user, medicine, review_data)
+        return review.__data__
+    except IntegrityError:
         raise HTTPException(
             status_code=400,
             detail="User has already reviewed this medicine"
         )
 
-    return Review.create(
-        user=user,
-        medicine=medicine,
-        rating=review_data.rating,
-        comment=review_data.comment,
-        sentiment_score=review_data.sentiment_score,
-    ).__data__
\ No newline at end of file
+def _bulk_create_reviews(valid: list, results: dict) -> None:
+    seen = set()
+    for chunk in chunked(valid, settings.BULK_INSERT_CHUNK_SIZE):
+        # IMMEDIATE takes the write lock up front, so the duplicate check cannot race an insert
+        with Review._meta.database.atomic("IMMEDIATE"):
+            user_ids = list({item.user_id for _, item in chunk})
+            medicine_ids = list({item.medicine_id for _, item in chunk})
+            users = {row[0] for row in User.select(User.id).where(User.id.in_(user_ids)).tuples()}
+            medicines = {row[0] for row in Medicine.select(Medicine.id).where(Medicine.id.in_(medicine_ids)).tuples()}
+            # One query for every (user, medicine) pair already reviewed in this chunk
+            reviewed = set(
+                Review.select(Review.user, Review.medicine)
+                .where(Review.user.in_(user_ids) & Review.medicine.in_(medicine_ids))
+                .tuples()
+            )
+
+            rows, indexes = [], []
+            for index, item in chunk:
+                pair = (item.user_id, item.medicine_id)
+                if item.user_id not in users or item.medicine_id not in medicines:
+                    results[index] = item_result(index, "not_found", detail="User or Medicine not found")
+                elif pair in reviewed or pair in seen:
+                    results[index] = item_result(index, "duplicate", detail="User has already reviewed this medicine")
+                else:
+                    seen.add(pair)
+                    rows.append({
+                        "user": item.user_id,
+                        "medicine": item.medicine_id,
+                        "rating": item.rating,
+                        "comment": item.comment,
+                        "sentiment_score": item.sentiment_score,
+                    })
+                    indexes.append(index)
+            if not rows:
+                continue
+            review_ids = insert_rows(Review, rows)
+            rating_stats.record_reviews(
+                (row["medicine"], row["rating"], row["sentiment_score"]) for row in rows
+            )
+            for index, review_id in zip(indexes, review_ids):
+                results[index] = item_result(index, "created", id=review_id)
+
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def bulk_create_reviews(request: Request):
+    """
+    Create many reviews from a JSON array or NDJSON body of ReviewCreate objects
+    that also carry `user_id` and `medicine_id`.
+
+    Returns one result per item, in input order: created (with its id), duplicate,
+    not_found or invalid. Rating aggregates are updated in the same transactions.
+    """
+    items = await read_items(request)
+    valid, results = validate_items(items, ReviewBulkCreate)
+    await run_db(_bulk_create_reviews, valid, results)
+    return summarize(results, len(items))
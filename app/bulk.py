@@ -0,0 +1,103 @@
+"""
+Helpers for the bulk create endpoints.
+
+Bodies are either a JSON array or NDJSON (one object per line, sent with an
+`application/x-ndjson` content type). Every item gets a result entry at its
+original index, so one bad row never fails the rest of the batch.
+"""
+import json
+from typing import Any, Dict, List, Tuple, Type
+from fastapi import HTTPException, Request
+from peewee import Model, chunked
+from pydantic import BaseModel, ValidationError
+from app.config import settings
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+# Bound parameters allowed in one statement by SQLite builds before 3.32
+SQLITE_MAX_VARIABLES = 999
+
+
+async def read_items(request: Request) -> List[Any]:
+    """Parse a JSON array or NDJSON request body into raw items."""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        if content_type in NDJSON_TYPES:
+            items = [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+        else:
+            items = json.loads(body or b"[]")
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Malformed request body: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON body")
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.BULK_MAX_ITEMS} items per request"
+        )
+    return items
+
+
+def validate_items(
+    items: List[Any],
+    schema: Type[BaseModel]
+) -> Tuple[List[Tuple[int, BaseModel]], Dict[int, dict]]:
+    """
+    Validate raw items against `schema`.
+
+    Returns:
+        (valid, results): (index, model) pairs that passed, and error results keyed by index.
+    """
+    valid = []
+    results = {}
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            results[index] = item_result(index, "invalid", detail=e.errors(include_url=False, include_context=False))
+    return valid, results
+
+
+def item_result(index: int, status: str, id: int = None, detail: Any = None) -> dict:
+    return {"index": index, "status": status, "id": id, "detail": detail}
+
+
+def summarize(results: Dict[int, dict], count: int) -> dict:
+    """Order results by input index and count the created rows."""
+    ordered = [results[index] for index in range(count)]
+    return {
+        "created": sum(1 for result in ordered if result["status"] == "created"),
+        "results": ordered,
+    }
+
+
+def inserted_ids(last_id: int, count: int) -> List[int]:
+    """
+    Primary keys assigned by a multi-row INSERT, given the cursor's lastrowid.
+
+    SQLite numbers the rows of one INSERT consecutively while the write
+    transaction holds the database lock, so they end at `last_id`.
+    """
+    return list(range(last_id - count + 1, last_id + 1))
+
+
+def rows_per_insert(model: Type[Model]) -> int:
+    """
+    Rows per multi-row INSERT into `model` that stay within SQLITE_MAX_VARIABLES.
+
+    Every column counts, since fields with defaults are bound on each row too.
+    """
+    return max(1, SQLITE_MAX_VARIABLES // len(model._meta.sorted_fields))
+
+
+def insert_rows(model: Type[Model], rows: List[dict]) -> List[int]:
+    """
+    Insert rows in as few statements as the variable limit allows.
+
+    Returns:
+        List[int]: The new primary keys, in row order
+    """
+    ids = []
+    for batch in chunked(rows, rows_per_insert(model)):
+        ids.extend(inserted_ids(model.insert_many(batch).execute(), len(batch)))
+    return ids
@@ -0,0 +1,35 @@
+"""
+Import OpenFDA drug label bulk files into the local label store.
+
+Usage:
+    python -m app.commands.import_fda_labels drug-label-0001-of-0013.json.zip [...]
+
+Download the archives from https://open.fda.gov/data/downloads/ first. Re-running
+with the same or newer files only replaces labels whose `version` increased.
+"""
+import argparse
+from pathlib import Path
+from app.database import db
+from app.models.fda_label import FDALabel, FDALabelName
+from app.services.fda_label_store import LocalLabelStore
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Import OpenFDA drug label bulk files")
+    parser.add_argument("paths", nargs="+", type=Path, help=".json or .json.zip bulk files")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Records per insert transaction")
+    args = parser.parse_args(argv)
+
+    db.connect(reuse_if_open=True)
+    db.create_tables([FDALabel, FDALabelName])
+    try:
+        store = LocalLabelStore(chunk_size=args.chunk_size)
+        for path in args.paths:
+            stats = store.import_files([path])
+            print(f"{path}: {stats['inserted']} inserted, {stats['updated']} updated, {stats['skipped']} skipped")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Recompute the per-medicine rating aggregates from the reviews table.
+
+Usage:
+    python -m app.commands.rebuild_rating_stats
+
+Reviews keep the aggregates current as they are written; run this after editing
+reviews directly in the database or to repair drift.
+"""
+import argparse
+from app.database import db
+from app.models.medicine_rating import MedicineRating
+from app.services import rating_stats
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Rebuild per-medicine rating aggregates")
+    parser.parse_args(argv)
+
+    db.connect(reuse_if_open=True)
+    db.create_tables([MedicineRating])
+    try:
+        count = rating_stats.rebuild()
+        print(f"Rebuilt rating stats for {count} medicines")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,83 @@ load_dotenv()
 
 class Config:
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING").upper()
+
+    # Per-request tracing: Server-Timing header and optional JSON trace per request
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+    TRACE_DUMP = os.getenv("TRACE_DUMP", "false").lower() == "true"
     API_V1_STR = "/api/v1"
+    DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+    MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+    # Shared OpenFDA HTTP client (connection pool and timeouts, in seconds)
+    OPENFDA_TIMEOUT = float(os.getenv("OPENFDA_TIMEOUT", "10.0"))
+    OPENFDA_CONNECT_TIMEOUT = float(os.getenv("OPENFDA_CONNECT_TIMEOUT", "5.0"))
+    OPENFDA_MAX_CONNECTIONS = int(os.getenv("OPENFDA_MAX_CONNECTIONS", "20"))
+    OPENFDA_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENFDA_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    OPENFDA_KEEPALIVE_EXPIRY = float(os.getenv("OPENFDA_KEEPALIVE_EXPIRY", "30.0"))
+
+    # Local OpenFDA label store imported from bulk dumps
+    OPENFDA_LOCAL_STORE = os.getenv("OPENFDA_LOCAL_STORE", "true").lower() == "true"
+    FDA_IMPORT_CHUNK_SIZE = int(os.getenv("FDA_IMPORT_CHUNK_SIZE", "500"))
+
+    # Local brand -> generic resolution ahead of Gemini
+    BRAND_RESOLVER_ENABLED = os.getenv("BRAND_RESOLVER_ENABLED", "true").lower() == "true"
+    BRAND_RESOLVER_MIN_SCORE = float(os.getenv("BRAND_RESOLVER_MIN_SCORE", "0.85"))
+
+    # OpenFDA label cache (ages in seconds)
+    OPENFDA_CACHE_TTL = float(os.getenv("OPENFDA_CACHE_TTL", "86400"))
+    OPENFDA_CACHE_STALE_TTL = float(os.getenv("OPENFDA_CACHE_STALE_TTL", "604800"))
+    OPENFDA_CACHE_MAX_ENTRIES = int(os.getenv("OPENFDA_CACHE_MAX_ENTRIES", "512"))
+
+    # Gemini result memoization
+    GEMINI_CACHE_PERSIST = os.getenv("GEMINI_CACHE_PERSIST", "false").lower() == "true"
+    GEMINI_LABEL_CACHE_SIZE = int(os.getenv("GEMINI_LABEL_CACHE_SIZE", "1024"))
+    GEMINI_IMAGE_CACHE_SIZE = int(os.getenv("GEMINI_IMAGE_CACHE_SIZE", "256"))
+    GEMINI_IMAGE_CACHE_PERCEPTUAL = os.getenv("GEMINI_IMAGE_CACHE_PERCEPTUAL", "false").lower() == "true"
+    GEMINI_IMAGE_PHASH_MAX_DISTANCE = int(os.getenv("GEMINI_IMAGE_PHASH_MAX_DISTANCE", "6"))
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+
+    # Image uploads: size limits, then downscale and re-encode before the vision call
+    IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+    IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "40000000"))
+    IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1600"))
+    IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "JPEG").upper()
+    IMAGE_OUTPUT_QUALITY = int(os.getenv("IMAGE_OUTPUT_QUALITY", "85"))
+    SAFETY_CACHE_SIZE = int(os.getenv("SAFETY_CACHE_SIZE", "4096"))
+
+    # Local rule-based safety pre-screen ahead of Gemini; clearing unmatched profiles
+    # locally (no allergy/condition term found anywhere on the label) is opt-in
+    SAFETY_PRESCREEN_ENABLED = os.getenv("SAFETY_PRESCREEN_ENABLED", "true").lower() == "true"
+    SAFETY_PRESCREEN_CLEAR_UNMATCHED = os.getenv("SAFETY_PRESCREEN_CLEAR_UNMATCHED", "false").lower() == "true"
+
+    # Compact label/profile projection for the safety prompts (caps in characters, 0 = none)
+    PROMPT_PROJECTION_ENABLED = os.getenv("PROMPT_PROJECTION_ENABLED", "true").lower() == "true"
+    PROMPT_SECTION_MAX_CHARS = int(os.getenv("PROMPT_SECTION_MAX_CHARS", "1500"))
+    PROMPT_LABEL_MAX_CHARS = int(os.getenv("PROMPT_LABEL_MAX_CHARS", "8000"))
+
+    # SQLite engine tuning
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "wal")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "normal")
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-64000"))  # negative = KiB
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", "268435456"))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    DATABASE_POOL = os.getenv("DATABASE_POOL", "false").lower() == "true"
+    DATABASE_MAX_CONNECTIONS = int(os.getenv("DATABASE_MAX_CONNECTIONS", "20"))
+    DATABASE_STALE_TIMEOUT = int(os.getenv("DATABASE_STALE_TIMEOUT", "300"))
+    DATABASE_READ_CONNECTION = os.getenv("DATABASE_READ_CONNECTION", "true").lower() == "true"
+    DB_THREAD_POOL_SIZE = int(os.getenv("DB_THREAD_POOL_SIZE", "8"))
+    # Concurrent streaming exports, each holding one thread and connection
+    EXPORT_MAX_CONCURRENCY = int(os.getenv("EXPORT_MAX_CONCURRENCY", "4"))
+
+    # Bulk create endpoints
+    BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+    # Items checked and committed per transaction; their INSERTs are split further
+    # to stay within SQLite's bound-parameter limit
+    BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "500"))
+    BATCH_SEARCH_MAX_ITEMS = int(os.getenv("BATCH_SEARCH_MAX_ITEMS", "25"))
+
 
-settings = Config() 
\ No newline at end of file
+settings = Config() 
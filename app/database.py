@@ -1,9 +1,164 @@
-from peewee import SqliteDatabase, Model
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from weakref import WeakSet
+from peewee import SqliteDatabase, Model, ModelSelect, _ConnectionState
+from playhouse.pool import PooledDatabase, PooledSqliteDatabase
 from app.config import settings
 
-db = SqliteDatabase(settings.DATABASE_URL.replace("sqlite:///", ""))
+# One connection state per request context (and per thread outside of one)
+_connection_states: ContextVar[Optional[dict]] = ContextVar("db_connection_states", default=None)
+# Every engine built by create_database, closed together at the end of a scope
+_databases: "WeakSet[SqliteDatabase]" = WeakSet()
+
+
+class ContextConnectionState(_ConnectionState):
+    """
+    Peewee connection state kept in a ContextVar instead of a thread local.
+
+    Every asyncio request runs on the same thread, so thread-local state would
+    make concurrent requests share (and close) one connection. Each engine's
+    state is its own entry in the scope, so engines never share a connection.
+    """
+
+    def _current(self) -> dict:
+        states = _connection_states.get()
+        if states is None:
+            states = {}
+            _connection_states.set(states)
+        state = states.get(self)
+        if state is None:
+            state = states[self] = {"closed": True, "conn": None, "ctx": [], "transactions": []}
+        return state
+
+    def __getattr__(self, name):
+        try:
+            return self._current()[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self._current()[name] = value
+
+
+def new_connection_scope() -> object:
+    """Start a fresh set of connection states for the current context. Returns a reset token."""
+    return _connection_states.set({})
+
+
+def end_connection_scope(token: object) -> None:
+    """Close (or return to the pool) connections opened in the current scope and restore the previous one."""
+    for database in _databases:
+        if not database.is_closed():
+            database.close()
+    _connection_states.reset(token)
+
+
+@contextmanager
+def connection_scope() -> Iterator[None]:
+    """Run a block with its own connections, closed or returned to the pool on exit."""
+    token = new_connection_scope()
+    try:
+        yield
+    finally:
+        end_connection_scope(token)
+
+
+@contextmanager
+def worker_connections() -> Iterator[None]:
+    """
+    Connection handling for one job on a worker thread.
+
+    Unpooled engines keep the thread's connection open from job to job, so
+    its pragmas and page cache are set up once per thread. Pooled
+    connections go back to the pool when the job exits, unless a transaction
+    opened by an enclosing block is still running on them.
+    """
+    try:
+        yield
+    finally:
+        for database in _databases:
+            if isinstance(database, PooledDatabase) and not database.is_closed() and not database.in_transaction():
+                database.close()
+
+
+class ConnectionScopeMiddleware:
+    """
+    ASGI middleware giving every request its own connections for ORM access on
+    the event loop thread, closed when the response has been sent.
+
+    Work handed to `run_db` runs on worker threads, which do not share the
+    request's context; each of those jobs gets its own scope instead.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with connection_scope():
+            await self.app(scope, receive, send)
+
+
+def _pragmas(read_only: bool = False) -> dict:
+    pragmas = {
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+    }
+    if read_only:
+        pragmas["query_only"] = 1
+    else:
+        # journal_mode is persistent and needs a writable connection
+        pragmas = {"journal_mode": settings.SQLITE_JOURNAL_MODE, **pragmas}
+    return pragmas
+
+
+def create_database(path: str, read_only: bool = False) -> SqliteDatabase:
+    """Build a SQLite engine with the configured pragmas, pooled if DATABASE_POOL is set."""
+    options = {
+        "pragmas": _pragmas(read_only),
+        "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+    }
+    if settings.DATABASE_POOL:
+        database = PooledSqliteDatabase(
+            path,
+            max_connections=settings.DATABASE_MAX_CONNECTIONS,
+            stale_timeout=settings.DATABASE_STALE_TIMEOUT,
+            # Connections go back to the pool after each job and may be checked
+            # out next by another worker thread; only one holds them at a time
+            check_same_thread=False,
+            **options
+        )
+    else:
+        database = SqliteDatabase(path, **options)
+    database._state = ContextConnectionState()
+    _databases.add(database)
+    return database
+
+
+DATABASE_PATH = settings.DATABASE_URL.replace("sqlite:///", "")
+
+db = create_database(DATABASE_PATH)
+# Separate query-only connection: under WAL, reads do not queue behind writes
+read_db = (
+    create_database(DATABASE_PATH, read_only=True)
+    if settings.DATABASE_READ_CONNECTION and DATABASE_PATH != ":memory:"
+    else None
+)
 test_db = SqliteDatabase('unit_test.db')
 
+
+def for_read(query: ModelSelect) -> ModelSelect:
+    """Run a select on the read connection when the model uses the main database."""
+    if read_db is not None and query.model._meta.database is db:
+        return query.bind(read_db)
+    return query
+
+
 class BaseModel(Model):
     class Meta:
-        database = db 
\ No newline at end of file
+        database = db
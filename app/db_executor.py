@@ -0,0 +1,67 @@
+"""
+Off-loop database access for async route handlers.
+
+Peewee is synchronous, so a query issued directly from an `async def` handler
+stalls every other request on the event loop until it returns. `run_db` moves
+that work onto a bounded pool of dedicated threads instead.
+
+Executor threads do not inherit the request's context, so each worker thread
+has its own peewee connection state. Without DATABASE_POOL a thread keeps one
+connection across jobs, set up with the pragmas once; with it, every job
+hands its connection back to the pool when it returns (`worker_connections`).
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+from app.config import settings
+from app.database import worker_connections
+from app.services.limiter import ConcurrencyLimiter
+from app.tracing import span
+
+T = TypeVar("T")
+
+
+def _job(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    with worker_connections():
+        return func(*args, **kwargs)
+
+
+class DatabaseExecutor:
+    """Runs blocking ORM work on a bounded thread pool behind a concurrency limiter."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.limiter = ConcurrencyLimiter("db", max_workers or settings.DB_THREAD_POOL_SIZE)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Await `func(*args, **kwargs)` executed on a database worker thread.
+
+        Exceptions raised by `func` (DoesNotExist, IntegrityError, HTTPException, ...)
+        propagate to the caller unchanged.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.limiter.limit,
+                thread_name_prefix="db"
+            )
+        # One "db" span per job, queue wait included
+        with span("db", job=getattr(func, "__name__", type(func).__name__)):
+            async with self.limiter:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, partial(_job, func, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        """Release the worker threads. A new pool is created on next use."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+db_executor = DatabaseExecutor()
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking ORM work on the shared database executor."""
+    return await db_executor.run(func, *args, **kwargs)
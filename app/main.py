@@ -1,50 +1,85 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.database import db
+from app.database import db, read_db, ConnectionScopeMiddleware
+from app.db_executor import db_executor
+from app.migrations import migrate_database
 from app.models.user import User
 from app.models.profile import PersonalProfile, MedicalData
 from app.models.medicine import Medicine
 from app.models.review import Review
+from app.models.medicine_rating import MedicineRating
 from app.models.favorites import Favorite
-from app.api.v1.endpoints import users, medicines, reviews, profiles, favorites
+from app.models.fda_label_cache import FDALabelCache
+from app.models.gemini_cache import GeminiCache
+from app.models.fda_label import FDALabel, FDALabelName
+from app.api.v1.endpoints import users, medicines, reviews, profiles, favorites, exports
 from app.config import settings
+from app.metrics import metrics
+from app.pagination import NEXT_CURSOR_HEADER
+from app.tracing import TracingMiddleware, configure_logging
+from app.services.image_ingest import UploadLimitMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 
 
+configure_logging()
+
 origins = [
     "*"
 ]
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Setup - Connect to DB and create tables
+    # Setup - Connect to DB, upgrade existing schema and create missing tables
     db.connect()
-    db.create_tables([
+    migrate_database(db, [
         User, 
         PersonalProfile, 
         MedicalData,
         Medicine, 
         Review,
-        Favorite
+        MedicineRating,
+        Favorite,
+        FDALabelCache,
+        GeminiCache,
+        FDALabel,
+        FDALabelName
     ])
+    # Shared, pooled HTTP client for OpenFDA lookups
+    await medicines.openfda_service.open()
+    if settings.BRAND_RESOLVER_ENABLED:
+        medicines.brand_resolver.load_from_store()
     
     yield
     
+    await medicines.openfda_cache.aclose()
+    await medicines.openfda_service.aclose()
+    medicines.gemini_service.shutdown()
+    db_executor.shutdown()
     if not db.is_closed():
         db.close()
+    if read_db is not None and settings.DATABASE_POOL:
+        read_db.close_all()
+    if settings.DATABASE_POOL:
+        db.close_all()
 
 app = FastAPI(
     title="MediPedia API",
     lifespan=lifespan
 )
 
+# Inside CORS so a 413 still carries the CORS headers
+app.add_middleware(UploadLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+app.add_middleware(ConnectionScopeMiddleware)
+# Added last so it is outermost and its timings cover the whole request
+app.add_middleware(TracingMiddleware)
 
 # Include routers
 app.include_router(
@@ -72,7 +107,16 @@ app.include_router(
     prefix=settings.API_V1_STR,
     tags=["favorites"]
 )
+app.include_router(
+    exports.router,
+    prefix=settings.API_V1_STR + "/exports",
+    tags=["exports"]
+)
 
 @app.get("/")
 async def root():
-    return {"message": "Welcome to MediPedia API"} 
\ No newline at end of file
+    return {"message": "Welcome to MediPedia API"}
+
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot() 
\ No newline at end of file
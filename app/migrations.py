@@ -0,0 +1,150 @@
+"""
+Versioned schema migrations.
+
+Fresh databases get their schema, indexes included, from `create_tables`. Existing
+deployments are upgraded in place by the numbered migrations below, each
+applied once and recorded in `schema_migrations`. Migrations run before
+`create_tables`, so they have to cope with tables that do not exist yet.
+Rows a migration removes or rewrites are reported at WARNING level.
+"""
+from typing import Callable, List, Tuple, Type
+from peewee import Database, Model
+from playhouse.migrate import SqliteMigrator, migrate as apply_operations
+from app.models.favorites import Favorite
+from app.models.medicine import Medicine
+from app.models.medicine_rating import MedicineRating
+from app.models.profile import PersonalProfile, MedicalData
+from app.models.review import Review
+from app.models.schema_migration import SchemaMigration
+from app.services import rating_stats
+from app.tracing import logger
+
+Migration = Tuple[int, str, Callable[[Database], None]]
+
+
+def _exists(database: Database, table: str) -> bool:
+    return database.table_exists(table)
+
+
+def _dedupe(database: Database, table: str, columns: List[str]) -> int:
+    """Keep the oldest row of every group that would violate a unique index on `columns`."""
+    group_by = ", ".join(f'"{column}"' for column in columns)
+    deleted = database.execute_sql(
+        f'DELETE FROM "{table}" WHERE "id" NOT IN '
+        f'(SELECT MIN("id") FROM "{table}" GROUP BY {group_by})'
+    ).rowcount
+    if deleted:
+        logger.warning(
+            "Migration deleted %d duplicate %s rows (kept the oldest per %s)",
+            deleted, table, ", ".join(columns)
+        )
+    return deleted
+
+
+def _ensure_indexes(database: Database, model: Type[Model]) -> None:
+    """
+    Create the indexes declared on `model`, replacing any existing index over the
+    same columns whose uniqueness differs (e.g. the implicit foreign key index).
+    """
+    table = model._meta.table_name
+    existing = database.get_indexes(table)
+    migrator = SqliteMigrator(database)
+    for index in model._meta.fields_to_index():
+        columns = [field.column_name for field in index._expressions]
+        for meta in existing:
+            if meta.columns == columns and meta.unique != index._unique:
+                apply_operations(migrator.drop_index(table, meta.name))
+    with database.bind_ctx([model], bind_refs=False, bind_backrefs=False):
+        model._schema.create_indexes(safe=True)
+
+
+def _add_lookup_indexes(database: Database) -> None:
+    # One medicine row per FDA label: repoint reviews/favorites at the oldest row
+    if _exists(database, "medicines"):
+        duplicates = database.execute_sql(
+            'SELECT "fda_id", MIN("id") FROM "medicines" '
+            'WHERE "fda_id" IS NOT NULL GROUP BY "fda_id" HAVING COUNT(*) > 1'
+        ).fetchall()
+        repointed = {"reviews": 0, "favorites": 0}
+        merged = 0
+        for fda_id, keep_id in duplicates:
+            for table in repointed:
+                if _exists(database, table):
+                    repointed[table] += database.execute_sql(
+                        f'UPDATE "{table}" SET "medicine_id" = ? WHERE "medicine_id" IN '
+                        '(SELECT "id" FROM "medicines" WHERE "fda_id" = ? AND "id" != ?)',
+                        (keep_id, fda_id, keep_id)
+                    ).rowcount
+            merged += database.execute_sql(
+                'DELETE FROM "medicines" WHERE "fda_id" = ? AND "id" != ?',
+                (fda_id, keep_id)
+            ).rowcount
+        if merged:
+            logger.warning(
+                "Migration merged %d duplicate medicines rows into %d FDA labels "
+                "(repointed %d reviews rows, %d favorites rows)",
+                merged, len(duplicates), repointed["reviews"], repointed["favorites"]
+            )
+        _ensure_indexes(database, Medicine)
+
+    if _exists(database, "favorites"):
+        _dedupe(database, "favorites", ["user_id", "medicine_id"])
+        _ensure_indexes(database, Favorite)
+
+    if _exists(database, "reviews"):
+        _dedupe(database, "reviews", ["user_id", "medicine_id"])
+        _ensure_indexes(database, Review)
+
+    if _exists(database, "personal_profiles"):
+        if _exists(database, "medical_data"):
+            deleted = database.execute_sql(
+                'DELETE FROM "medical_data" WHERE "profile_id" NOT IN '
+                '(SELECT MIN("id") FROM "personal_profiles" GROUP BY "user_id")'
+            ).rowcount
+            if deleted:
+                logger.warning(
+                    "Migration deleted %d medical_data rows of duplicate personal_profiles", deleted
+                )
+        _dedupe(database, "personal_profiles", ["user_id"])
+        _ensure_indexes(database, PersonalProfile)
+
+    if _exists(database, "medical_data"):
+        _dedupe(database, "medical_data", ["profile_id"])
+        _ensure_indexes(database, MedicalData)
+
+
+def _add_rating_aggregates(database: Database) -> None:
+    # Backfill the aggregates for reviews written before the table existed
+    with database.bind_ctx([Medicine, Review, MedicineRating], bind_refs=False, bind_backrefs=False):
+        database.create_tables([MedicineRating])
+        if _exists(database, "reviews"):
+            rating_stats.rebuild()
+
+
+MIGRATIONS: List[Migration] = [
+    (1, "add_lookup_indexes", _add_lookup_indexes),
+    (2, "add_rating_aggregates", _add_rating_aggregates),
+]
+
+
+def run_migrations(database: Database) -> List[int]:
+    """Apply pending migrations in order, each in its own transaction. Returns the versions applied."""
+    applied_now = []
+    with database.bind_ctx([SchemaMigration]):
+        database.create_tables([SchemaMigration])
+        applied = {row.version for row in SchemaMigration.select(SchemaMigration.version)}
+        for version, name, migration in MIGRATIONS:
+            if version in applied:
+                continue
+            with database.atomic():
+                migration(database)
+                SchemaMigration.create(version=version, name=name)
+            applied_now.append(version)
+    return applied_now
+
+
+def migrate_database(database: Database, models: List[Type[Model]]) -> None:
+    """Upgrade an existing schema in place, then create any missing tables and indexes."""
+    run_migrations(database)
+    with database.bind_ctx(models, bind_refs=False, bind_backrefs=False):
+        database.create_tables(models)
@@ -10,4 +10,7 @@ class Favorite(BaseModel):
     added_at = DateTimeField(default=datetime.now)
 
     class Meta:
-        table_name = 'favorites'
\ No newline at end of file
+        table_name = 'favorites'
+        indexes = (
+            (('user', 'medicine'), True),
+        )
\ No newline at end of file
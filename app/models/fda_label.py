@@ -0,0 +1,25 @@
+from peewee import CharField, TextField, IntegerField, DateTimeField, ForeignKeyField
+from app.database import BaseModel
+from datetime import datetime
+
+class FDALabel(BaseModel):
+    set_id = CharField(primary_key=True)
+    label_id = CharField()
+    version = IntegerField()
+    effective_time = CharField(null=True)
+    data = TextField()  # JSON-encoded OpenFDA label
+    imported_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = 'fda_labels'
+
+class FDALabelName(BaseModel):
+    label = ForeignKeyField(FDALabel, backref='names', on_delete='CASCADE')
+    kind = CharField()  # 'generic' or 'brand'
+    name = CharField()  # normalized (lowercase, single spaces)
+
+    class Meta:
+        table_name = 'fda_label_names'
+        indexes = (
+            (('kind', 'name'), False),
+        )
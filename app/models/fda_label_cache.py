@@ -0,0 +1,11 @@
+from peewee import CharField, TextField, DateTimeField
+from app.database import BaseModel
+from datetime import datetime
+
+class FDALabelCache(BaseModel):
+    generic_name = CharField(primary_key=True)
+    data = TextField()  # JSON-encoded OpenFDA label
+    fetched_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = 'fda_label_cache'
@@ -0,0 +1,13 @@
+from peewee import CharField, TextField, DateTimeField, CompositeKey
+from app.database import BaseModel
+from datetime import datetime
+
+class GeminiCache(BaseModel):
+    namespace = CharField()  # e.g. 'extract_label'
+    key = CharField()
+    value = TextField()
+    created_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = 'gemini_cache'
+        primary_key = CompositeKey('namespace', 'key')
@@ -6,7 +6,7 @@ class Medicine(BaseModel):
     id = AutoField(primary_key=True)
     name = CharField()
     description = TextField(null=True)
-    fda_id = CharField(null=True)
+    fda_id = CharField(null=True, unique=True)
     created_at = DateTimeField(default=datetime.now)
     updated_at = DateTimeField(default=datetime.now)
 
@@ -0,0 +1,25 @@
+from peewee import ForeignKeyField, IntegerField, FloatField, DateTimeField
+from app.database import BaseModel
+from datetime import datetime
+from .medicine import Medicine
+
+class MedicineRating(BaseModel):
+    """Per-medicine review aggregate, maintained incrementally as reviews are written."""
+    medicine = ForeignKeyField(Medicine, primary_key=True, backref='rating', on_delete='CASCADE')
+    review_count = IntegerField(default=0)
+    rating_sum = IntegerField(default=0)
+    average_rating = FloatField(default=0)
+    rating_1 = IntegerField(default=0)
+    rating_2 = IntegerField(default=0)
+    rating_3 = IntegerField(default=0)
+    rating_4 = IntegerField(default=0)
+    rating_5 = IntegerField(default=0)
+    sentiment_sum = FloatField(default=0)
+    sentiment_count = IntegerField(default=0)
+    updated_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = 'medicine_ratings'
+        indexes = (
+            (('average_rating', 'review_count'), False),
+        )
@@ -5,7 +5,7 @@ from .user import User
 
 class PersonalProfile(BaseModel):
     id = AutoField(primary_key=True)
-    user = ForeignKeyField(User, backref='profile')
+    user = ForeignKeyField(User, backref='profile', unique=True)
     first_name = CharField()
     last_name = CharField()
     age = IntegerField()
@@ -20,7 +20,7 @@ class PersonalProfile(BaseModel):
 
 class MedicalData(BaseModel):
     id = AutoField(primary_key=True)
-    profile = ForeignKeyField(PersonalProfile, backref='medical_data')
+    profile = ForeignKeyField(PersonalProfile, backref='medical_data', unique=True)
     allergies = TextField(null=True)
     conditions = TextField(null=True)
     preferred_medication_type = CharField(null=True)
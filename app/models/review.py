@@ -14,4 +14,8 @@ class Review(BaseModel):
     created_at = DateTimeField(default=datetime.now)
 
     class Meta:
-        table_name = 'reviews' 
\ No newline at end of file
+        table_name = 'reviews'
+        indexes = (
+            (('user', 'medicine'), True),
+            (('medicine', 'created_at'), False),
+        ) 
\ No newline at end of file
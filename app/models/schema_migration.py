@@ -0,0 +1,11 @@
+from peewee import IntegerField, CharField, DateTimeField
+from app.database import BaseModel
+from datetime import datetime
+
+class SchemaMigration(BaseModel):
+    version = IntegerField(primary_key=True)
+    name = CharField()
+    applied_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = 'schema_migrations'
@@ -0,0 +1,60 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException, Response
+from peewee import Field, ModelSelect
+from app.database import for_read
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_key: Any) -> str:
+    """Opaque, URL-safe cursor pointing just past `last_key`."""
+    payload = json.dumps({"after": last_key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Any:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))["after"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _key_of(row: Any, field: Field) -> Any:
+    if isinstance(row, dict):
+        return row[field.name]
+    if isinstance(row, (list, tuple)):
+        raise TypeError("Keyset pagination needs dict or model rows")
+    return getattr(row, field.name)
+
+
+def paginate(
+    query: ModelSelect,
+    key: Field,
+    limit: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Keyset pagination over a unique, indexed column (normally the primary key).
+
+    Fetches one row past `limit` to know whether another page exists, so every
+    page costs an index seek plus `limit + 1` rows regardless of table size.
+
+    Returns:
+        (rows, next_cursor): next_cursor is None on the last page.
+    """
+    if cursor is not None:
+        query = query.where(key > decode_cursor(cursor))
+    rows = list(for_read(query.order_by(key).limit(limit + 1)))
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(_key_of(rows[-1], key))
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import Any, List, Optional
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: str  # created, duplicate, not_found or invalid
+    id: Optional[int] = None
+    detail: Any = None
+
+class BulkCreateResponse(BaseModel):
+    created: int
+    results: List[BulkItemResult]
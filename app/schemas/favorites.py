@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
+from typing import List
 from app.schemas.medicine import MedicineResponse
 
 class FavoriteCreate(BaseModel):
@@ -11,4 +12,13 @@ class FavoriteResponse(BaseModel):
     medicine: MedicineResponse
     added_at: datetime
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class FavoriteSync(BaseModel):
+    add: List[int] = Field(default_factory=list, max_length=1000, description="Medicine IDs to favorite")
+    remove: List[int] = Field(default_factory=list, max_length=1000, description="Medicine IDs to unfavorite")
+
+class FavoriteSyncResponse(BaseModel):
+    added: int
+    removed: int
+    unknown_medicine_ids: List[int]
\ No newline at end of file
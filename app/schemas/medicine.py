@@ -1,6 +1,7 @@
-from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Optional
 from .review import ReviewResponse
+from app.config import settings
 
 class MedicineCreate(BaseModel):
     name: str
@@ -21,6 +22,17 @@ class MedicineResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class MedicineRatingStats(BaseModel):
+    medicine_id: int
+    review_count: int
+    average_rating: Optional[float] = None
+    histogram: Dict[str, int]
+    average_sentiment: Optional[float] = None
+
+class TopRatedMedicine(BaseModel):
+    medicine: MedicineResponse
+    stats: MedicineRatingStats
+
 class SafetyResult(BaseModel):
     can_take: bool
     warning: Optional[str] = None
@@ -32,4 +44,18 @@ class MedicineSearchResponse(BaseModel):
     medicine: MedicineWithReviews
     safety: SafetyResult
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=settings.BATCH_SEARCH_MAX_ITEMS)
+
+class BatchSearchItem(BaseModel):
+    query: str
+    status: str  # ok, not_extracted or not_found
+    label: Optional[str] = None
+    detail: Optional[str] = None
+    medicine: Optional[MedicineWithReviews] = None
+    safety: Optional[SafetyResult] = None
+
+class BatchSearchResponse(BaseModel):
+    results: List[BatchSearchItem]
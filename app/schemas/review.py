@@ -13,6 +13,10 @@ class ReviewCreate(BaseModel):
             raise ValueError('Comment cannot be empty')
         return v.strip()
 
+class ReviewBulkCreate(ReviewCreate):
+    user_id: int
+    medicine_id: int
+
 class ReviewResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
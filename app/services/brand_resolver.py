@@ -0,0 +1,176 @@
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from peewee import PeeweeException
+from app.config import settings
+from app.metrics import metrics
+from app.models.fda_label import FDALabelName
+from app.utils import normalize_text
+from app.tracing import logger
+
+DOSAGE = re.compile(r"\b\d+(?:[.,]\d+)?\s*(?:mg|mcg|µg|g|ml|iu|%|units?)\b")
+NOISE_WORDS = {
+    "tablet", "tablets", "tab", "tabs", "capsule", "capsules", "caplet", "caplets",
+    "gelcap", "gelcaps", "softgel", "softgels", "liquid", "syrup", "suspension",
+    "extra", "strength", "maximum", "regular", "junior", "children", "childrens",
+    "adult", "adults", "oral", "pill", "pills", "mg", "dose", "x",
+}
+
+
+def clean_query(text: str) -> str:
+    """Lowercase, drop dosages like '500mg' and packaging words like 'tablets'."""
+    text = DOSAGE.sub(" ", normalize_text(text))
+    text = re.sub(r"[^\w\s-]", " ", text)
+    return " ".join(word for word in text.split() if word not in NOISE_WORDS and not word.isdigit())
+
+
+def canonical_generic(generics: Iterable[str]) -> Optional[str]:
+    """
+    The generic a label's names map to: the first in normalized sort order.
+
+    The label store keeps names sorted rather than in label order, so live
+    labels and the store must both use an order-independent rule.
+    """
+    names = [normalize_text(generic) for generic in generics if generic and generic.strip()]
+    return min(names) if names else None
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class BrandResolver:
+    """
+    In-memory brand/generic name -> generic name dictionary with a trigram index.
+
+    Built from the `openfda.brand_name` / `openfda.generic_name` arrays of FDA
+    labels. `resolve` only answers when the match is unambiguous and similar
+    enough; otherwise it returns None and the caller falls back to Gemini.
+    """
+
+    def __init__(self, min_score: Optional[float] = None):
+        self.min_score = settings.BRAND_RESOLVER_MIN_SCORE if min_score is None else min_score
+        self._names: Dict[str, Set[str]] = {}
+        self._index: Dict[str, Set[str]] = defaultdict(set)
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, name: str, generic: str) -> None:
+        name, generic = normalize_text(name), normalize_text(generic)
+        if not name or not generic:
+            return
+        with self._lock:
+            if name not in self._names:
+                self._names[name] = set()
+                for gram in trigrams(name):
+                    self._index[gram].add(name)
+            self._names[name].add(generic)
+
+    def add_label(self, label: dict) -> None:
+        """Learn the brand -> generic mapping carried by one FDA label."""
+        openfda = label.get("openfda") or {}
+        generics = openfda.get("generic_name") or []
+        generic = canonical_generic(generics)
+        if generic is None:
+            return
+        for name in [*generics, *(openfda.get("brand_name") or [])]:
+            if name and name.strip():
+                self.add(name, generic)
+
+    def add_pairs(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        for name, generic in pairs:
+            self.add(name, generic)
+
+    def load_from_store(self) -> int:
+        """Seed the dictionary from the local FDA label store. Returns the number of names known."""
+        generics_of: Dict[str, List[str]] = defaultdict(list)
+        brands: List[Tuple[str, str]] = []
+        try:
+            rows = FDALabelName.select(FDALabelName.label, FDALabelName.kind, FDALabelName.name).tuples()
+            for label_id, kind, name in rows.iterator():
+                if kind == "generic":
+                    generics_of[label_id].append(name)
+                brands.append((label_id, name))
+        except PeeweeException as e:
+            logger.warning("Error loading brand names: %s", e)
+            return len(self)
+        generic_of = {label_id: canonical_generic(generics) for label_id, generics in generics_of.items()}
+        self.add_pairs((name, generic_of[label_id]) for label_id, name in brands if label_id in generic_of)
+        return len(self)
+
+    def _lookup(self, name: str) -> Optional[str]:
+        generics = self._names.get(name)
+        if generics and len(generics) == 1:
+            return next(iter(generics))
+        return None
+
+    def _fuzzy(self, text: str) -> Optional[str]:
+        grams = trigrams(text)
+        counts: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for name in self._index.get(gram, ()):
+                counts[name] += 1
+        if not counts:
+            return None
+
+        # Rank a short list by trigram overlap, then confirm with edit similarity
+        shortlist = sorted(counts, key=counts.get, reverse=True)[:20]
+        scored = sorted(
+            ((SequenceMatcher(None, text, name).ratio(), name) for name in shortlist),
+            reverse=True
+        )
+        best_score, best_name = scored[0]
+        if best_score < self.min_score:
+            return None
+        best = self._lookup(best_name)
+        if best is None:
+            return None
+        for score, name in scored[1:]:
+            if best_score - score > 0.05:
+                break
+            if self._lookup(name) != best:
+                return None  # two different generics are equally close
+        return best
+
+    def resolve(self, text: str) -> Optional[str]:
+        """
+        Map a free-text query to a generic name, or None when not confident.
+        """
+        query = clean_query(text)
+        if not query:
+            return None
+
+        result = self._lookup(query)
+        if result:
+            metrics.incr("brand_resolver.exact")
+            return result
+        tokens = query.split()
+        result = self._agree(self._lookup(token) for token in tokens) if len(tokens) > 1 else None
+        if result:
+            metrics.incr("brand_resolver.exact")
+            return result
+
+        result = self._fuzzy(query) if len(query) >= 4 else None
+        if not result and len(tokens) > 1:
+            result = self._agree(self._fuzzy(token) for token in tokens if len(token) >= 4)
+        if result:
+            metrics.incr("brand_resolver.fuzzy")
+            return result
+        metrics.incr("brand_resolver.miss")
+        return None
+
+    @staticmethod
+    def _agree(results: Iterable[Optional[str]]) -> Optional[str]:
+        """The single generic named by the matching words, or None if they disagree."""
+        found = {result for result in results if result}
+        return found.pop() if len(found) == 1 else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._names.clear()
+            self._index.clear()
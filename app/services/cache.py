@@ -0,0 +1,70 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+
+class LRUCache:
+    """
+    Small thread-safe, size-bounded LRU map with hit/miss counters.
+
+    Used as the in-process tier of the service caches. `on_evict` is called
+    with each (key, value) pushed out by the size bound, after the cache's
+    lock has been released.
+    """
+
+    def __init__(self, max_size: int, on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        self.max_size = max_size
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        evicted = []
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                evicted.append(self._data.popitem(last=False))
+        if self.on_evict is not None:
+            for item in evicted:
+                self.on_evict(*item)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of the entries, least recently used first. Does not touch counters."""
+        with self._lock:
+            return list(self._data.items())
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
@@ -0,0 +1,204 @@
+import io
+import json
+import re
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+from peewee import PeeweeException
+from app.config import settings
+from app.models.fda_label import FDALabel, FDALabelName
+from app.utils import normalize_text
+from app.tracing import logger
+
+RESULTS_ARRAY = re.compile(r'"results"\s*:\s*\[')
+
+
+def iter_label_records(stream: TextIO, chunk_size: int = 1 << 20) -> Iterator[dict]:
+    """
+    Stream the objects of the top-level `results` array of an OpenFDA bulk file.
+
+    Only one chunk plus the record being decoded is held in memory, so the
+    multi-hundred-megabyte label dumps can be read without loading them whole.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+
+    def fill() -> None:
+        nonlocal buffer, eof
+        chunk = stream.read(chunk_size)
+        if chunk:
+            buffer += chunk
+        else:
+            eof = True
+
+    # `meta.results` is an object, the label list is the array
+    while True:
+        match = RESULTS_ARRAY.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        if eof:
+            return
+        buffer = buffer[-64:]
+        fill()
+
+    pos = 0
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of file inside results array")
+            buffer, pos = "", 0
+            fill()
+            continue
+        if buffer[pos] == "]":
+            return
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            buffer, pos = buffer[pos:], 0
+            fill()
+            continue
+        yield record
+        pos = end
+        if pos > chunk_size:
+            buffer, pos = buffer[pos:], 0
+
+
+def iter_bulk_file(path: Path) -> Iterator[dict]:
+    """Yield label records from a `.json` file or every `.json` member of a `.zip`."""
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                if not member.endswith(".json"):
+                    continue
+                with archive.open(member) as raw:
+                    yield from iter_label_records(io.TextIOWrapper(raw, encoding="utf-8"))
+    else:
+        with open(path, encoding="utf-8") as handle:
+            yield from iter_label_records(handle)
+
+
+def _label_names(record: dict) -> List[Dict[str, str]]:
+    openfda = record.get("openfda") or {}
+    names = set()
+    for kind, field in (("generic", "generic_name"), ("brand", "brand_name")):
+        for value in openfda.get(field) or []:
+            if value and value.strip():
+                names.add((kind, normalize_text(value)))
+    return [{"kind": kind, "name": name} for kind, name in sorted(names)]
+
+
+def _version(record: dict) -> int:
+    try:
+        return int(record.get("version") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class LocalLabelStore:
+    """
+    Indexed local copy of the OpenFDA drug label dataset.
+
+    Labels are keyed by `set_id` and only replaced by a newer `version`, so
+    importing the same dump twice, or a newer dump on top, is incremental.
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None):
+        self.chunk_size = chunk_size or settings.FDA_IMPORT_CHUNK_SIZE
+
+    def import_records(self, records: Iterable[dict]) -> Dict[str, int]:
+        """
+        Insert or upgrade labels in chunked transactions.
+
+        Returns:
+            dict: Counts of 'inserted', 'updated' and 'skipped' records.
+        """
+        stats = {"inserted": 0, "updated": 0, "skipped": 0}
+        chunk: List[dict] = []
+        for record in records:
+            if not record.get("set_id") or not record.get("id"):
+                stats["skipped"] += 1
+                continue
+            chunk.append(record)
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk, stats)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk, stats)
+        return stats
+
+    def _import_chunk(self, chunk: List[dict], stats: Dict[str, int]) -> None:
+        # Keep only the newest version of a set_id within the chunk
+        latest: Dict[str, dict] = {}
+        for record in chunk:
+            current = latest.get(record["set_id"])
+            if current is None or _version(record) > _version(current):
+                latest[record["set_id"]] = record
+        stats["skipped"] += len(chunk) - len(latest)
+
+        with FDALabel._meta.database.atomic():
+            existing = {
+                row.set_id: row.version
+                for row in FDALabel.select(FDALabel.set_id, FDALabel.version)
+                .where(FDALabel.set_id.in_(list(latest)))
+            }
+            rows = []
+            for set_id, record in latest.items():
+                if set_id in existing and existing[set_id] >= _version(record):
+                    stats["skipped"] += 1
+                    continue
+                stats["updated" if set_id in existing else "inserted"] += 1
+                rows.append(record)
+            if not rows:
+                return
+
+            set_ids = [record["set_id"] for record in rows]
+            FDALabelName.delete().where(FDALabelName.label.in_(set_ids)).execute()
+            FDALabel.replace_many([
+                {
+                    "set_id": record["set_id"],
+                    "label_id": record["id"],
+                    "version": _version(record),
+                    "effective_time": record.get("effective_time"),
+                    "data": json.dumps(record),
+                }
+                for record in rows
+            ]).execute()
+            names = [
+                {"label": record["set_id"], **name}
+                for record in rows
+                for name in _label_names(record)
+            ]
+            if names:
+                FDALabelName.insert_many(names).execute()
+
+    def import_files(self, paths: Iterable[Path]) -> Dict[str, int]:
+        totals = {"inserted": 0, "updated": 0, "skipped": 0}
+        for path in paths:
+            stats = self.import_records(iter_bulk_file(Path(path)))
+            for key, value in stats.items():
+                totals[key] += value
+        return totals
+
+    def find_by_name(self, name: str, kind: str = "generic") -> Optional[dict]:
+        """
+        Most recent label whose generic (or brand) name matches exactly after normalization.
+        Returns None on a miss or when the store is unavailable.
+        """
+        try:
+            row = (
+                FDALabel.select(FDALabel.data)
+                .join(FDALabelName)
+                .where((FDALabelName.kind == kind) & (FDALabelName.name == normalize_text(name)))
+                .order_by(FDALabel.effective_time.desc())
+                .first()
+            )
+        except PeeweeException as e:
+            logger.warning("Error reading local label store: %s", e)
+            return None
+        return json.loads(row.data) if row else None
@@ -0,0 +1,128 @@
+import hashlib
+from typing import Optional
+from peewee import PeeweeException
+from PIL import Image
+from app.database import worker_connections
+from app.models.gemini_cache import GeminiCache
+from app.metrics import metrics
+from app.services.cache import LRUCache
+from app.tracing import logger
+
+
+class MemoCache:
+    """
+    Memoization store for Gemini results.
+
+    Keeps a bounded LRU in process and, when `persist` is set, mirrors every
+    entry into the `gemini_cache` table under `namespace` so results survive
+    restarts. Only successful results should be stored. Lookups are counted
+    as `gemini_cache.<namespace>.hit` / `.miss` in the metrics registry.
+
+    The table is read and written on the Gemini worker threads, outside
+    `run_db`, so those accesses release pooled connections themselves.
+    """
+
+    def __init__(self, namespace: str, max_size: int, persist: bool = False):
+        self.namespace = namespace
+        self.persist = persist
+        self.memory = LRUCache(max_size)
+
+    def _load(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None or not self.persist:
+            return value
+        try:
+            with worker_connections():
+                row = GeminiCache.get_or_none(
+                    (GeminiCache.namespace == self.namespace) & (GeminiCache.key == key)
+                )
+        except PeeweeException as e:
+            logger.warning("Error reading Gemini cache: %s", e)
+            return None
+        if row is None:
+            return None
+        self.memory.set(key, row.value)
+        return row.value
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._load(key)
+        metrics.incr(f"gemini_cache.{self.namespace}.{'miss' if value is None else 'hit'}")
+        return value
+
+    def contains(self, key: str) -> bool:
+        """True if the key is in the in-process tier; does not touch counters."""
+        return key in self.memory
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if not self.persist:
+            return
+        try:
+            with worker_connections():
+                GeminiCache.replace(namespace=self.namespace, key=key, value=value).execute()
+        except PeeweeException as e:
+            logger.warning("Error writing Gemini cache: %s", e)
+
+    def clear(self) -> None:
+        """Empty the in-process tier."""
+        self.memory.clear()
+
+    def stats(self) -> dict:
+        return {
+            "namespace": self.namespace,
+            "persist": self.persist,
+            "size": len(self.memory),
+            "max_size": self.memory.max_size,
+        }
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 of the raw upload, used as the exact image cache key."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def dhash(image: Image.Image, size: int = 8) -> int:
+    """
+    Difference hash of an image: a size*size-bit fingerprint that is stable
+    across rescaling and recompression of the same picture.
+    """
+    pixels = list(
+        image.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS).getdata()
+    )
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+class PerceptualHashIndex:
+    """
+    Bounded in-process map from image dHash to extracted label.
+
+    Lookups accept any stored hash within `max_distance` differing bits, so the
+    same package photographed at another size or compression still matches.
+    """
+
+    def __init__(self, max_size: int, max_distance: int):
+        self.max_distance = max_distance
+        self.memory = LRUCache(max_size)
+
+    def find(self, phash: int) -> Optional[str]:
+        exact = self.memory.get(phash)
+        if exact is not None:
+            return exact
+        best = None
+        best_distance = self.max_distance + 1
+        for stored, label in self.memory.items():
+            distance = (stored ^ phash).bit_count()
+            if distance < best_distance:
+                best, best_distance = label, distance
+        return best
+
+    def add(self, phash: int, label: str) -> None:
+        self.memory.set(phash, label)
+
+    def clear(self) -> None:
+        self.memory.clear()
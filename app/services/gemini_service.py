@@ -1,19 +1,129 @@
 import google.generativeai as genai
 from app.config import settings
+import asyncio
 import json
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Optional
 from fastapi import UploadFile
 from PIL import Image
 import io
+from app.services.gemini_cache import MemoCache, PerceptualHashIndex, content_hash, dhash
+from app.services.limiter import ConcurrencyLimiter
+from app.utils import normalize_text
+from app.tracing import logger, span
+
+# Shared by the single and batch safety prompts
+SAFETY_CONSIDERATIONS = """Consider:
+- if allergies and conditions say positive things like "none", "healthy" and deny having anything, output it as safe
+- be more biased to not warn, rather than warn. make a warning after you make sure the warning is actually connected to an allergy or condition of the user
+- Patient allergies: only create a warning when the side effects of the medicine exactly match the allergies of the user
+- if the entries to allergies and conditions is nothing, the answer is most likely safe
+- if the ingredient you warn about is not in the user's profile, do not warn about it
+- Medical conditions
+- Current medications (potential interactions)
+- Age-related restrictions
+- Any other relevant safety concerns, however do not assume any concern that is not mentioned in the medical data of the user
+- if the person has not specified that they are pregnant, do not put a warning on that
+"""
+
+
+def _normalize_verdict(result) -> dict:
+    """Coerce a model safety verdict into {'can_take': bool, 'warning': str or None}."""
+    if not isinstance(result, dict):
+        return {
+            "can_take": False,
+            "warning": "Error analyzing medicine safety - invalid response format"
+        }
+
+    # Convert string 'true'/'false' to boolean if needed
+    can_take = result.get('can_take')
+    if isinstance(can_take, str):
+        can_take = can_take.lower() == 'true'
+        result['can_take'] = can_take
+
+    # Ensure the response has the required fields
+    if not isinstance(result.get('can_take'), bool):
+        return {
+            "can_take": False,
+            "warning": "Error analyzing medicine safety - invalid response format"
+        }
+
+    if result.get('warning') is not None and not isinstance(result.get('warning'), str):
+        result['warning'] = str(result.get('warning'))
+
+    return result
 
 class GeminiService:
     def __init__(self):
         genai.configure(api_key=settings.GEMINI_API_KEY)
         self.model = genai.GenerativeModel(model_name='models/gemini-1.5-flash')
+        self.label_cache = MemoCache(
+            "extract_label",
+            settings.GEMINI_LABEL_CACHE_SIZE,
+            persist=settings.GEMINI_CACHE_PERSIST
+        )
+        self.image_cache = MemoCache(
+            "extract_label_from_image",
+            settings.GEMINI_IMAGE_CACHE_SIZE,
+            persist=settings.GEMINI_CACHE_PERSIST
+        )
+        self.image_phash_index = PerceptualHashIndex(
+            settings.GEMINI_IMAGE_CACHE_SIZE,
+            settings.GEMINI_IMAGE_PHASH_MAX_DISTANCE
+        ) if settings.GEMINI_IMAGE_CACHE_PERCEPTUAL else None
+        self.limiter = ConcurrencyLimiter("gemini", settings.GEMINI_MAX_CONCURRENCY)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, name: str, func, *args):
+        """Run a blocking model call on the Gemini executor behind the concurrency limiter, traced as `gemini.<name>`."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.limiter.limit,
+                thread_name_prefix="gemini"
+            )
+        with span(f"gemini.{name}"):
+            async with self.limiter:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    def shutdown(self) -> None:
+        """Release the executor threads. A new executor is created on next use."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def extract_label_from_image_async(self, file: bytes) -> str:
+        """Non-blocking extract_label_from_image. Cache hits are answered without queueing."""
+        if self.image_cache.contains(content_hash(file)):
+            return self.extract_label_from_image(file)
+        return await self._run("extract_label_from_image", self.extract_label_from_image, file)
+
+    async def extract_label_async(self, text: str) -> str:
+        """Non-blocking extract_label. Cache hits are answered without queueing."""
+        if self.label_cache.contains(normalize_text(text)):
+            return self.extract_label(text)
+        return await self._run("extract_label", self.extract_label, text)
+
+    async def filter_by_profile_async(self, medicine_data: str, profile_data: str) -> dict:
+        """Non-blocking filter_by_profile."""
+        return await self._run("filter_by_profile", self.filter_by_profile, medicine_data, profile_data)
+
+    async def extract_labels_async(self, texts: List[str]) -> List[Optional[str]]:
+        """Non-blocking extract_labels. Answered without queueing when every text is cached."""
+        if all(self.label_cache.contains(normalize_text(text)) for text in texts):
+            return self.extract_labels(texts)
+        return await self._run("extract_labels", self.extract_labels, texts)
+
+    async def filter_by_profile_batch_async(self, medicines_data: List[str], profile_data: str) -> List[dict]:
+        """Non-blocking filter_by_profile_batch."""
+        return await self._run("filter_by_profile_batch", self.filter_by_profile_batch, medicines_data, profile_data)
 
     def extract_label_from_image(self, file: bytes) -> str:
         """
         Extract generic drug name from an image using Gemini's vision model.
+        Results are cached by a hash of the image bytes and, in perceptual mode,
+        by a dHash of the decoded image.
         
         Args:
             file (bytes): Image file bytes containing medicine label/packaging
@@ -24,10 +134,24 @@ class GeminiService:
         Raises:
             ValueError: If no drug name could be extracted or image processing failed
         """
+        cache_key = content_hash(file)
+        cached = self.image_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
             # Read the image file
             image = Image.open(io.BytesIO(file))
-            print(f"[DEBUG] Image size: {image.size}")
+            logger.debug("Image size: %s", image.size)
+
+            phash = None
+            if self.image_phash_index is not None:
+                phash = dhash(image)
+                cached = self.image_phash_index.find(phash)
+                if cached is not None:
+                    self.image_cache.set(cache_key, cached)
+                    return cached
+
             prompt = """You are a pharmaceutical expert. Extract the generic drug name (active ingredient) from this medicine label or packaging image.
 
 Rules:
@@ -46,6 +170,9 @@ Rules:
             if extracted_name == "error":
                 raise ValueError("No valid drug name found in image")
             
+            self.image_cache.set(cache_key, extracted_name)
+            if phash is not None:
+                self.image_phash_index.add(phash, extracted_name)
             return extracted_name
 
         except Exception as e:
@@ -54,6 +181,7 @@ Rules:
     def extract_label(self, text: str) -> str:
         """
         Extract generic drug name from unstructured text using Gemini's generate endpoint.
+        Results are memoized by normalized query text, so repeat queries skip the model call.
         
         Args:
             text (str): Unstructured text containing drug information
@@ -83,6 +211,11 @@ Output: acetaminophen
 Input: "Random text with no medicine"
 Output: error"""
 
+        cache_key = normalize_text(text)
+        cached = self.label_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
             response = self.model.generate_content(prompt + "\n\nInput: " + text)
             # Get the generated text and clean it
@@ -93,6 +226,7 @@ Output: error"""
             if extracted_name == "error":
                 raise ValueError("No valid drug name found in text")
             
+            self.label_cache.set(cache_key, extracted_name)
             return extracted_name
 
         except Exception as e:
@@ -115,18 +249,7 @@ Return ONLY a JSON object with two fields:
 - can_take: boolean indicating if the medicine is safe
 - warning: string explaining any issues, or null if there are no issues
 
-Consider:
-- if allergies and conditions say positive things like "none", "healthy" and deny having anything, output it as safe
-- be more biased to not warn, rather than warn. make a warning after you make sure the warning is actually connected to an allergy or condition of the user
-- Patient allergies: only create a warning when the side effects of the medicine exactly match the allergies of the user
-- if the entries to allergies and conditions is nothing, the answer is most likely safe
-- if the ingredient you warn about is not in the user's profile, do not warn about it
-- Medical conditions
-- Current medications (potential interactions)
-- Age-related restrictions
-- Any other relevant safety concerns, however do not assume any concern that is not mentioned in the medical data of the user
-- if the person has not specified that they are pregnant, do not put a warning on that
-
+{considerations}
 Examples:
 Medicine: {{"name": "Aspirin", "description": "Blood thinner, pain reliever"}}
 Profile: {{"allergies": "aspirin, penicillin", "conditions": "none", "age": 45}}
@@ -145,7 +268,11 @@ Profile: {profile_data}"""
 
         try:
             response = self.model.generate_content(
-                prompt.format(medicine_data=medicine_data, profile_data=profile_data),
+                prompt.format(
+                    considerations=SAFETY_CONSIDERATIONS,
+                    medicine_data=medicine_data,
+                    profile_data=profile_data
+                ),
                 generation_config=genai.GenerationConfig(
                     response_mime_type="application/json",
                 )
@@ -153,25 +280,7 @@ Profile: {profile_data}"""
             
             try:
                 # Parse the JSON response
-                result = json.loads(response.text.strip())
-                
-                # Convert string 'true'/'false' to boolean if needed
-                can_take = result.get('can_take')
-                if isinstance(can_take, str):
-                    can_take = can_take.lower() == 'true'
-                    result['can_take'] = can_take
-                
-                # Ensure the response has the required fields
-                if not isinstance(result.get('can_take'), bool):
-                    return {
-                        "can_take": False,
-                        "warning": "Error analyzing medicine safety - invalid response format"
-                    }
-                
-                if result.get('warning') is not None and not isinstance(result.get('warning'), str):
-                    result['warning'] = str(result.get('warning'))
-                    
-                return result
+                return _normalize_verdict(json.loads(response.text.strip()))
                 
             except json.JSONDecodeError:
                 return {
@@ -183,4 +292,105 @@ Profile: {profile_data}"""
             return {
                 "can_take": False,
                 "warning": f"Error analyzing medicine safety: {str(e)}"
-            } 
\ No newline at end of file
+            }
+
+    def extract_labels(self, texts: List[str]) -> List[Optional[str]]:
+        """
+        Extract generic drug names for several texts with one structured model call.
+        Cached texts are answered from the label cache and left out of the prompt.
+
+        Args:
+            texts (List[str]): Unstructured texts, one medicine each
+
+        Returns:
+            List[Optional[str]]: Generic name per text, in order; None where none was found
+
+        Raises:
+            ValueError: If the model call fails or returns a malformed list
+        """
+        results: List[Optional[str]] = [self.label_cache.get(normalize_text(text)) for text in texts]
+        pending = [index for index, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        prompt = """You are a pharmaceutical expert. Extract the generic drug name (active ingredient) from each of the numbered texts below.
+
+Rules:
+- Convert brand names to their generic equivalent (e.g., Tylenol → acetaminophen)
+- Use lowercase generic names, international generic names when possible (e.g., paracetamol → acetaminophen)
+- If a text mentions multiple drugs, use only the primary active ingredient
+- If no valid drug name can be found in a text, use exactly "error" for it
+- Return ONLY a JSON array of strings with one entry per text, in the same order
+
+Texts:
+"""
+        prompt += "\n".join(f"{number}. {texts[index]}" for number, index in enumerate(pending, 1))
+
+        try:
+            response = self.model.generate_content(
+                prompt,
+                generation_config=genai.GenerationConfig(
+                    response_mime_type="application/json",
+                )
+            )
+            names = json.loads(response.text.strip())
+        except Exception as e:
+            raise ValueError(f"Failed to extract drug names: {str(e)}")
+        if not isinstance(names, list) or len(names) != len(pending):
+            raise ValueError("Failed to extract drug names: model returned a malformed list")
+
+        for index, name in zip(pending, names):
+            name = " ".join(str(name).strip().lower().split()) if name else "error"
+            if name == "error":
+                continue
+            self.label_cache.set(normalize_text(texts[index]), name)
+            results[index] = name
+        return results
+
+    def filter_by_profile_batch(self, medicines_data: List[str], profile_data: str) -> List[dict]:
+        """
+        Analyze several medicines for one patient with a single model call.
+
+        Args:
+            medicines_data (List[str]): JSON strings containing medicine information
+            profile_data (str): JSON string containing patient profile information
+
+        Returns:
+            List[dict]: One {'can_take', 'warning'} verdict per medicine, in order
+        """
+        prompt = """You are a medical safety assistant. For each numbered medicine below, analyze if it is safe for the patient based on their profile. Make a decision that a medicine is unsafe only if any allergies or conditions of the user match the warnings of that medicine. Only output a warning if you find one.
+
+Return ONLY a JSON array with one object per medicine, in the same order, each with two fields:
+- can_take: boolean indicating if the medicine is safe
+- warning: string explaining any issues, or null if there are no issues
+
+{considerations}
+Profile: {profile_data}
+
+Medicines:
+{medicines}"""
+        medicines = "\n".join(f"{number}. {data}" for number, data in enumerate(medicines_data, 1))
+
+        try:
+            response = self.model.generate_content(
+                prompt.format(
+                    considerations=SAFETY_CONSIDERATIONS,
+                    profile_data=profile_data,
+                    medicines=medicines
+                ),
+                generation_config=genai.GenerationConfig(
+                    response_mime_type="application/json",
+                )
+            )
+            verdicts = json.loads(response.text.strip())
+            if not isinstance(verdicts, list) or len(verdicts) != len(medicines_data):
+                raise ValueError("model returned a malformed list")
+            return [_normalize_verdict(verdict) for verdict in verdicts]
+        except Exception as e:
+            return [
+                {
+                    "can_take": False,
+                    "warning": f"Error analyzing medicine safety: {str(e)}"
+                }
+                for _ in medicines_data
+            ]
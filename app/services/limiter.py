@@ -0,0 +1,36 @@
+import asyncio
+import time
+from app.metrics import metrics
+
+
+class ConcurrencyLimiter:
+    """
+    Async semaphore that caps concurrent upstream calls and records how long
+    callers queue for a slot (`<name>.queue_wait_seconds`).
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def __aenter__(self) -> "ConcurrencyLimiter":
+        started = time.perf_counter()
+        self.waiting += 1
+        metrics.set_gauge(f"{self.name}.waiting", self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+            metrics.set_gauge(f"{self.name}.waiting", self.waiting)
+        metrics.observe(f"{self.name}.queue_wait_seconds", time.perf_counter() - started)
+        self.in_flight += 1
+        metrics.set_gauge(f"{self.name}.in_flight", self.in_flight)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.in_flight -= 1
+        metrics.set_gauge(f"{self.name}.in_flight", self.in_flight)
+        self._semaphore.release()
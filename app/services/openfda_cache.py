@@ -0,0 +1,138 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Optional, Set, Tuple
+from peewee import PeeweeException
+from app.config import settings
+from app.db_executor import run_db
+from app.models.fda_label_cache import FDALabelCache
+from app.services.cache import LRUCache
+from app.services.openfda_service import OpenFDAService, MedicineResult
+from app.utils import normalize_text
+from app.tracing import logger
+
+
+def normalize_generic_name(generic_name: str) -> str:
+    """Lowercase and collapse whitespace so equivalent labels share one cache key."""
+    return normalize_text(generic_name)
+
+
+class OpenFDALabelCache:
+    """
+    Two-tier cache in front of OpenFDAService, keyed by normalized generic name.
+
+    Entries are served from an in-process LRU first, then from the durable
+    `fda_label_cache` table. Entries younger than `ttl` are fresh. Entries older
+    than `ttl` but within `ttl + stale_ttl` are returned right away while a
+    background task refreshes them. Older entries are refetched inline.
+    Misses (no FDA match) are never cached.
+    """
+
+    def __init__(
+        self,
+        service: OpenFDAService,
+        ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None,
+        max_entries: Optional[int] = None
+    ):
+        self.service = service
+        self.ttl = settings.OPENFDA_CACHE_TTL if ttl is None else ttl
+        self.stale_ttl = settings.OPENFDA_CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+        self.memory = LRUCache(settings.OPENFDA_CACHE_MAX_ENTRIES if max_entries is None else max_entries)
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _age(self, fetched_at: datetime) -> float:
+        return (datetime.now() - fetched_at).total_seconds()
+
+    def _load_stored(self, key: str) -> Optional[Tuple[MedicineResult, datetime]]:
+        try:
+            row = FDALabelCache.get_or_none(FDALabelCache.generic_name == key)
+        except PeeweeException as e:
+            logger.warning("Error reading label cache: %s", e)
+            return None
+        if row is None:
+            return None
+        entry = (json.loads(row.data), row.fetched_at)
+        self.memory.set(key, entry)
+        return entry
+
+    async def _load(self, key: str) -> Optional[Tuple[MedicineResult, datetime]]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry
+        return await run_db(self._load_stored, key)
+
+    def _persist(self, key: str, data: MedicineResult, fetched_at: datetime) -> None:
+        try:
+            FDALabelCache.replace(
+                generic_name=key,
+                data=json.dumps(data),
+                fetched_at=fetched_at
+            ).execute()
+        except PeeweeException as e:
+            logger.warning("Error writing label cache: %s", e)
+
+    async def _store(self, key: str, data: MedicineResult) -> None:
+        fetched_at = datetime.now()
+        self.memory.set(key, (data, fetched_at))
+        await run_db(self._persist, key, data, fetched_at)
+
+    async def _fetch(self, key: str) -> Optional[MedicineResult]:
+        data = await self.service.find_medicine_by_label_async(key)
+        if data:
+            await self._store(key, data)
+        return data
+
+    async def _refresh(self, key: str) -> None:
+        try:
+            await self._fetch(key)
+        finally:
+            self._refreshing.discard(key)
+
+    def _schedule_refresh(self, key: str) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def find_medicine_by_label(self, generic_name: str) -> Optional[MedicineResult]:
+        """
+        Cached equivalent of OpenFDAService.find_medicine_by_label_async.
+
+        Args:
+            generic_name (str): The generic name of the medicine to search for.
+
+        Returns:
+            Optional[MedicineResult]: The cached or freshly fetched label, or None if not found.
+        """
+        key = normalize_generic_name(generic_name)
+        entry = await self._load(key)
+        if entry is not None:
+            data, fetched_at = entry
+            age = self._age(fetched_at)
+            if age <= self.ttl:
+                return data
+            if age <= self.ttl + self.stale_ttl:
+                self._schedule_refresh(key)
+                return data
+        return await self._fetch(key)
+
+    def invalidate(self, generic_name: str) -> None:
+        """Drop a label from both cache tiers."""
+        key = normalize_generic_name(generic_name)
+        self.memory.pop(key)
+        FDALabelCache.delete().where(FDALabelCache.generic_name == key).execute()
+
+    async def aclose(self) -> None:
+        """Cancel background refreshes that are still running."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def clear_memory(self) -> None:
+        """Empty the in-process tier; the durable tier is left untouched."""
+        self.memory.clear()
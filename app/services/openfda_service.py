@@ -1,6 +1,9 @@
 import httpx
 from app.config import settings
+from app.db_executor import run_db
 import requests
+from app.services.fda_label_store import LocalLabelStore
+from app.tracing import logger, span
 from typing import TypedDict, List, Optional, Union
 
 class OpenFDAInfo(TypedDict):
@@ -44,10 +47,47 @@ class MedicineResult(TypedDict):
 class OpenFDAService:
     def __init__(self):
         self.base_url = "https://api.fda.gov/drug"
+        self._client: Optional[httpx.AsyncClient] = None
+        # Labels imported from the OpenFDA bulk dumps are served without a network call
+        self.local_store = LocalLabelStore() if settings.OPENFDA_LOCAL_STORE else None
+
+    def _find_local(self, generic_name: str) -> Optional[MedicineResult]:
+        if self.local_store is None:
+            return None
+        return self.local_store.find_by_name(generic_name)
+
+    def _client_options(self) -> dict:
+        return {
+            "timeout": httpx.Timeout(
+                settings.OPENFDA_TIMEOUT,
+                connect=settings.OPENFDA_CONNECT_TIMEOUT
+            ),
+            "limits": httpx.Limits(
+                max_connections=settings.OPENFDA_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENFDA_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.OPENFDA_KEEPALIVE_EXPIRY
+            ),
+        }
+
+    async def open(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        """
+        Create the shared, pooled async client. Called once from the app lifespan.
+
+        Args:
+            transport (Optional[httpx.AsyncBaseTransport]): Custom transport, mainly for tests.
+        """
+        if self._client is None:
+            self._client = httpx.AsyncClient(transport=transport, **self._client_options())
+
+    async def aclose(self) -> None:
+        """Close the shared client and release its pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     def find_medicine_by_label(self, generic_name: str) -> Optional[MedicineResult]:
         """
-        Finds a medicine by its generic name using the OpenFDA API.
+        Finds a medicine by its generic name, checking the local label store before the OpenFDA API.
 
         Args:
             generic_name (str): The generic name of the medicine to search for.
@@ -55,6 +95,10 @@ class OpenFDAService:
         Returns:
             Optional[MedicineResult]: A dictionary containing the medicine data, or None if not found.
         """
+        local = self._find_local(generic_name)
+        if local is not None:
+            return local
+
         base_url = "https://api.fda.gov/drug/label.json"
         params = {
             "search": f"openfda.generic_name:{generic_name}",
@@ -64,12 +108,51 @@ class OpenFDAService:
             response = requests.get(base_url, params=params)
             response.raise_for_status()
             data = response.json()
-            print(data)
             if data["meta"]["results"]["total"] > 0:
                 return data["results"][0]
             else:
                 return None
 
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching medicine data: {e}")
-            return None
\ No newline at end of file
+            logger.warning("Error fetching medicine data: %s", e)
+            return None
+
+    async def find_medicine_by_label_async(self, generic_name: str) -> Optional[MedicineResult]:
+        """
+        Non-blocking variant of find_medicine_by_label using the shared pooled client.
+
+        Checks the local label store first. Falls back to a short-lived client if the
+        service was not opened by the lifespan.
+
+        Args:
+            generic_name (str): The generic name of the medicine to search for.
+
+        Returns:
+            Optional[MedicineResult]: A dictionary containing the medicine data, or None if not found.
+        """
+        local = await run_db(self._find_local, generic_name) if self.local_store else None
+        if local is not None:
+            return local
+
+        url = f"{self.base_url}/label.json"
+        params = {
+            "search": f"openfda.generic_name:{generic_name}",
+        }
+
+        try:
+            with span("fda.http"):
+                if self._client is not None:
+                    response = await self._client.get(url, params=params)
+                else:
+                    async with httpx.AsyncClient(**self._client_options()) as client:
+                        response = await client.get(url, params=params)
+                response.raise_for_status()
+                data = response.json()
+            if data["meta"]["results"]["total"] > 0:
+                return data["results"][0]
+            else:
+                return None
+
+        except httpx.HTTPError as e:
+            logger.warning("Error fetching medicine data: %s", e)
+            return None
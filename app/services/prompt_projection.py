@@ -0,0 +1,129 @@
+"""
+Compact, deterministic documents for the safety prompts.
+
+A raw OpenFDA label carries packaging, storage, NDC lists and SPL metadata that
+never change a safety verdict but dominate prompt size. The projections below
+keep only the sections and profile fields the safety check reads, in a fixed
+order, so the same label and profile always yield the same prompt text.
+"""
+import json
+from typing import Any, Dict, Optional
+from app.config import settings
+from app.metrics import metrics
+from app.models.profile import PersonalProfile, MedicalData
+
+# Identity fields from the label's `openfda` block
+IDENTITY_FIELDS = ("generic_name", "brand_name", "substance_name", "route")
+
+# Safety-relevant label sections, most important first; when the label budget
+# runs out the later sections are dropped. The ingredient lists come right after
+# the core warnings: allergy checks depend on them, so they must survive the cut
+LABEL_SECTIONS = (
+    "boxed_warning",
+    "contraindications",
+    "do_not_use",
+    "warnings",
+    "active_ingredient",
+    "inactive_ingredient",
+    "warnings_and_cautions",
+    "ask_doctor",
+    "ask_doctor_or_pharmacist",
+    "when_using",
+    "stop_use",
+    "drug_interactions",
+    "pregnancy_or_breast_feeding",
+    "pregnancy",
+    "nursing_mothers",
+    "pediatric_use",
+    "geriatric_use",
+    "purpose",
+    "indications_and_usage",
+)
+
+# Average characters per token for English prompt text
+CHARS_PER_TOKEN = 4
+
+
+def _text(value: Any) -> str:
+    """Flatten an OpenFDA field (usually a list of paragraphs) into one line."""
+    if isinstance(value, list):
+        value = " ".join(str(item) for item in value)
+    return " ".join(str(value).split())
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+    return text[:max_chars - 1].rstrip() + "…"
+
+
+def project_label(
+    label: dict,
+    section_max_chars: int = None,
+    label_max_chars: int = None
+) -> Dict[str, str]:
+    """
+    Project an OpenFDA label onto its safety-relevant sections.
+
+    Args:
+        label (dict): Raw OpenFDA label
+        section_max_chars (int): Cap per section, 0 for no cap
+        label_max_chars (int): Cap on all section text together, 0 for no cap
+
+    Returns:
+        dict: Identity fields followed by the sections present on the label
+    """
+    if section_max_chars is None:
+        section_max_chars = settings.PROMPT_SECTION_MAX_CHARS
+    if label_max_chars is None:
+        label_max_chars = settings.PROMPT_LABEL_MAX_CHARS
+
+    openfda = label.get("openfda") or {}
+    document = {field: _text(openfda[field]) for field in IDENTITY_FIELDS if openfda.get(field)}
+
+    remaining = label_max_chars if label_max_chars > 0 else None
+    for section in LABEL_SECTIONS:
+        if not label.get(section):
+            continue
+        text = _truncate(_text(label[section]), section_max_chars)
+        if remaining is not None:
+            if remaining <= 0:
+                break
+            text = _truncate(text, remaining)
+            remaining -= len(text)
+        document[section] = text
+    return document
+
+
+def project_profile(
+    profile: Optional[PersonalProfile],
+    medical_data: Optional[MedicalData]
+) -> Dict[str, Any]:
+    """
+    The profile fields that can change a safety verdict, the same ones
+    `profile_fingerprint` hashes; ids, names, contact details and timestamps
+    are left out.
+    """
+    return {
+        "age": profile.age if profile else None,
+        "gender": profile.gender if profile else None,
+        "allergies": medical_data.allergies if medical_data else None,
+        "conditions": medical_data.conditions if medical_data else None,
+        "preferred_medication_type": medical_data.preferred_medication_type if medical_data else None,
+    }
+
+
+def to_prompt_json(document: dict) -> str:
+    """Deterministic, whitespace-free JSON for a prompt."""
+    return json.dumps(document, separators=(",", ":"), ensure_ascii=False)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, good enough to compare prompt sizes."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def record_size(kind: str, raw: str, compact: str) -> None:
+    """Record estimated tokens before and after projection as `prompt.<kind>_tokens_*`."""
+    metrics.observe(f"prompt.{kind}_tokens_raw", estimate_tokens(raw))
+    metrics.observe(f"prompt.{kind}_tokens_compact", estimate_tokens(compact))
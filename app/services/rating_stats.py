@@ -0,0 +1,143 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from peewee import Case, fn
+from app.models.medicine import Medicine
+from app.models.medicine_rating import MedicineRating
+from app.models.review import Review
+
+HISTOGRAM_FIELDS = {
+    1: MedicineRating.rating_1,
+    2: MedicineRating.rating_2,
+    3: MedicineRating.rating_3,
+    4: MedicineRating.rating_4,
+    5: MedicineRating.rating_5,
+}
+
+
+def record_review(medicine_id: int, rating: int, sentiment_score: Optional[float]) -> None:
+    """
+    Fold one new review into its medicine's aggregate row with a single upsert.
+
+    Call inside the transaction that inserts the review so both commit together.
+    """
+    record_reviews([(medicine_id, rating, sentiment_score)])
+
+
+def record_reviews(reviews: Iterable[Tuple[int, int, Optional[float]]]) -> None:
+    """
+    Fold new (medicine_id, rating, sentiment_score) reviews into the aggregates,
+    one upsert per medicine. Call inside the transaction that inserts the reviews.
+    """
+    deltas: Dict[int, dict] = defaultdict(lambda: {
+        "count": 0, "sum": 0, "sentiment_sum": 0.0, "sentiment_count": 0,
+        "buckets": defaultdict(int),
+    })
+    for medicine_id, rating, sentiment_score in reviews:
+        delta = deltas[medicine_id]
+        delta["count"] += 1
+        delta["sum"] += rating
+        delta["buckets"][rating] += 1
+        if sentiment_score is not None:
+            delta["sentiment_sum"] += sentiment_score
+            delta["sentiment_count"] += 1
+
+    now = datetime.now()
+    for medicine_id, delta in deltas.items():
+        buckets = {HISTOGRAM_FIELDS[rating]: count for rating, count in delta["buckets"].items()}
+        MedicineRating.insert(
+            medicine=medicine_id,
+            review_count=delta["count"],
+            rating_sum=delta["sum"],
+            average_rating=delta["sum"] / delta["count"],
+            sentiment_sum=delta["sentiment_sum"],
+            sentiment_count=delta["sentiment_count"],
+            updated_at=now,
+            **{field.name: count for field, count in buckets.items()}
+        ).on_conflict(
+            conflict_target=[MedicineRating.medicine],
+            update={
+                MedicineRating.review_count: MedicineRating.review_count + delta["count"],
+                MedicineRating.rating_sum: MedicineRating.rating_sum + delta["sum"],
+                MedicineRating.average_rating: (
+                    (MedicineRating.rating_sum + delta["sum"]).cast('REAL')
+                    / (MedicineRating.review_count + delta["count"])
+                ),
+                **{field: field + count for field, count in buckets.items()},
+                MedicineRating.sentiment_sum: MedicineRating.sentiment_sum + delta["sentiment_sum"],
+                MedicineRating.sentiment_count: MedicineRating.sentiment_count + delta["sentiment_count"],
+                MedicineRating.updated_at: now,
+            }
+        ).execute()
+
+
+def rebuild() -> int:
+    """
+    Recompute every aggregate from the reviews table in one GROUP BY pass.
+
+    Returns:
+        int: Number of medicines with at least one review.
+    """
+    query = Review.select(
+        Review.medicine,
+        fn.COUNT(Review.id),
+        fn.SUM(Review.rating),
+        fn.AVG(Review.rating),
+        *[fn.SUM(Case(None, [(Review.rating == value, 1)], 0)) for value in HISTOGRAM_FIELDS],
+        fn.TOTAL(Review.sentiment_score),
+        fn.COUNT(Review.sentiment_score),
+        fn.DATETIME('now', 'localtime'),
+    ).group_by(Review.medicine)
+    fields = [
+        MedicineRating.medicine,
+        MedicineRating.review_count,
+        MedicineRating.rating_sum,
+        MedicineRating.average_rating,
+        *HISTOGRAM_FIELDS.values(),
+        MedicineRating.sentiment_sum,
+        MedicineRating.sentiment_count,
+        MedicineRating.updated_at,
+    ]
+    with MedicineRating._meta.database.atomic():
+        MedicineRating.delete().execute()
+        MedicineRating.insert_from(query, fields).execute()
+        return MedicineRating.select().count()
+
+
+def to_stats(medicine_id: int, row: Optional[MedicineRating]) -> dict:
+    """Serialize an aggregate row; a medicine without reviews gets zeroed stats."""
+    if row is None:
+        return {
+            "medicine_id": medicine_id,
+            "review_count": 0,
+            "average_rating": None,
+            "histogram": {str(value): 0 for value in HISTOGRAM_FIELDS},
+            "average_sentiment": None,
+        }
+    return {
+        "medicine_id": medicine_id,
+        "review_count": row.review_count,
+        "average_rating": row.average_rating if row.review_count else None,
+        "histogram": {str(value): getattr(row, field.name) for value, field in HISTOGRAM_FIELDS.items()},
+        "average_sentiment": row.sentiment_sum / row.sentiment_count if row.sentiment_count else None,
+    }
+
+
+def get_stats(medicine_id: int) -> dict:
+    """Rating summary for one medicine: a primary key lookup, independent of review volume."""
+    return to_stats(medicine_id, MedicineRating.get_or_none(MedicineRating.medicine == medicine_id))
+
+
+def top_rated(limit: int, min_reviews: int = 1) -> List[dict]:
+    """Medicines ordered by average rating, ties broken by review count."""
+    query = (
+        MedicineRating.select(MedicineRating, Medicine)
+        .join(Medicine)
+        .where(MedicineRating.review_count >= min_reviews)
+        .order_by(MedicineRating.average_rating.desc(), MedicineRating.review_count.desc(), Medicine.id)
+        .limit(limit)
+    )
+    return [
+        {"medicine": row.medicine.__data__, "stats": to_stats(row.medicine.id, row)}
+        for row in query
+    ]
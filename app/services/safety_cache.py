@@ -0,0 +1,95 @@
+import hashlib
+import json
+from threading import RLock
+from typing import Dict, Optional, Set, Tuple
+from app.config import settings
+from app.models.profile import PersonalProfile, MedicalData
+from app.services.cache import LRUCache
+from app.utils import normalize_text
+
+SafetyKey = Tuple[int, str, str, str]
+
+
+def profile_fingerprint(
+    profile: Optional[PersonalProfile],
+    medical_data: Optional[MedicalData]
+) -> str:
+    """
+    Stable hash of the profile fields that can change a safety verdict.
+
+    Ids, names, contact details and timestamps are left out on purpose.
+    """
+    fields = {
+        "age": profile.age if profile else None,
+        "gender": normalize_text(profile.gender) if profile and profile.gender else None,
+        "allergies": normalize_text(medical_data.allergies) if medical_data and medical_data.allergies else None,
+        "conditions": normalize_text(medical_data.conditions) if medical_data and medical_data.conditions else None,
+        "preferred_medication_type": (
+            normalize_text(medical_data.preferred_medication_type)
+            if medical_data and medical_data.preferred_medication_type else None
+        ),
+    }
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+def is_error_verdict(verdict: dict) -> bool:
+    """filter_by_profile reports failures as an unsafe verdict; those must not be cached."""
+    warning = verdict.get("warning") or ""
+    return warning.startswith("Error analyzing medicine safety")
+
+
+class SafetyVerdictCache:
+    """
+    Cache of filter_by_profile verdicts.
+
+    Keyed by user, FDA label identity (`id`, `version`) and the profile
+    fingerprint, and indexed by user so profile edits can drop exactly that
+    user's entries. Keys leave the index when the LRU evicts them, so it is
+    bounded by the cache size.
+    """
+
+    def __init__(self, max_size: int):
+        self.memory = LRUCache(max_size, on_evict=self._evicted)
+        self._by_user: Dict[int, Set[SafetyKey]] = {}
+        # Reentrant: eviction callbacks fire inside `set` while it is held
+        self._lock = RLock()
+
+    def _evicted(self, key: SafetyKey, verdict: dict) -> None:
+        with self._lock:
+            keys = self._by_user.get(key[0])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[key[0]]
+
+    def _key(self, user_id: int, medicine_data: dict, fingerprint: str) -> SafetyKey:
+        return (user_id, str(medicine_data.get("id")), str(medicine_data.get("version")), fingerprint)
+
+    def get(self, user_id: int, medicine_data: dict, fingerprint: str) -> Optional[dict]:
+        return self.memory.get(self._key(user_id, medicine_data, fingerprint))
+
+    def set(self, user_id: int, medicine_data: dict, fingerprint: str, verdict: dict) -> None:
+        if is_error_verdict(verdict):
+            return
+        key = self._key(user_id, medicine_data, fingerprint)
+        with self._lock:
+            self._by_user.setdefault(user_id, set()).add(key)
+            self.memory.set(key, dict(verdict))
+
+    def invalidate_user(self, user_id: int) -> int:
+        """Drop every cached verdict for a user. Returns the number of entries removed."""
+        with self._lock:
+            keys = self._by_user.pop(user_id, set())
+        removed = 0
+        for key in keys:
+            if self.memory.pop(key) is not None:
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        self.memory.clear()
+        with self._lock:
+            self._by_user.clear()
+
+
+safety_verdict_cache = SafetyVerdictCache(settings.SAFETY_CACHE_SIZE)
@@ -0,0 +1,179 @@
+"""
+Rule-based safety pre-screen that runs ahead of the model safety check.
+
+Profile allergies and conditions are split into terms and matched against the
+label in one pass with an Aho-Corasick automaton. Only the clear-cut outcomes
+are decided locally:
+
+- an allergy that names one of the label's ingredients: unsafe;
+- no allergies or conditions at all (empty, "none", "no known allergies"...):
+  safe, which is what the safety prompt tells the model to answer.
+
+Age is never cleared locally: a patient under 18 or over 65, or a label with a
+boxed warning, a pediatric section or an age limit in its text, always goes to
+the model. Everything else is ambiguous and goes to the model too. How each
+check was settled is counted under `safety_prescreen.*`.
+"""
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+from app.config import settings
+from app.metrics import metrics
+from app.models.profile import PersonalProfile, MedicalData
+from app.services.prompt_projection import IDENTITY_FIELDS, LABEL_SECTIONS, project_label
+
+# Whole entries that deny having anything
+DENIALS = {
+    "none", "no", "n a", "na", "nil", "nothing", "null", "healthy", "nka", "nkda",
+    "no allergies", "no known allergies", "no known drug allergies", "no conditions",
+    "none known", "not applicable",
+}
+# Filler words dropped from a term ("allergic to penicillin" -> "penicillin")
+FILLER_WORDS = {"allergy", "allergies", "allergic", "to", "mild", "severe", "history", "of"}
+SEPARATORS = re.compile(r"[,;/\n]|\band\b|\bor\b")
+
+# Label fields that name what the medicine contains
+INGREDIENT_FIELDS = ("generic_name", "substance_name", "active_ingredient", "inactive_ingredient")
+
+# Patients outside this age range are always checked by the model
+MIN_ADULT_AGE = 18
+MAX_ADULT_AGE = 65
+# Label sections whose presence alone sends the check to the model
+AGE_SENSITIVE_SECTIONS = ("boxed_warning", "pediatric_use", "geriatric_use")
+# Dosing or restrictions that depend on the patient's age
+AGE_LIMIT_TEXT = re.compile(
+    r"\b(?:children|child|infants?|adults?|persons?|patients?|adolescents?)\s+(?:under|over|younger than|older than|\d+)"
+    r"|\b(?:under|over|younger than|older than)\s+\d+\s*(?:years?|yrs?|months?)"
+    r"|\b\d+\s*(?:years?|yrs?)\s+(?:of age\s+)?(?:and|or)\s+(?:older|over|under|younger)"
+    r"|\bages?\s+\d+"
+    r"|\bnot for (?:use in )?(?:children|infants|pediatric)",
+    re.IGNORECASE
+)
+
+
+def _normalize(text: str) -> str:
+    """Lowercase, punctuation to spaces, whitespace collapsed."""
+    return " ".join(re.sub(r"[^\w]+", " ", text.lower()).split())
+
+
+def profile_terms(text: Optional[str]) -> List[str]:
+    """Split a free-text allergies/conditions entry into normalized terms, denials dropped."""
+    if not text or _normalize(text) in DENIALS:
+        return []
+    terms = []
+    for part in SEPARATORS.split(text.lower()):
+        words = [word for word in _normalize(part).split() if word not in FILLER_WORDS]
+        term = " ".join(words)
+        if term and term not in DENIALS and term not in terms:
+            terms.append(term)
+    return terms
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over whole-word patterns.
+
+    `find` scans a text once, however many patterns there are, and returns the
+    patterns that occur in it as complete words.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[str]] = [set()]
+        for pattern in patterns:
+            self._add(pattern)
+        self._link()
+
+    def _add(self, pattern: str) -> None:
+        state = 0
+        # Padding with spaces anchors matches to word boundaries
+        for char in f" {pattern} ":
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].add(pattern)
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] |= self._output[self._fail[child]]
+
+    def find(self, text: str) -> Set[str]:
+        found = set()
+        state = 0
+        for char in f" {_normalize(text)} ":
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            found |= self._output[state]
+        return found
+
+
+def _find(matcher: KeywordMatcher, label: Dict[str, str], fields: Iterable[str]) -> Set[str]:
+    # Each field is scanned on its own so a term never matches across two fields
+    found = set()
+    for field in fields:
+        if field in label:
+            found |= matcher.find(label[field])
+    return found
+
+
+def age_sensitive(label: Dict[str, str], profile: Optional[PersonalProfile]) -> bool:
+    """Whether the verdict may depend on the patient's age, which only the model weighs."""
+    age = profile.age if profile else None
+    if age is None or age < MIN_ADULT_AGE or age > MAX_ADULT_AGE:
+        return True
+    if any(section in label for section in AGE_SENSITIVE_SECTIONS):
+        return True
+    return any(AGE_LIMIT_TEXT.search(label[section]) for section in LABEL_SECTIONS if section in label)
+
+
+def prescreen(
+    medicine_data: dict,
+    profile: Optional[PersonalProfile],
+    medical_data: Optional[MedicalData]
+) -> Optional[dict]:
+    """
+    Settle a safety check locally when the outcome is clear-cut.
+
+    Returns:
+        dict: A {'can_take', 'warning'} verdict, or None when the model must decide
+    """
+    allergies = profile_terms(medical_data.allergies if medical_data else None)
+    conditions = profile_terms(medical_data.conditions if medical_data else None)
+    label = project_label(medicine_data, section_max_chars=0, label_max_chars=0)
+
+    allergens = sorted(_find(KeywordMatcher(allergies), label, INGREDIENT_FIELDS)) if allergies else []
+    if allergens:
+        metrics.incr("safety_prescreen.local_unsafe")
+        return {
+            "can_take": False,
+            "warning": f"Patient is allergic to {', '.join(allergens)}, an ingredient of this medicine - DO NOT TAKE"
+        }
+
+    if age_sensitive(label, profile):
+        metrics.incr("safety_prescreen.escalated")
+        return None
+
+    if not allergies and not conditions:
+        metrics.incr("safety_prescreen.local_safe")
+        return {"can_take": True, "warning": None}
+
+    if settings.SAFETY_PRESCREEN_CLEAR_UNMATCHED:
+        if not _find(KeywordMatcher(allergies + conditions), label, (*IDENTITY_FIELDS, *LABEL_SECTIONS)):
+            metrics.incr("safety_prescreen.local_safe")
+            return {"can_take": True, "warning": None}
+
+    metrics.incr("safety_prescreen.escalated")
+    return None
@@ -0,0 +1,60 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from app.metrics import metrics
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one upstream call.
+
+    The first caller for a key starts `fn` as a detached task; every caller,
+    the first included, awaits it through a shield and receives its result or
+    its exception. A cancelled caller only stops waiting: the call keeps
+    running for the others and is cancelled once nobody waits for it.
+    Nothing is remembered once the call settles, so this is not a cache.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _settled(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved in case nobody was waiting any more
+        if not call.task.cancelled():
+            call.task.exception()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is not None:
+            metrics.incr(f"{self.name}.coalesced")
+        else:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._settled(key, call))
+            metrics.incr(f"{self.name}.executed")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                # Last one waiting: drop the call so later callers start afresh
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
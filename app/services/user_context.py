@@ -0,0 +1,32 @@
+from typing import NamedTuple, Optional
+from peewee import JOIN
+from app.models.user import User
+from app.models.profile import PersonalProfile, MedicalData
+
+
+class UserContext(NamedTuple):
+    user: User
+    profile: Optional[PersonalProfile]
+    medical_data: Optional[MedicalData]
+
+
+def load_user_context(user_id: int) -> UserContext:
+    """
+    Load a user with their profile and medical data in one LEFT JOIN query.
+
+    The join is filtered on the user's primary key and follows the unique
+    profile/medical indexes, so the cost does not grow with the number of users.
+
+    Raises:
+        DoesNotExist: If the user does not exist.
+    """
+    user = (
+        User.select(User, PersonalProfile, MedicalData)
+        .join(PersonalProfile, JOIN.LEFT_OUTER, on=(PersonalProfile.user == User.id), attr="loaded_profile")
+        .join(MedicalData, JOIN.LEFT_OUTER, on=(MedicalData.profile == PersonalProfile.id), attr="loaded_medical_data")
+        .where(User.id == user_id)
+        .get()
+    )
+    profile = getattr(user, "loaded_profile", None)
+    medical_data = getattr(profile, "loaded_medical_data", None) if profile else None
+    return UserContext(user, profile, medical_data)
@@ -0,0 +1,152 @@
+"""
+Per-request tracing and application logging.
+
+`TracingMiddleware` gives every HTTP request a Trace; code on the request's
+path wraps its DB jobs, Gemini and OpenFDA calls, pipeline stages and
+serialization in `span(...)`. Spans are reported back in a `Server-Timing`
+header (durations summed per span name) and, with TRACE_DUMP on, logged as
+one JSON line per request on the `medipedia.trace` logger.
+
+Spans and log records never carry payloads; only names, durations and small
+attributes such as ids and counts.
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from starlette.datastructures import MutableHeaders
+from app.config import settings
+
+logger = logging.getLogger("medipedia")
+trace_logger = logging.getLogger("medipedia.trace")
+
+
+def configure_logging() -> None:
+    """Apply LOG_LEVEL to the app loggers, adding a stderr handler unless one is configured."""
+    logger.setLevel(settings.LOG_LEVEL)
+    # Trace dumps are logged at INFO, below the default LOG_LEVEL of WARNING
+    trace_logger.setLevel(logging.INFO if settings.TRACE_DUMP else logging.NOTSET)
+    if not logger.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        logger.addHandler(handler)
+
+
+class Span:
+    __slots__ = ("name", "start", "duration", "attrs")
+
+    def __init__(self, name: str, start: float, duration: float, attrs: Dict[str, Any]):
+        self.name = name
+        self.start = start
+        self.duration = duration
+        self.attrs = attrs
+
+
+class Trace:
+    """Spans recorded while serving one request, timed relative to its start."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.spans: List[Span] = []
+
+    def add(self, name: str, started: float, duration: float, attrs: Dict[str, Any]) -> None:
+        self.spans.append(Span(name, started - self.started, duration, attrs))
+
+    def elapsed(self) -> float:
+        return self.duration if self.duration is not None else time.perf_counter() - self.started
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Server-Timing value: total duration so far, then each span name's summed duration."""
+        totals: Dict[str, List[float]] = {}
+        for span in self.spans:
+            entry = totals.setdefault(span.name, [0.0, 0])
+            entry[0] += span.duration
+            entry[1] += 1
+        metrics = [f"total;dur={self.elapsed() * 1000:.1f}"]
+        for name, (duration, count) in totals.items():
+            description = f';desc="x{count}"' if count > 1 else ""
+            metrics.append(f"{name};dur={duration * 1000:.1f}{description}")
+        return ", ".join(metrics)
+
+    def to_dict(self) -> dict:
+        return {
+            "duration_ms": round(self.elapsed() * 1000, 3),
+            "spans": [
+                {
+                    "name": span.name,
+                    "start_ms": round(span.start * 1000, 3),
+                    "duration_ms": round(span.duration * 1000, 3),
+                    **span.attrs,
+                }
+                for span in self.spans
+            ],
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    """
+    Time a block as a span of the current request's trace.
+
+    A no-op outside a traced request. Executor threads do not inherit the
+    request context, so wrap the awaiting side of a thread hand-off, not the
+    code running on the thread.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, started, time.perf_counter() - started, attrs)
+
+
+class TracingMiddleware:
+    """ASGI middleware that traces each HTTP request and adds a Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        status = {}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if settings.SERVER_TIMING_ENABLED:
+                    MutableHeaders(scope=message).append("Server-Timing", trace.server_timing())
+            await send(message)
+
+        token = _current_trace.set(trace)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            trace.finish()
+            if settings.TRACE_DUMP:
+                trace_logger.info(json.dumps({
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status.get("code"),
+                    **trace.to_dict(),
+                }))
@@ -1,3 +1,7 @@
 def convert_to_string(instance) -> str:
     """Convert model instance data to a space-separated string"""
-    return " ".join(str(value) for value in instance.__data__.values()) 
\ No newline at end of file
+    return " ".join(str(value) for value in instance.__data__.values()) 
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace, used to build cache keys from free text"""
+    return " ".join(text.strip().lower().split())
@@ -11,13 +11,20 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
 from app.main import app
+from app.config import settings
 from app.database import test_db as db
 from app.models.user import User
 from app.models.profile import PersonalProfile, MedicalData
 from app.models.medicine import Medicine
 from app.models.review import Review
+from app.models.medicine_rating import MedicineRating
 from app.models.favorites import Favorite
+from app.models.fda_label_cache import FDALabelCache
+from app.models.gemini_cache import GeminiCache
+from app.models.fda_label import FDALabel, FDALabelName
 from app.services.gemini_service import GeminiService
+from app.api.v1.endpoints import medicines
+from app.services.safety_cache import safety_verdict_cache
 
 @pytest.fixture
 def mock_gemini_model():
@@ -60,13 +67,34 @@ def client():
 
 @pytest.fixture(scope="function")
 def test_db():
-    db.bind([User, PersonalProfile, MedicalData, Medicine, Review, Favorite], bind_refs=False, bind_backrefs=False)
+    db.bind([User, PersonalProfile, MedicalData, Medicine, Review, MedicineRating, Favorite, FDALabelCache, GeminiCache, FDALabel, FDALabelName], bind_refs=False, bind_backrefs=False)
     db.connect()
-    db.create_tables([User, PersonalProfile, MedicalData, Medicine, Review, Favorite])
+    db.create_tables([User, PersonalProfile, MedicalData, Medicine, Review, MedicineRating, Favorite, FDALabelCache, GeminiCache, FDALabel, FDALabelName])
     yield db
-    db.drop_tables([User, PersonalProfile, MedicalData, Medicine, Review, Favorite])
+    db.drop_tables([User, PersonalProfile, MedicalData, Medicine, Review, MedicineRating, Favorite, FDALabelCache, GeminiCache, FDALabel, FDALabelName])
     db.close()
 
+@pytest.fixture(autouse=True)
+def reset_service_caches():
+    # Module-level service caches outlive a single test; start each test cold
+    medicines.openfda_cache.clear_memory()
+    medicines.gemini_service.label_cache.clear()
+    medicines.gemini_service.image_cache.clear()
+    safety_verdict_cache.clear()
+    medicines.brand_resolver.clear()
+    yield
+    medicines.openfda_cache.clear_memory()
+    medicines.gemini_service.label_cache.clear()
+    medicines.gemini_service.image_cache.clear()
+    safety_verdict_cache.clear()
+    medicines.brand_resolver.clear()
+
+@pytest.fixture
+def no_prescreen():
+    # Send every safety check to the (mocked) model, even clear-cut ones
+    with patch.object(settings, "SAFETY_PRESCREEN_ENABLED", False):
+        yield
+
 @pytest.fixture
 def test_user(test_db):
     user = User.create(email="test@example.com")
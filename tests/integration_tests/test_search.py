@@ -2,13 +2,19 @@ import pytest
 from unittest.mock import patch
 from app.models.medicine import Medicine
 from app.models.review import Review
+from app.api.v1.endpoints import medicines
+from app.config import settings
+from app.metrics import metrics
+import asyncio
 import io
+import threading
+import json
 from PIL import Image
 
 def test_display_list_success(client, test_user, test_profile, mock_openfda_full_response):
     with patch('app.services.gemini_service.GeminiService.extract_label') as mock_extract, \
          patch('app.services.gemini_service.GeminiService.filter_by_profile') as mock_filter, \
-         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label') as mock_find:
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
         
         mock_extract.return_value = "ibuprofen"
         mock_find.return_value = mock_openfda_full_response["results"][0]
@@ -32,7 +38,7 @@ def test_display_list_success(client, test_user, test_profile, mock_openfda_full
 def test_display_list_with_existing_medicine(client, test_user, test_profile, test_medicine, test_review, mock_openfda_full_response, test_db):
     with patch('app.services.gemini_service.GeminiService.extract_label') as mock_extract, \
          patch('app.services.gemini_service.GeminiService.filter_by_profile') as mock_filter, \
-         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label') as mock_find:
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
         
         mock_extract.return_value = "ibuprofen"
         mock_find.return_value = mock_openfda_full_response["results"][0]
@@ -67,7 +73,7 @@ def test_display_list_user_not_found(client, test_db):
 
 def test_display_list_medicine_not_found(client, test_user, test_profile):
     with patch('app.services.gemini_service.GeminiService.extract_label') as mock_extract, \
-         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label') as mock_find:
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
         
         mock_extract.return_value = "unknown_medicine"
         mock_find.return_value = None
@@ -77,10 +83,10 @@ def test_display_list_medicine_not_found(client, test_user, test_profile):
         assert response.status_code == 404
         assert "Medicine not found" in response.json()["detail"]
 
-def test_display_list_unsafe_medicine(client, test_user, test_profile, mock_openfda_full_response):
+def test_display_list_unsafe_medicine(client, test_user, test_profile, no_prescreen, mock_openfda_full_response):
     with patch('app.services.gemini_service.GeminiService.extract_label') as mock_extract, \
          patch('app.services.gemini_service.GeminiService.filter_by_profile') as mock_filter, \
-         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label') as mock_find:
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
         
         mock_extract.return_value = "ibuprofen"
         mock_find.return_value = mock_openfda_full_response["results"][0]
@@ -105,7 +111,7 @@ def test_display_list_invalid_gemini_response(client, test_user, test_profile):
 def test_display_list_medicine_creation_error(client, test_user, test_profile, mock_openfda_full_response):
     with patch('app.services.gemini_service.GeminiService.extract_label') as mock_extract, \
          patch('app.services.gemini_service.GeminiService.filter_by_profile') as mock_filter, \
-         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label') as mock_find, \
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find, \
          patch('app.models.medicine.Medicine.get_or_create') as mock_create:
         
         mock_extract.return_value = "ibuprofen"
@@ -121,7 +127,7 @@ def test_display_list_medicine_creation_error(client, test_user, test_profile, m
 def test_search_by_image_success(client, test_user, test_profile, mock_openfda_full_response, test_image):
     with patch('app.services.gemini_service.GeminiService.extract_label_from_image') as mock_extract, \
          patch('app.services.gemini_service.GeminiService.filter_by_profile') as mock_filter, \
-         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label') as mock_find:
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
         
         mock_extract.return_value = "ibuprofen"
         mock_find.return_value = mock_openfda_full_response["results"][0]
@@ -139,6 +145,8 @@ def test_search_by_image_success(client, test_user, test_profile, mock_openfda_f
         # Verify mock was called with bytes
         mock_extract.assert_called_once()
         assert isinstance(mock_extract.call_args[0][0], bytes)
+        # The model gets the re-encoded image, not the upload
+        assert Image.open(io.BytesIO(mock_extract.call_args[0][0])).format == "JPEG"
 
 def test_search_by_image_invalid_file(client, test_user, test_profile):
     response = client.post(
@@ -149,6 +157,38 @@ def test_search_by_image_invalid_file(client, test_user, test_profile):
     assert response.status_code == 400
     assert "must be an image" in response.json()["detail"]
 
+def test_search_by_image_too_large(client, test_user, test_profile, test_image):
+    with patch.object(settings, "IMAGE_MAX_UPLOAD_BYTES", 10):
+        response = client.post(
+            f"/api/v1/medicines/{test_user.id}/search/image",
+            files={"file": ("test.png", test_image, "image/png")}
+        )
+
+    assert response.status_code == 413
+
+def test_search_by_image_rejected_by_content_length(client, test_user, test_profile):
+    metrics.reset()
+    with patch.object(settings, "IMAGE_MAX_UPLOAD_BYTES", 10), \
+         patch('app.api.v1.endpoints.medicines.read_upload') as mock_read:
+        response = client.post(
+            f"/api/v1/medicines/{test_user.id}/search/image",
+            files={"file": ("test.png", b"x" * 20000, "image/png")}
+        )
+
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Upload exceeds 10 bytes"
+    mock_read.assert_not_called()
+    assert metrics.snapshot()["counters"]["image_ingest.rejected_early"] == 1
+
+def test_search_by_image_unreadable(client, test_user, test_profile):
+    response = client.post(
+        f"/api/v1/medicines/{test_user.id}/search/image",
+        files={"file": ("test.png", b"not really a png", "image/png")}
+    )
+
+    assert response.status_code == 400
+    assert "Could not read image" in response.json()["detail"]
+
 def test_search_by_image_extraction_failed(client, test_user, test_profile, test_image):
     with patch('app.services.gemini_service.GeminiService.extract_label_from_image') as mock_extract:
         mock_extract.side_effect = ValueError("No valid drug name found in image")
@@ -159,4 +199,274 @@ def test_search_by_image_extraction_failed(client, test_user, test_profile, test
         )
         
         assert response.status_code == 400
-        assert "Could not extract medicine name from image" in response.json()["detail"]
\ No newline at end of file
+        assert "Could not extract medicine name from image" in response.json()["detail"]
+
+def test_display_list_reuses_safety_verdict_until_medical_update(client, test_user, test_profile, no_prescreen, mock_openfda_full_response):
+    with patch('app.services.gemini_service.GeminiService.extract_label') as mock_extract, \
+         patch('app.services.gemini_service.GeminiService.filter_by_profile') as mock_filter, \
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
+
+        mock_extract.return_value = "ibuprofen"
+        mock_find.return_value = mock_openfda_full_response["results"][0]
+        mock_filter.return_value = {"can_take": True, "warning": None}
+
+        for _ in range(2):
+            response = client.post(f"/api/v1/medicines/{test_user.id}/search/Advil")
+            assert response.status_code == 200
+            assert response.json()["safety"]["can_take"] is True
+        assert mock_filter.call_count == 1
+
+        response = client.put(
+            f"/api/v1/profiles/{test_profile.id}/medical",
+            json={"allergies": "ibuprofen", "conditions": "none"}
+        )
+        assert response.status_code == 200
+
+        mock_filter.return_value = {"can_take": False, "warning": "Patient has ibuprofen allergy"}
+        response = client.post(f"/api/v1/medicines/{test_user.id}/search/Advil")
+        assert response.json()["safety"]["can_take"] is False
+        assert mock_filter.call_count == 2
+
+def test_display_list_resolves_known_brand_without_gemini(client, test_user, test_profile, mock_openfda_full_response):
+    with patch('app.services.gemini_service.GeminiService.extract_label') as mock_extract, \
+         patch('app.services.gemini_service.GeminiService.filter_by_profile') as mock_filter, \
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
+
+        mock_extract.return_value = "ibuprofen"
+        mock_find.return_value = mock_openfda_full_response["results"][0]
+        mock_filter.return_value = {"can_take": True, "warning": None}
+
+        # First search teaches the resolver Advil -> ibuprofen from the FDA label
+        assert client.post(f"/api/v1/medicines/{test_user.id}/search/Advil").status_code == 200
+        response = client.post(f"/api/v1/medicines/{test_user.id}/search/advil 200mg")
+
+        assert response.status_code == 200
+        assert response.json()["medicine"]["name"] == "ibuprofen"
+        mock_extract.assert_called_once()
+
+def test_batch_search(client, test_user, test_profile, no_prescreen, mock_openfda_full_response):
+    ibuprofen = mock_openfda_full_response["results"][0]
+    aspirin = {**ibuprofen, "id": "aspirin-1", "set_id": "aspirin-set",
+               "openfda": {**ibuprofen["openfda"], "generic_name": ["aspirin"], "brand_name": ["Bayer"]}}
+    labels = {"ibuprofen": ibuprofen, "aspirin": aspirin}
+
+    with patch('app.services.gemini_service.GeminiService.extract_labels') as mock_extract, \
+         patch('app.services.gemini_service.GeminiService.filter_by_profile_batch') as mock_filter, \
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
+
+        mock_extract.return_value = ["ibuprofen", "aspirin", None, "unknownium", "ibuprofen"]
+        mock_find.side_effect = lambda name: labels.get(name)
+        mock_filter.return_value = [{"can_take": True, "warning": None}, {"can_take": False, "warning": "allergy"}]
+
+        response = client.post(
+            f"/api/v1/medicines/{test_user.id}/batch-search",
+            json={"queries": ["Advil", "Bayer 81mg", "hello", "Unknownium", "advil liqui-gels"]}
+        )
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == ["ok", "ok", "not_extracted", "not_found", "ok"]
+        assert results[0]["medicine"]["name"] == "ibuprofen"
+        assert results[0]["medicine"]["id"] == results[4]["medicine"]["id"]
+        assert results[1]["safety"] == {"can_take": False, "warning": "allergy"}
+
+        # One extraction call and one safety call for the whole list
+        mock_extract.assert_called_once()
+        mock_filter.assert_called_once()
+        assert len(mock_filter.call_args[0][0]) == 2
+        assert Medicine.select().count() == 2
+
+def test_batch_search_user_not_found(client, test_db):
+    response = client.post("/api/v1/medicines/999/batch-search", json={"queries": ["Advil"]})
+    assert response.status_code == 404
+
+def test_batch_search_too_many_items(client, test_user):
+    response = client.post(
+        f"/api/v1/medicines/{test_user.id}/batch-search",
+        json={"queries": ["x"] * 100}
+    )
+    assert response.status_code == 422
+
+def _parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_display_list_stream(client, test_user, test_profile, mock_openfda_full_response):
+    with patch('app.services.gemini_service.GeminiService.extract_label') as mock_extract, \
+         patch('app.services.gemini_service.GeminiService.filter_by_profile') as mock_filter, \
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
+
+        mock_extract.return_value = "ibuprofen"
+        mock_find.return_value = mock_openfda_full_response["results"][0]
+        mock_filter.return_value = {"can_take": True, "warning": None}
+
+        response = client.post(f"/api/v1/medicines/{test_user.id}/search/Advil/stream")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _parse_events(response.text)
+        names = [name for name, _ in events]
+        assert names[:2] == ["label", "fda"]
+        assert sorted(names[2:4]) == ["medicine", "safety"]
+        assert names[-1] == "done"
+        data = dict(events)
+        assert data["label"] == {"label": "ibuprofen"}
+        assert data["medicine"]["name"] == "ibuprofen"
+        assert data["medicine"]["reviews"] == []
+        assert data["safety"]["can_take"] is True
+
+def test_label_extraction_overlaps_user_context(client, test_user, test_profile, mock_openfda_full_response):
+    extracting = threading.Event()
+    waits = []
+    real_run_db = medicines.run_db
+
+    async def run_db_after_extraction(func, *args, **kwargs):
+        # Hold the user context query until label extraction has started
+        waits.append(await asyncio.to_thread(extracting.wait, 2))
+        return await real_run_db(func, *args, **kwargs)
+
+    def extract(text):
+        extracting.set()
+        return "ibuprofen"
+
+    with patch.object(medicines, "run_db", run_db_after_extraction), \
+         patch('app.services.gemini_service.GeminiService.extract_label', side_effect=extract), \
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
+        mock_find.return_value = mock_openfda_full_response["results"][0]
+        response = client.post(f"/api/v1/medicines/{test_user.id}/search/SomeBrand")
+
+    assert response.status_code == 200
+    assert waits[0] is True
+
+def test_display_list_stream_user_not_found(client, test_db):
+    response = client.post("/api/v1/medicines/999/search/Tylenol/stream")
+    assert response.status_code == 404
+
+def test_display_list_stream_medicine_not_found(client, test_user, test_profile):
+    with patch('app.services.gemini_service.GeminiService.extract_label') as mock_extract, \
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
+
+        mock_extract.return_value = "unknown_medicine"
+        mock_find.return_value = None
+
+        response = client.post(f"/api/v1/medicines/{test_user.id}/search/UnknownMedicine/stream")
+
+        assert response.status_code == 200
+        events = _parse_events(response.text)
+        assert events[0] == ("label", {"label": "unknown_medicine"})
+        name, error = events[-1]
+        assert name == "error"
+        assert error["status_code"] == 404
+        assert "Medicine not found" in error["detail"]
+
+def test_search_by_image_stream(client, test_user, test_profile, mock_openfda_full_response, test_image):
+    with patch('app.services.gemini_service.GeminiService.extract_label_from_image') as mock_extract, \
+         patch('app.services.gemini_service.GeminiService.filter_by_profile') as mock_filter, \
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
+
+        mock_extract.return_value = "ibuprofen"
+        mock_find.return_value = mock_openfda_full_response["results"][0]
+        mock_filter.return_value = {"can_take": True, "warning": None}
+
+        response = client.post(
+            f"/api/v1/medicines/{test_user.id}/search/image/stream",
+            files={"file": ("test.png", test_image, "image/png")}
+        )
+
+        assert response.status_code == 200
+        events = dict(_parse_events(response.text))
+        assert events["label"] == {"label": "ibuprofen"}
+        assert events["medicine"]["name"] == "ibuprofen"
+        assert "done" in events
+
+def test_prompt_size_recorded_only_for_model_calls(client, test_user, test_profile, mock_openfda_full_response):
+    metrics.reset()
+    with patch('app.services.gemini_service.GeminiService.extract_label') as mock_extract, \
+         patch('app.services.gemini_service.GeminiService.filter_by_profile') as mock_filter, \
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
+
+        mock_extract.return_value = "ibuprofen"
+        mock_find.return_value = mock_openfda_full_response["results"][0]
+        mock_filter.return_value = {"can_take": True, "warning": None}
+
+        # Settled by the prescreen: no prompt is built
+        client.post(f"/api/v1/medicines/{test_user.id}/search/Advil")
+        assert "prompt.medicine_tokens_raw" not in metrics.snapshot()["summaries"]
+
+        # Sent to the model once, then served from the verdict cache
+        with patch.object(settings, "SAFETY_PRESCREEN_ENABLED", False):
+            client.put(f"/api/v1/profiles/{test_profile.id}/medical", json={"allergies": "none", "conditions": "asthma"})
+            client.post(f"/api/v1/medicines/{test_user.id}/search/Advil")
+            client.post(f"/api/v1/medicines/{test_user.id}/search/Advil")
+        mock_filter.assert_called_once()
+        assert metrics.snapshot()["summaries"]["prompt.medicine_tokens_raw"]["count"] == 1
+
+def test_display_list_sends_compact_prompt(client, test_user, test_profile, no_prescreen, mock_openfda_full_response):
+    with patch('app.services.gemini_service.GeminiService.extract_label') as mock_extract, \
+         patch('app.services.gemini_service.GeminiService.filter_by_profile') as mock_filter, \
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
+
+        mock_extract.return_value = "ibuprofen"
+        mock_find.return_value = mock_openfda_full_response["results"][0]
+        mock_filter.return_value = {"can_take": True, "warning": None}
+
+        response = client.post(f"/api/v1/medicines/{test_user.id}/search/Advil")
+
+        assert response.status_code == 200
+        medicine_str, profile_str = mock_filter.call_args[0]
+        medicine = json.loads(medicine_str)
+        assert medicine["warnings"] == "Do not use if allergic"
+        assert "spl_product_data_elements" not in medicine
+        assert json.loads(profile_str) == {
+            "age": 30,
+            "gender": "Male",
+            "allergies": "none",
+            "conditions": "none",
+            "preferred_medication_type": "tablets",
+        }
+
+def test_display_list_settles_clear_cases_without_model(client, test_user, test_profile, mock_openfda_full_response):
+    with patch('app.services.gemini_service.GeminiService.extract_label') as mock_extract, \
+         patch('app.services.gemini_service.GeminiService.filter_by_profile') as mock_filter, \
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
+
+        mock_extract.return_value = "ibuprofen"
+        mock_find.return_value = mock_openfda_full_response["results"][0]
+
+        # No allergies or conditions: safe without asking the model
+        response = client.post(f"/api/v1/medicines/{test_user.id}/search/Advil")
+        assert response.json()["safety"] == {"can_take": True, "warning": None}
+
+        # Allergy to an ingredient on the label: unsafe without asking the model
+        client.put(f"/api/v1/profiles/{test_profile.id}/medical", json={"allergies": "Ibuprofen", "conditions": "none"})
+        response = client.post(f"/api/v1/medicines/{test_user.id}/search/Advil")
+        assert response.json()["safety"]["can_take"] is False
+        assert "ibuprofen" in response.json()["safety"]["warning"]
+        mock_filter.assert_not_called()
+
+        # Anything else is left to the model
+        mock_filter.return_value = {"can_take": False, "warning": "NSAIDs can worsen peptic ulcers"}
+        client.put(f"/api/v1/profiles/{test_profile.id}/medical", json={"allergies": "none", "conditions": "peptic ulcer"})
+        response = client.post(f"/api/v1/medicines/{test_user.id}/search/Advil")
+        assert response.json()["safety"]["warning"] == "NSAIDs can worsen peptic ulcers"
+        mock_filter.assert_called_once()
+
+
+def test_display_list_leaves_older_patients_to_model(client, test_user, test_profile, mock_openfda_full_response):
+    test_profile.age = 72
+    test_profile.save()
+    with patch('app.services.gemini_service.GeminiService.extract_label') as mock_extract, \
+         patch('app.services.gemini_service.GeminiService.filter_by_profile') as mock_filter, \
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
+
+        mock_extract.return_value = "ibuprofen"
+        mock_find.return_value = mock_openfda_full_response["results"][0]
+        mock_filter.return_value = {"can_take": False, "warning": "Higher risk of stomach bleeding over 60"}
+
+        # No allergies or conditions, but age is for the model to weigh
+        response = client.post(f"/api/v1/medicines/{test_user.id}/search/Advil")
+        assert response.json()["safety"]["can_take"] is False
+        mock_filter.assert_called_once()
@@ -0,0 +1,62 @@
+import pytest
+from app.services.brand_resolver import BrandResolver, canonical_generic, clean_query
+from app.services.fda_label_store import LocalLabelStore
+
+@pytest.fixture
+def resolver():
+    resolver = BrandResolver(min_score=0.85)
+    resolver.add_label({"openfda": {"generic_name": ["ACETAMINOPHEN"], "brand_name": ["Tylenol"]}})
+    resolver.add_label({"openfda": {"generic_name": ["IBUPROFEN"], "brand_name": ["Advil", "Motrin"]}})
+    return resolver
+
+def test_clean_query_strips_dosage_noise():
+    assert clean_query("Advil 200mg Tablets") == "advil"
+    assert clean_query("Tylenol Extra Strength 500 mg") == "tylenol"
+
+def test_resolve_exact_brand_and_generic(resolver):
+    assert resolver.resolve("Tylenol") == "acetaminophen"
+    assert resolver.resolve("advil 200mg") == "ibuprofen"
+    assert resolver.resolve("Ibuprofen") == "ibuprofen"
+
+def test_resolve_brand_inside_sentence(resolver):
+    assert resolver.resolve("I have some Tylenol for my headache") == "acetaminophen"
+
+def test_resolve_typo(resolver):
+    assert resolver.resolve("tylenl") == "acetaminophen"
+    assert resolver.resolve("motrn 400mg") == "ibuprofen"
+
+def test_not_confident_returns_none(resolver):
+    assert resolver.resolve("aspirin") is None
+    assert resolver.resolve("advil and tylenol") is None
+    assert resolver.resolve("500mg") is None
+
+def test_ambiguous_brand_returns_none(resolver):
+    resolver.add_label({"openfda": {"generic_name": ["NAPROXEN"], "brand_name": ["Advil"]}})
+    assert resolver.resolve("advil") is None
+
+def test_load_from_store(test_db):
+    LocalLabelStore().import_records([{
+        "set_id": "set-a",
+        "id": "label-a",
+        "version": "1",
+        "openfda": {"generic_name": ["ACETAMINOPHEN"], "brand_name": ["Tylenol", "Panadol"]},
+    }])
+    resolver = BrandResolver()
+
+    assert resolver.load_from_store() == 3
+    assert resolver.resolve("panadol") == "acetaminophen"
+
+def test_live_and_stored_labels_agree_on_generic(test_db):
+    label = {
+        "set_id": "set-b",
+        "id": "label-b",
+        "version": "1",
+        "openfda": {"generic_name": ["PSEUDOEPHEDRINE", "IBUPROFEN"], "brand_name": ["Advil Sinus"]},
+    }
+    LocalLabelStore().import_records([label])
+    resolver = BrandResolver()
+    resolver.load_from_store()
+    # The same label seen live must not make the brand ambiguous
+    resolver.add_label(label)
+
+    assert resolver.resolve("advil sinus") == canonical_generic(label["openfda"]["generic_name"])
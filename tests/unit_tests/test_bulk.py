@@ -0,0 +1,92 @@
+import json
+from typing import Any
+import pytest
+from fastapi.testclient import TestClient
+from app import bulk
+from app.bulk import SQLITE_MAX_VARIABLES, rows_per_insert
+from app.config import settings
+from app.models.favorites import Favorite
+from app.models.medicine import Medicine
+from app.models.medicine_rating import MedicineRating
+from app.models.review import Review
+from app.models.user import User
+
+def test_bulk_create_medicines(client: TestClient, test_medicine: Any):
+    items = [
+        {"name": "aspirin", "fda_id": "a-1"},
+        {"name": "ibuprofen again", "fda_id": test_medicine.fda_id},
+        {"description": "no name"},
+        {"name": "aspirin dup", "fda_id": "a-1"},
+        {"name": "custom"},
+    ]
+    response = client.post("/api/v1/medicines/bulk", json=items)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 2
+    assert [r["status"] for r in body["results"]] == ["created", "duplicate", "invalid", "duplicate", "created"]
+    assert body["results"][1]["id"] == test_medicine.id
+    assert Medicine.get_by_id(body["results"][0]["id"]).name == "aspirin"
+    assert Medicine.get_by_id(body["results"][4]["id"]).name == "custom"
+    assert Medicine.get_by_id(body["results"][4]["id"]).created_at is not None
+
+def test_bulk_create_medicines_ndjson_in_chunks(client: TestClient, test_db, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_INSERT_CHUNK_SIZE", 3)
+    body = "\n".join(json.dumps({"name": f"med{i}", "fda_id": f"n-{i}"}) for i in range(7)) + "\n"
+    response = client.post(
+        "/api/v1/medicines/bulk",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [Medicine.get_by_id(r["id"]).fda_id for r in results] == [f"n-{i}" for i in range(7)]
+
+def test_bulk_inserts_stay_within_sqlite_variable_limit(client: TestClient, test_db, monkeypatch):
+    for model in (Medicine, Review, Favorite):
+        assert rows_per_insert(model) * len(model._meta.sorted_fields) <= SQLITE_MAX_VARIABLES
+    # Two medicine rows per INSERT: ids must still line up across statements
+    monkeypatch.setattr(bulk, "SQLITE_MAX_VARIABLES", 2 * len(Medicine._meta.sorted_fields))
+    items = [{"name": f"med{i}", "fda_id": f"v-{i}"} for i in range(5)]
+    response = client.post("/api/v1/medicines/bulk", json=items)
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [Medicine.get_by_id(r["id"]).fda_id for r in results] == [f"v-{i}" for i in range(5)]
+
+def test_bulk_rejects_malformed_body(client: TestClient, test_db):
+    response = client.post(
+        "/api/v1/medicines/bulk",
+        content=b'{"name": "a"}',
+        headers={"Content-Type": "application/json"}
+    )
+    assert response.status_code == 400
+
+def test_bulk_create_reviews(client: TestClient, test_user: Any, test_medicine: Any, test_review: Any):
+    other_user = User.create(email="other@example.com")
+    other_medicine = Medicine.create(name="aspirin", fda_id="a-1")
+    review = {"rating": 4, "comment": "fine", "sentiment_score": 0.5}
+    items = [
+        {**review, "user_id": other_user.id, "medicine_id": test_medicine.id},
+        {**review, "user_id": test_user.id, "medicine_id": test_medicine.id},
+        {**review, "user_id": 999, "medicine_id": test_medicine.id},
+        {**review, "user_id": test_user.id, "medicine_id": other_medicine.id, "rating": 2},
+        {**review, "user_id": test_user.id, "medicine_id": other_medicine.id},
+        {**review, "user_id": test_user.id, "medicine_id": test_medicine.id, "rating": 9},
+    ]
+    response = client.post("/api/v1/reviews/bulk", json=items)
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["status"] for r in body["results"]] == [
+        "created", "duplicate", "not_found", "created", "duplicate", "invalid"
+    ]
+    assert Review.get_by_id(body["results"][3]["id"]).rating == 2
+    assert Review.select().count() == 3
+
+    # Aggregates follow the bulk inserts
+    assert MedicineRating.get_by_id(other_medicine.id).review_count == 1
+    assert MedicineRating.get_by_id(test_medicine.id).rating_4 == 1
+
+def test_bulk_limit(client: TestClient, test_db, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_MAX_ITEMS", 2)
+    response = client.post("/api/v1/medicines/bulk", json=[{"name": str(i)} for i in range(3)])
+    assert response.status_code == 413
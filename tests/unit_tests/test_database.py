@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from app.database import (
+    create_database, new_connection_scope, end_connection_scope, for_read, db, read_db
+)
+from app.models.medicine import Medicine
+
+
+@pytest.fixture
+def engine(tmp_path):
+    database = create_database(str(tmp_path / "engine.db"))
+    yield database
+    if not database.is_closed():
+        database.close()
+
+
+def test_pragmas_applied(engine):
+    engine.connect()
+    assert engine.execute_sql("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert engine.execute_sql("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert engine.execute_sql("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+
+def test_read_engine_is_query_only(tmp_path):
+    path = str(tmp_path / "engine.db")
+    writer = create_database(path)
+    writer.execute_sql("CREATE TABLE t (x INTEGER)")
+    reader = create_database(path, read_only=True)
+    assert reader.execute_sql("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    with pytest.raises(Exception):
+        reader.execute_sql("INSERT INTO t VALUES (1)")
+    reader.close()
+    writer.close()
+
+
+@pytest.mark.asyncio
+async def test_connection_per_request_scope(engine):
+    seen = []
+
+    async def request():
+        token = new_connection_scope()
+        try:
+            engine.connect()
+            seen.append(engine.connection())
+            conn = engine.connection()
+            await asyncio.sleep(0)
+            # The other request opening and closing its connection does not touch this one
+            assert engine.connection() is conn
+        finally:
+            engine.close()
+            end_connection_scope(token)
+
+    await asyncio.gather(request(), request())
+    assert seen[0] is not seen[1]
+
+
+def test_for_read_leaves_test_binding_alone(test_db):
+    query = for_read(Medicine.select())
+    assert query._database is not read_db
+    with Medicine.bind_ctx(db):
+        query = for_read(Medicine.select())
+        assert query._database is read_db
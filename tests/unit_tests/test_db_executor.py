@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from peewee import DoesNotExist
+from app.config import settings
+from app.database import create_database
+from app.db_executor import DatabaseExecutor
+from app.models.user import User
+
+
+@pytest.fixture
+def executor():
+    executor = DatabaseExecutor(max_workers=2)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_runs_on_worker_thread(executor):
+    name = await executor.run(lambda: threading.current_thread().name)
+    assert name.startswith("db")
+
+
+@pytest.mark.asyncio
+async def test_orm_errors_propagate(executor, test_db):
+    with pytest.raises(DoesNotExist):
+        await executor.run(User.get_by_id, 1)
+    user = await executor.run(User.create, email="worker@example.com")
+    assert User.get_by_id(user.id).email == "worker@example.com"
+
+
+@pytest.mark.asyncio
+async def test_slow_work_does_not_block_loop(executor):
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(ticker())
+    await executor.run(time.sleep, 0.2)
+    task.cancel()
+    assert ticks >= 5
+
+
+@pytest.mark.asyncio
+async def test_jobs_release_their_connection(executor, tmp_path):
+    with patch.object(settings, "DATABASE_POOL", True):
+        engine = create_database(str(tmp_path / "pooled.db"))
+
+    def query():
+        return engine.execute_sql("SELECT 1").fetchone()[0]
+
+    assert await executor.run(query) == 1
+    assert await executor.run(query) == 1
+    # Returned to the pool after each job, so both jobs shared one connection
+    assert not engine._in_use
+    assert len(engine._connections) == 1
+    assert await executor.run(engine.is_closed)
+    engine.close_all()
+
+
+@pytest.mark.asyncio
+async def test_unpooled_connection_kept_across_jobs(tmp_path):
+    executor = DatabaseExecutor(max_workers=1)
+    engine = create_database(str(tmp_path / "plain.db"))
+    try:
+        first = await executor.run(engine.connection)
+        # Same thread, same connection: pragmas and page cache survive the job
+        assert await executor.run(engine.connection) is first
+        assert not await executor.run(engine.is_closed)
+    finally:
+        executor.shutdown()
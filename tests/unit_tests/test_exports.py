@@ -0,0 +1,84 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import pytest
+from app.api.v1.endpoints import exports
+from app.models.favorites import Favorite
+from app.models.review import Review
+from app.models.user import User
+from app.services.limiter import ConcurrencyLimiter
+
+def test_export_reviews_ndjson(client, test_review):
+    response = client.get("/api/v1/exports/reviews")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 1
+    assert rows[0]["comment"] == test_review.comment
+    assert rows[0]["user"] == test_review.user.id
+    assert rows[0]["medicine"] == test_review.medicine.id
+
+def test_export_reviews_filters(client, test_review, test_medicine):
+    other = User.create(email="other@example.com")
+    Review.create(
+        user=other,
+        medicine=test_medicine,
+        rating=2,
+        comment="Old review",
+        created_at=datetime.now() - timedelta(days=30)
+    )
+
+    recent = client.get(
+        "/api/v1/exports/reviews",
+        params={"created_after": (datetime.now() - timedelta(days=1)).isoformat()}
+    )
+    by_user = client.get("/api/v1/exports/reviews", params={"user_id": other.id})
+
+    assert [json.loads(l)["comment"] for l in recent.text.splitlines()] == [test_review.comment]
+    assert [json.loads(l)["comment"] for l in by_user.text.splitlines()] == ["Old review"]
+
+def test_export_medicines_csv(client, test_medicine):
+    response = client.get("/api/v1/exports/medicines", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert rows[0]["name"] == test_medicine.name
+    assert rows[0]["fda_id"] == test_medicine.fda_id
+
+def test_export_many_rows_in_batches(client, test_medicine):
+    users = [User.create(email=f"user{i}@example.com") for i in range(1200)]
+    Favorite.insert_many([{"user": u.id, "medicine": test_medicine.id} for u in users]).execute()
+
+    response = client.get("/api/v1/exports/favorites", params={"medicine_id": test_medicine.id})
+
+    lines = response.text.splitlines()
+    assert len(lines) == 1200
+    assert [json.loads(l)["user"] for l in lines] == [u.id for u in users]
+
+def test_export_empty(client, test_db):
+    response = client.get("/api/v1/exports/reviews")
+    assert response.status_code == 200
+    assert response.text == ""
+
+@pytest.mark.asyncio
+async def test_exports_wait_for_a_free_slot():
+    limiter = ConcurrencyLimiter("test_export", 1)
+    with patch.object(exports, "export_limiter", limiter):
+        first = exports._on_one_thread(chunk for chunk in ["a", "b"])
+        second = exports._on_one_thread(chunk for chunk in ["c"])
+        assert await anext(first) == "a"
+
+        waiting = asyncio.ensure_future(anext(second))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        assert limiter.waiting == 1
+
+        assert [chunk async for chunk in first] == ["b"]
+        assert await waiting == "c"
+        await second.aclose()
+    assert limiter.in_flight == 0
@@ -1,8 +1,10 @@
 # tests/unit_tests/test_favorites.py
 
 import pytest
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from app.models.favorites import Favorite
+from app.models.medicine import Medicine
 
 def test_add_favorite(client: TestClient, test_user, test_medicine):
     favorite_data = {"medicine_id": test_medicine.id}
@@ -101,4 +103,51 @@ def test_remove_favorite_user_not_found(client: TestClient, test_medicine):
         f"/api/v1/users/999/favorites/{test_medicine.id}"
     )
     assert response.status_code == 404
-    assert "User not found" in response.json()["detail"]
\ No newline at end of file
+    assert "User not found" in response.json()["detail"]
+
+def test_get_user_favorites_single_query(client: TestClient, test_user, test_db):
+    for i in range(5):
+        Favorite.create(user=test_user, medicine=Medicine.create(name=f"med{i}", fda_id=f"fav-{i}"))
+
+    with patch.object(test_db, "execute_sql", wraps=test_db.execute_sql) as execute:
+        response = client.get(f"/api/v1/users/{test_user.id}/favorites")
+    assert response.status_code == 200
+    assert [fav["medicine"]["name"] for fav in response.json()] == [f"med{i}" for i in range(5)]
+    # User check plus one page query, regardless of the number of favorites
+    assert execute.call_count == 2
+
+def test_toggle_favorite(client: TestClient, test_user, test_medicine):
+    url = f"/api/v1/users/{test_user.id}/favorites/toggle"
+    assert client.post(url, json={"medicine_id": test_medicine.id}).json()["detail"] == "Favorite added successfully"
+    assert client.post(url, json={"medicine_id": test_medicine.id}).json()["detail"] == "Favorite removed successfully"
+    assert Favorite.select().count() == 0
+    assert client.post(url, json={"medicine_id": 999}).status_code == 404
+
+def test_sync_favorites(client: TestClient, test_user, test_db):
+    medicines = [Medicine.create(name=f"med{i}", fda_id=f"sync-{i}") for i in range(4)]
+    Favorite.create(user=test_user, medicine=medicines[0])
+    Favorite.create(user=test_user, medicine=medicines[1])
+
+    response = client.post(
+        f"/api/v1/users/{test_user.id}/favorites/sync",
+        json={
+            "add": [medicines[1].id, medicines[2].id, medicines[3].id, 999],
+            "remove": [medicines[0].id, 998]
+        }
+    )
+    assert response.status_code == 200
+    assert response.json() == {"added": 2, "removed": 1, "unknown_medicine_ids": [999]}
+    favorited = {fav.medicine_id for fav in Favorite.select().where(Favorite.user == test_user)}
+    assert favorited == {medicines[1].id, medicines[2].id, medicines[3].id}
+
+def test_sync_favorites_rejects_conflicts(client: TestClient, test_user, test_medicine):
+    response = client.post(
+        f"/api/v1/users/{test_user.id}/favorites/sync",
+        json={"add": [test_medicine.id], "remove": [test_medicine.id]}
+    )
+    assert response.status_code == 400
+    assert Favorite.select().count() == 0
+
+def test_sync_favorites_user_not_found(client: TestClient, test_medicine):
+    response = client.post("/api/v1/users/999/favorites/sync", json={"add": [test_medicine.id]})
+    assert response.status_code == 404
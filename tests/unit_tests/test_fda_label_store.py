@@ -0,0 +1,76 @@
+import io
+import json
+import zipfile
+from unittest.mock import patch
+import pytest
+from app.models.fda_label import FDALabel, FDALabelName
+from app.services.fda_label_store import LocalLabelStore, iter_label_records, iter_bulk_file
+from app.services.openfda_service import OpenFDAService
+
+def _label(set_id, version, generic, brand="Brand"):
+    return {
+        "set_id": set_id,
+        "id": f"{set_id}-v{version}",
+        "version": str(version),
+        "effective_time": f"2023010{version}",
+        "warnings": ["Liver warning"],
+        "openfda": {"generic_name": [generic.upper()], "brand_name": [brand]},
+    }
+
+def _dump(labels):
+    return json.dumps({
+        "meta": {"disclaimer": "...", "results": {"skip": 0, "limit": len(labels), "total": len(labels)}},
+        "results": labels,
+    }, indent=2)
+
+@pytest.fixture
+def bulk_zip(tmp_path):
+    path = tmp_path / "drug-label-0001-of-0001.json.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("drug-label-0001-of-0001.json", _dump([
+            _label("set-a", 1, "acetaminophen", "Tylenol"),
+            _label("set-b", 1, "ibuprofen", "Advil"),
+        ]))
+    return path
+
+def test_iter_label_records_small_chunks():
+    labels = [_label(f"set-{i}", 1, "ibuprofen") for i in range(20)]
+    records = list(iter_label_records(io.StringIO(_dump(labels)), chunk_size=37))
+
+    assert [r["set_id"] for r in records] == [l["set_id"] for l in labels]
+
+def test_iter_label_records_empty_results():
+    assert list(iter_label_records(io.StringIO(_dump([])))) == []
+
+def test_import_zip_and_lookup(test_db, bulk_zip):
+    store = LocalLabelStore(chunk_size=1)
+    stats = store.import_files([bulk_zip])
+
+    assert stats == {"inserted": 2, "updated": 0, "skipped": 0}
+    assert store.find_by_name("Acetaminophen")["set_id"] == "set-a"
+    assert store.find_by_name("advil", kind="brand")["set_id"] == "set-b"
+    assert store.find_by_name("aspirin") is None
+
+def test_reimport_is_incremental(test_db, bulk_zip):
+    store = LocalLabelStore()
+    store.import_files([bulk_zip])
+
+    stats = store.import_records([
+        _label("set-a", 1, "acetaminophen"),
+        _label("set-b", 2, "ibuprofen sodium"),
+    ])
+
+    assert stats == {"inserted": 0, "updated": 1, "skipped": 1}
+    assert FDALabel.get_by_id("set-b").version == 2
+    assert store.find_by_name("ibuprofen") is None
+    assert store.find_by_name("ibuprofen sodium")["id"] == "set-b-v2"
+    assert FDALabelName.select().count() == 4
+
+def test_openfda_service_prefers_local_store(test_db, bulk_zip):
+    LocalLabelStore().import_files([bulk_zip])
+
+    with patch('requests.get') as mock_get:
+        medicine = OpenFDAService().find_medicine_by_label("ibuprofen")
+
+    assert medicine["set_id"] == "set-b"
+    mock_get.assert_not_called()
@@ -2,7 +2,17 @@ import pytest
 from unittest.mock import MagicMock, patch
 import json
 from app.services.gemini_service import GeminiService
+from app.services.gemini_cache import MemoCache, PerceptualHashIndex
+import io
+from PIL import Image, ImageDraw
+import asyncio
+import threading
+from app.metrics import metrics
+from app.services.limiter import ConcurrencyLimiter
 from fastapi import UploadFile
+from app.config import settings
+from app.database import create_database
+from app.models.gemini_cache import GeminiCache
 
 @pytest.fixture
 def mock_gemini_model():
@@ -179,4 +189,198 @@ def test_extract_label_from_image_invalid_image(gemini_service, mock_gemini_mode
     with pytest.raises(ValueError) as exc_info:
         gemini_service.extract_label_from_image(b"not an image")
     
-    assert "Failed to extract drug name from image" in str(exc_info.value) 
\ No newline at end of file
+    assert "Failed to extract drug name from image" in str(exc_info.value) 
+
+def _cache_counter(name):
+    return metrics.snapshot()["counters"].get(name, 0)
+
+def test_extract_label_memoized(gemini_service, mock_gemini_model):
+    metrics.reset()
+    mock_response = MagicMock()
+    mock_response.text = "acetaminophen"
+    mock_gemini_model.generate_content.return_value = mock_response
+
+    first = gemini_service.extract_label("Tylenol")
+    second = gemini_service.extract_label("  tylenol ")
+
+    assert first == second == "acetaminophen"
+    mock_gemini_model.generate_content.assert_called_once()
+    assert _cache_counter("gemini_cache.extract_label.hit") == 1
+    assert _cache_counter("gemini_cache.extract_label.miss") == 1
+
+def test_extract_label_errors_not_memoized(gemini_service, mock_gemini_model):
+    mock_response = MagicMock()
+    mock_response.text = "error"
+    mock_gemini_model.generate_content.return_value = mock_response
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            gemini_service.extract_label("Random text")
+
+    assert mock_gemini_model.generate_content.call_count == 2
+
+def test_memo_cache_lru_eviction():
+    cache = MemoCache("test", max_size=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.stats()["size"] == 2
+
+def test_memo_cache_counters_served_by_metrics_route(client):
+    metrics.reset()
+    cache = MemoCache("test", max_size=2)
+    cache.get("advil")
+    cache.set("advil", "ibuprofen")
+    cache.get("advil")
+
+    counters = client.get("/metrics").json()["counters"]
+    assert counters["gemini_cache.test.miss"] == 1
+    assert counters["gemini_cache.test.hit"] == 1
+
+def test_memo_cache_persistence(test_db):
+    metrics.reset()
+    MemoCache("test", max_size=8, persist=True).set("advil", "ibuprofen")
+
+    restarted = MemoCache("test", max_size=8, persist=True)
+    assert restarted.get("advil") == "ibuprofen"
+    assert _cache_counter("gemini_cache.test.hit") == 1
+    assert MemoCache("other", max_size=8, persist=True).get("advil") is None
+
+def test_memo_cache_persistence_releases_pooled_connections(tmp_path):
+    with patch.object(settings, "DATABASE_POOL", True):
+        engine = create_database(str(tmp_path / "pooled.db"))
+    with GeminiCache.bind_ctx(engine):
+        GeminiCache.create_table()
+        MemoCache("test", max_size=8, persist=True).set("advil", "ibuprofen")
+        assert MemoCache("test", max_size=8, persist=True).get("advil") == "ibuprofen"
+    assert not engine._in_use
+    engine.close_all()
+
+def _package_photo(size, fmt):
+    img = Image.new('RGB', (200, 120), color='white')
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([20, 20, 120, 100], fill='navy')
+    draw.ellipse([130, 30, 190, 90], fill='red')
+    img = img.resize(size)
+    out = io.BytesIO()
+    img.save(out, format=fmt)
+    return out.getvalue()
+
+def test_extract_label_from_image_cached_by_content(gemini_service, mock_gemini_model, test_image):
+    metrics.reset()
+    mock_response = MagicMock()
+    mock_response.text = "acetaminophen"
+    mock_gemini_model.generate_content.return_value = mock_response
+
+    assert gemini_service.extract_label_from_image(test_image.getvalue()) == "acetaminophen"
+    assert gemini_service.extract_label_from_image(test_image.getvalue()) == "acetaminophen"
+
+    mock_gemini_model.generate_content.assert_called_once()
+    assert _cache_counter("gemini_cache.extract_label_from_image.hit") == 1
+
+def test_extract_label_from_image_perceptual_hit(gemini_service, mock_gemini_model):
+    gemini_service.image_phash_index = PerceptualHashIndex(max_size=16, max_distance=6)
+    mock_response = MagicMock()
+    mock_response.text = "ibuprofen"
+    mock_gemini_model.generate_content.return_value = mock_response
+
+    original = _package_photo((200, 120), 'PNG')
+    reshot = _package_photo((150, 90), 'JPEG')
+    assert original != reshot
+
+    assert gemini_service.extract_label_from_image(original) == "ibuprofen"
+    assert gemini_service.extract_label_from_image(reshot) == "ibuprofen"
+    mock_gemini_model.generate_content.assert_called_once()
+
+def test_perceptual_index_rejects_distant_hashes():
+    index = PerceptualHashIndex(max_size=4, max_distance=2)
+    index.add(0b1111_0000, "ibuprofen")
+
+    assert index.find(0b1111_0001) == "ibuprofen"
+    assert index.find(0b0000_1111) is None
+
+@pytest.mark.asyncio
+async def test_extract_label_async_runs_off_loop(gemini_service, mock_gemini_model):
+    threads = []
+
+    def generate(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        response = MagicMock()
+        response.text = "acetaminophen"
+        return response
+
+    mock_gemini_model.generate_content.side_effect = generate
+    try:
+        assert await gemini_service.extract_label_async("Tylenol") == "acetaminophen"
+        # Second call is a cache hit and never reaches the executor
+        assert await gemini_service.extract_label_async("tylenol") == "acetaminophen"
+    finally:
+        gemini_service.shutdown()
+
+    assert len(threads) == 1
+    assert threads[0].startswith("gemini")
+
+@pytest.mark.asyncio
+async def test_concurrency_limiter_bounds_calls():
+    limiter = ConcurrencyLimiter("test_limiter", limit=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter:
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(call() for _ in range(6)))
+
+    assert peak == 2
+    assert limiter.in_flight == 0
+    summary = metrics.snapshot()["summaries"]["test_limiter.queue_wait_seconds"]
+    assert summary["count"] == 6
+    assert summary["max"] > 0
+
+def test_extract_labels_single_call_skips_cached(gemini_service, mock_gemini_model):
+    gemini_service.label_cache.set("tylenol", "acetaminophen")
+    mock_response = MagicMock()
+    mock_response.text = '["Ibuprofen", "error"]'
+    mock_gemini_model.generate_content.return_value = mock_response
+
+    result = gemini_service.extract_labels(["Tylenol", "Advil 200mg", "hello there"])
+
+    assert result == ["acetaminophen", "ibuprofen", None]
+    mock_gemini_model.generate_content.assert_called_once()
+    prompt = mock_gemini_model.generate_content.call_args[0][0]
+    assert prompt.endswith("Texts:\n1. Advil 200mg\n2. hello there")
+    assert gemini_service.extract_labels(["advil 200mg"]) == ["ibuprofen"]
+
+def test_extract_labels_malformed_response(gemini_service, mock_gemini_model):
+    mock_response = MagicMock()
+    mock_response.text = '["ibuprofen"]'
+    mock_gemini_model.generate_content.return_value = mock_response
+
+    with pytest.raises(ValueError):
+        gemini_service.extract_labels(["Advil", "Tylenol"])
+
+def test_filter_by_profile_batch(gemini_service, mock_gemini_model):
+    mock_response = MagicMock()
+    mock_response.text = '[{"can_take": "true", "warning": null}, {"can_take": false, "warning": "allergy"}]'
+    mock_gemini_model.generate_content.return_value = mock_response
+
+    result = gemini_service.filter_by_profile_batch(['{"name": "a"}', '{"name": "b"}'], '{"allergies": "b"}')
+
+    assert result == [{"can_take": True, "warning": None}, {"can_take": False, "warning": "allergy"}]
+    mock_gemini_model.generate_content.assert_called_once()
+
+def test_filter_by_profile_batch_length_mismatch(gemini_service, mock_gemini_model):
+    mock_response = MagicMock()
+    mock_response.text = '[{"can_take": true, "warning": null}]'
+    mock_gemini_model.generate_content.return_value = mock_response
+
+    result = gemini_service.filter_by_profile_batch(['{"name": "a"}', '{"name": "b"}'], "{}")
+
+    assert len(result) == 2
+    assert all(verdict["can_take"] is False for verdict in result)
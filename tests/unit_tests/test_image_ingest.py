@@ -0,0 +1,77 @@
+import io
+import pytest
+from unittest.mock import patch
+from fastapi import UploadFile
+from PIL import Image, ImageFile
+from app.config import settings
+from app.metrics import metrics
+from app.services.image_ingest import UploadTooLarge, prepare_image, read_upload
+
+
+def _image_file(size, format="JPEG", mode="RGB", **save_kwargs) -> io.BytesIO:
+    buffer = io.BytesIO()
+    Image.new(mode, size, color="white").save(buffer, format=format, **save_kwargs)
+    buffer.seek(0)
+    return buffer
+
+
+def test_prepare_image_downscales_and_recompresses():
+    metrics.reset()
+    source = _image_file((4000, 3000), format="PNG")
+    input_bytes = len(source.getvalue())
+
+    with patch.object(settings, "IMAGE_MAX_DIMENSION", 800):
+        contents = prepare_image(source)
+
+    image = Image.open(io.BytesIO(contents))
+    assert image.format == "JPEG"
+    assert image.size == (800, 600)
+    summaries = metrics.snapshot()["summaries"]
+    assert summaries["image_ingest.input_bytes"]["sum"] == input_bytes
+    assert summaries["image_ingest.bytes_saved"]["sum"] == input_bytes - len(contents)
+
+
+def test_prepare_image_applies_orientation_and_strips_exif():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90° clockwise
+    exif[0x010F] = "PhoneMaker"
+    source = _image_file((200, 100), exif=exif.tobytes())
+
+    image = Image.open(io.BytesIO(prepare_image(source)))
+    assert image.size == (100, 200)
+    assert not image.getexif()
+
+
+def test_prepare_image_flattens_transparency():
+    source = _image_file((10, 10), format="PNG", mode="RGBA")
+    image = Image.open(io.BytesIO(prepare_image(source)))
+    assert image.mode == "RGB"
+
+
+def test_prepare_image_rejects_pixel_bombs_before_decoding():
+    source = _image_file((3000, 3000), format="PNG")
+    with patch.object(settings, "IMAGE_MAX_PIXELS", 1000 * 1000), \
+         patch.object(ImageFile.ImageFile, "load") as mock_load:
+        with pytest.raises(ValueError, match="too many pixels"):
+            prepare_image(source)
+    mock_load.assert_not_called()
+
+
+def test_prepare_image_rejects_non_images():
+    with pytest.raises(ValueError, match="Could not read image"):
+        prepare_image(io.BytesIO(b"not an image"))
+
+
+def test_read_upload_reuses_the_uploaded_file():
+    upload = UploadFile(io.BytesIO(b"x" * 100))
+    upload.file.read(10)
+    source = read_upload(upload, max_bytes=100)
+    assert source is upload.file
+    assert source.read() == b"x" * 100
+
+
+def test_read_upload_enforces_size_limit():
+    with pytest.raises(UploadTooLarge):
+        read_upload(UploadFile(io.BytesIO(b"x" * 101)), max_bytes=100)
+    with pytest.raises(UploadTooLarge):
+        read_upload(UploadFile(io.BytesIO(b"x"), size=101), max_bytes=100)
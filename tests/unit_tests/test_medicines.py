@@ -34,4 +34,30 @@ def test_get_medicines_list(client, test_medicine):
     data = response.json()
     assert isinstance(data, list)
     assert len(data) > 0
-    assert data[0]["name"] == test_medicine.name
\ No newline at end of file
+    assert data[0]["name"] == test_medicine.name
+
+def test_get_medicines_keyset_pages(client, test_db):
+    from app.models.medicine import Medicine
+    for i in range(5):
+        Medicine.create(name=f"medicine-{i}")
+
+    names, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/medicines/", params=params)
+        assert response.status_code == 200
+        names += [m["name"] for m in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert names == [f"medicine-{i}" for i in range(5)]
+
+def test_get_medicines_invalid_cursor(client, test_db):
+    response = client.get("/api/v1/medicines/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.json()["detail"]
@@ -0,0 +1,122 @@
+import logging
+import pytest
+from peewee import SqliteDatabase
+from app.migrations import migrate_database, run_migrations
+from app.models.user import User
+from app.models.profile import PersonalProfile, MedicalData
+from app.models.medicine import Medicine
+from app.models.review import Review
+from app.models.favorites import Favorite
+
+MODELS = [User, PersonalProfile, MedicalData, Medicine, Review, Favorite]
+
+# Schema as created by the original models: no unique or composite indexes
+LEGACY_SCHEMA = [
+    'CREATE TABLE "users" ("id" INTEGER NOT NULL PRIMARY KEY, "email" VARCHAR(255) NOT NULL)',
+    'CREATE UNIQUE INDEX "user_email" ON "users" ("email")',
+    'CREATE TABLE "personal_profiles" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, '
+    '"first_name" VARCHAR(255) NOT NULL, "last_name" VARCHAR(255) NOT NULL, "age" INTEGER NOT NULL, '
+    '"gender" VARCHAR(255) NOT NULL, "phone" VARCHAR(255), "address" TEXT, '
+    '"created_at" DATETIME NOT NULL, "updated_at" DATETIME NOT NULL)',
+    'CREATE INDEX "personalprofile_user_id" ON "personal_profiles" ("user_id")',
+    'CREATE TABLE "medical_data" ("id" INTEGER NOT NULL PRIMARY KEY, "profile_id" INTEGER NOT NULL, '
+    '"allergies" TEXT, "conditions" TEXT, "preferred_medication_type" VARCHAR(255), '
+    '"created_at" DATETIME NOT NULL, "updated_at" DATETIME NOT NULL)',
+    'CREATE INDEX "medicaldata_profile_id" ON "medical_data" ("profile_id")',
+    'CREATE TABLE "medicines" ("id" INTEGER NOT NULL PRIMARY KEY, "name" VARCHAR(255) NOT NULL, '
+    '"description" TEXT, "fda_id" VARCHAR(255), "created_at" DATETIME NOT NULL, "updated_at" DATETIME NOT NULL)',
+    'CREATE TABLE "reviews" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, '
+    '"medicine_id" INTEGER NOT NULL, "rating" INTEGER NOT NULL, "comment" TEXT NOT NULL, '
+    '"sentiment_score" REAL, "created_at" DATETIME NOT NULL)',
+    'CREATE TABLE "favorites" ("id" INTEGER NOT NULL PRIMARY KEY, "user_id" INTEGER NOT NULL, '
+    '"medicine_id" INTEGER NOT NULL, "added_at" DATETIME NOT NULL)',
+]
+
+NOW = "2024-01-01 00:00:00"
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    database = SqliteDatabase(str(tmp_path / "legacy.db"))
+    database.connect()
+    for statement in LEGACY_SCHEMA:
+        database.execute_sql(statement)
+    database.execute_sql('INSERT INTO "users" VALUES (1, \'a@example.com\'), (2, \'b@example.com\')')
+    database.execute_sql(
+        'INSERT INTO "medicines" VALUES '
+        f'(1, \'ibuprofen\', NULL, \'fda-1\', \'{NOW}\', \'{NOW}\'), '
+        f'(2, \'ibuprofen\', NULL, \'fda-1\', \'{NOW}\', \'{NOW}\'), '
+        f'(3, \'custom\', NULL, NULL, \'{NOW}\', \'{NOW}\'), '
+        f'(4, \'custom\', NULL, NULL, \'{NOW}\', \'{NOW}\')'
+    )
+    database.execute_sql(
+        'INSERT INTO "favorites" VALUES '
+        f'(1, 1, 1, \'{NOW}\'), (2, 1, 2, \'{NOW}\'), (3, 2, 2, \'{NOW}\')'
+    )
+    database.execute_sql(
+        'INSERT INTO "reviews" VALUES '
+        f'(1, 1, 1, 5, \'first\', NULL, \'{NOW}\'), (2, 1, 1, 3, \'again\', NULL, \'{NOW}\')'
+    )
+    database.execute_sql(
+        'INSERT INTO "personal_profiles" VALUES '
+        f'(1, 1, \'A\', \'A\', 30, \'F\', NULL, NULL, \'{NOW}\', \'{NOW}\'), '
+        f'(2, 1, \'A\', \'A\', 30, \'F\', NULL, NULL, \'{NOW}\', \'{NOW}\')'
+    )
+    database.execute_sql(
+        'INSERT INTO "medical_data" VALUES '
+        f'(1, 1, NULL, NULL, NULL, \'{NOW}\', \'{NOW}\'), (2, 2, NULL, NULL, NULL, \'{NOW}\', \'{NOW}\')'
+    )
+    yield database
+    database.close()
+
+def _unique_indexes(database, table):
+    return {tuple(index.columns) for index in database.get_indexes(table) if index.unique}
+
+def _count(database, table):
+    return database.execute_sql(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+def test_upgrade_legacy_database_in_place(legacy_db):
+    migrate_database(legacy_db, MODELS)
+
+    assert ("fda_id",) in _unique_indexes(legacy_db, "medicines")
+    assert ("user_id", "medicine_id") in _unique_indexes(legacy_db, "favorites")
+    assert ("user_id", "medicine_id") in _unique_indexes(legacy_db, "reviews")
+    assert ("user_id",) in _unique_indexes(legacy_db, "personal_profiles")
+    assert ("profile_id",) in _unique_indexes(legacy_db, "medical_data")
+    assert "review_medicine_id_created_at" in {i.name for i in legacy_db.get_indexes("reviews")}
+
+    # Duplicate FDA medicine merged into the oldest row, favorites repointed and deduplicated
+    assert _count(legacy_db, "medicines") == 3
+    assert legacy_db.execute_sql(
+        'SELECT "user_id", "medicine_id" FROM "favorites" ORDER BY "id"'
+    ).fetchall() == [(1, 1), (2, 1)]
+    assert _count(legacy_db, "reviews") == 1
+    assert _count(legacy_db, "personal_profiles") == 1
+    assert legacy_db.execute_sql('SELECT "profile_id" FROM "medical_data"').fetchall() == [(1,)]
+
+    # Rating aggregates backfilled from the surviving review
+    assert legacy_db.execute_sql(
+        'SELECT "medicine_id", "review_count", "rating_5" FROM "medicine_ratings"'
+    ).fetchall() == [(1, 1, 1)]
+
+def test_upgrade_logs_removed_rows(legacy_db, caplog):
+    migrate_database(legacy_db, MODELS)
+
+    messages = [record.getMessage() for record in caplog.records if record.levelno == logging.WARNING]
+    assert any("merged 1 duplicate medicines rows" in m and "repointed 0 reviews rows, 2 favorites rows" in m
+               for m in messages)
+    assert any("deleted 1 duplicate favorites rows" in m for m in messages)
+    assert any("deleted 1 duplicate reviews rows" in m for m in messages)
+    assert any("deleted 1 medical_data rows" in m for m in messages)
+    assert any("deleted 1 duplicate personal_profiles rows" in m for m in messages)
+
+def test_migrations_apply_once(legacy_db):
+    assert run_migrations(legacy_db) == [1, 2]
+    assert run_migrations(legacy_db) == []
+
+def test_fresh_database(tmp_path):
+    database = SqliteDatabase(str(tmp_path / "fresh.db"))
+    migrate_database(database, MODELS)
+
+    assert ("user_id", "medicine_id") in _unique_indexes(database, "favorites")
+    assert run_migrations(database) == []
+    database.close()
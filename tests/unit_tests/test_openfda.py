@@ -3,6 +3,7 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch
 import requests
+import httpx
 
 def test_find_medicine_by_label_success(test_db, mock_openfda_full_response):
     with patch('requests.get') as mock_get:
@@ -43,4 +44,48 @@ def test_find_medicine_by_label_malformed_response(test_db, mock_openfda_malform
         medicine = OpenFDAService().find_medicine_by_label("ibuprofen")
         # Should still return the partial data
         assert medicine["id"] == "123456"
-        assert medicine["openfda"]["generic_name"] == ["ibuprofen"]
\ No newline at end of file
+        assert medicine["openfda"]["generic_name"] == ["ibuprofen"]
+
+@pytest.mark.asyncio
+async def test_find_medicine_by_label_async_success(test_db, mock_openfda_full_response):
+    requests_seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests_seen.append(request)
+        return httpx.Response(200, json=mock_openfda_full_response)
+
+    service = OpenFDAService()
+    await service.open(transport=httpx.MockTransport(handler))
+    try:
+        first = await service.find_medicine_by_label_async("ibuprofen")
+        second = await service.find_medicine_by_label_async("ibuprofen")
+    finally:
+        await service.aclose()
+
+    assert first["id"] == "123456"
+    assert second["openfda"]["brand_name"] == ["Advil"]
+    assert len(requests_seen) == 2
+    assert requests_seen[0].url.params["search"] == "openfda.generic_name:ibuprofen"
+
+@pytest.mark.asyncio
+async def test_find_medicine_by_label_async_not_found(test_db, mock_openfda_empty_response):
+    service = OpenFDAService()
+    await service.open(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, json=mock_openfda_empty_response)
+    ))
+    try:
+        assert await service.find_medicine_by_label_async("nonexistent-medicine") is None
+    finally:
+        await service.aclose()
+
+@pytest.mark.asyncio
+async def test_find_medicine_by_label_async_api_error(test_db):
+    service = OpenFDAService()
+    await service.open(transport=httpx.MockTransport(
+        lambda request: httpx.Response(500, json={"error": "server error"})
+    ))
+    try:
+        assert await service.find_medicine_by_label_async("ibuprofen") is None
+    finally:
+        await service.aclose()
+    assert service._client is None
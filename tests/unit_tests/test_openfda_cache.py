@@ -0,0 +1,94 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from app.models.fda_label_cache import FDALabelCache
+from app.services.openfda_cache import OpenFDALabelCache, normalize_generic_name
+
+@pytest.fixture
+def label(mock_openfda_full_response):
+    return mock_openfda_full_response["results"][0]
+
+@pytest.fixture
+def fda_service(label):
+    service = MagicMock()
+    service.find_medicine_by_label_async = AsyncMock(return_value=label)
+    return service
+
+def test_normalize_generic_name():
+    assert normalize_generic_name("  Acetaminophen \n") == "acetaminophen"
+    assert normalize_generic_name("Sodium   Chloride") == "sodium chloride"
+
+@pytest.mark.asyncio
+async def test_repeat_lookup_served_from_memory(test_db, fda_service, label):
+    cache = OpenFDALabelCache(fda_service, ttl=60, stale_ttl=60)
+
+    first = await cache.find_medicine_by_label("Ibuprofen")
+    second = await cache.find_medicine_by_label("ibuprofen ")
+
+    assert first == second == label
+    fda_service.find_medicine_by_label_async.assert_awaited_once_with("ibuprofen")
+    assert cache.memory.hits == 1
+
+@pytest.mark.asyncio
+async def test_lookup_survives_restart(test_db, fda_service, label):
+    await OpenFDALabelCache(fda_service, ttl=60, stale_ttl=60).find_medicine_by_label("ibuprofen")
+    assert FDALabelCache.get_by_id("ibuprofen")
+
+    # A new cache instance has an empty memory tier but shares the table
+    restarted = OpenFDALabelCache(fda_service, ttl=60, stale_ttl=60)
+    result = await restarted.find_medicine_by_label("ibuprofen")
+
+    assert result == label
+    fda_service.find_medicine_by_label_async.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_not_found_is_not_cached(test_db, fda_service):
+    fda_service.find_medicine_by_label_async.return_value = None
+    cache = OpenFDALabelCache(fda_service, ttl=60, stale_ttl=60)
+
+    assert await cache.find_medicine_by_label("unknown") is None
+    assert await cache.find_medicine_by_label("unknown") is None
+    assert fda_service.find_medicine_by_label_async.await_count == 2
+    assert FDALabelCache.select().count() == 0
+
+@pytest.mark.asyncio
+async def test_stale_entry_returned_and_refreshed_in_background(test_db, fda_service, label):
+    stale = {**label, "version": "0"}
+    FDALabelCache.create(
+        generic_name="ibuprofen",
+        data=json.dumps(stale),
+        fetched_at=datetime.now() - timedelta(seconds=90)
+    )
+    cache = OpenFDALabelCache(fda_service, ttl=60, stale_ttl=60)
+
+    result = await cache.find_medicine_by_label("ibuprofen")
+    assert result["version"] == "0"
+
+    await asyncio.gather(*cache._tasks)
+    fda_service.find_medicine_by_label_async.assert_awaited_once_with("ibuprofen")
+    assert json.loads(FDALabelCache.get_by_id("ibuprofen").data)["version"] == "1"
+
+@pytest.mark.asyncio
+async def test_expired_entry_refetched_inline(test_db, fda_service, label):
+    FDALabelCache.create(
+        generic_name="ibuprofen",
+        data=json.dumps({**label, "version": "0"}),
+        fetched_at=datetime.now() - timedelta(seconds=300)
+    )
+    cache = OpenFDALabelCache(fda_service, ttl=60, stale_ttl=60)
+
+    result = await cache.find_medicine_by_label("ibuprofen")
+
+    assert result["version"] == "1"
+    fda_service.find_medicine_by_label_async.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_memory_tier_is_bounded(test_db, fda_service):
+    cache = OpenFDALabelCache(fda_service, ttl=60, stale_ttl=60, max_entries=2)
+    for name in ("a", "b", "c"):
+        await cache.find_medicine_by_label(name)
+
+    assert len(cache.memory) == 2
+    assert "a" not in cache.memory
@@ -0,0 +1,102 @@
+import asyncio
+import time
+import pytest
+from app.services.pipeline import Pipeline, Stage
+
+
+def _sleeper(result, delay=0.1):
+    async def stage(**kwargs):
+        await asyncio.sleep(delay)
+        return result
+    return stage
+
+
+@pytest.mark.asyncio
+async def test_independent_stages_overlap():
+    pipeline = Pipeline("test", inputs=(), stages=[
+        Stage("a", _sleeper("a")),
+        Stage("b", _sleeper("b")),
+        Stage("c", _sleeper("c")),
+    ])
+    started = time.perf_counter()
+    results = await pipeline.run()
+    assert time.perf_counter() - started < 0.25
+    assert results == {"a": "a", "b": "b", "c": "c"}
+
+
+@pytest.mark.asyncio
+async def test_dependencies_receive_results():
+    async def add(x, a):
+        return x + a
+
+    pipeline = Pipeline("test", inputs=("x",), stages=[
+        Stage("a", _sleeper(1, 0.01)),
+        Stage("sum", add, requires=("x", "a")),
+    ])
+    assert (await pipeline.run(x=2))["sum"] == 3
+
+
+@pytest.mark.asyncio
+async def test_first_failure_cancels_remaining_stages():
+    cancelled = asyncio.Event()
+
+    async def fail():
+        raise LookupError("boom")
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    pipeline = Pipeline("test", inputs=(), stages=[
+        Stage("slow", slow),
+        Stage("fail", fail),
+        Stage("after", _sleeper(None), requires=("fail",)),
+    ])
+    with pytest.raises(LookupError):
+        await pipeline.run()
+    assert cancelled.is_set()
+
+
+def test_unknown_dependency_rejected():
+    with pytest.raises(ValueError):
+        Pipeline("test", inputs=(), stages=[Stage("a", _sleeper(1), requires=("b",))])
+
+
+@pytest.mark.asyncio
+async def test_missing_input_rejected():
+    pipeline = Pipeline("test", inputs=("x",), stages=[])
+    with pytest.raises(ValueError):
+        await pipeline.run()
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_in_completion_order():
+    pipeline = Pipeline("test", inputs=(), stages=[
+        Stage("slow", _sleeper("slow", 0.1)),
+        Stage("fast", _sleeper("fast", 0.01)),
+    ])
+    assert [name async for name, _ in pipeline.stream()] == ["fast", "slow"]
+
+
+@pytest.mark.asyncio
+async def test_closing_stream_cancels_running_stages():
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    pipeline = Pipeline("test", inputs=(), stages=[
+        Stage("fast", _sleeper("fast", 0.01)),
+        Stage("slow", slow),
+    ])
+    events = pipeline.stream()
+    assert await anext(events) == ("fast", "fast")
+    await events.aclose()
+    assert cancelled.is_set()
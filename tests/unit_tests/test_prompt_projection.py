@@ -0,0 +1,70 @@
+import json
+from app.metrics import metrics
+from app.models.profile import PersonalProfile, MedicalData
+from app.services.prompt_projection import (
+    LABEL_SECTIONS, project_label, project_profile, to_prompt_json, estimate_tokens, record_size
+)
+
+
+def test_project_label_keeps_safety_sections_only(mock_openfda_full_response):
+    label = mock_openfda_full_response["results"][0]
+    document = project_label(label, section_max_chars=0, label_max_chars=0)
+
+    assert document["generic_name"] == "ibuprofen"
+    assert document["brand_name"] == "Advil"
+    assert document["warnings"] == "Do not use if allergic"
+    assert document["inactive_ingredient"] == "starch, cellulose"
+    for dropped in ("spl_product_data_elements", "storage_and_handling", "package_label_principal_display_panel",
+                    "questions", "id", "set_id", "version", "effective_time", "package_ndc"):
+        assert dropped not in document
+    assert len(to_prompt_json(document)) < len(json.dumps(label)) / 2
+
+
+def test_project_label_is_deterministic():
+    label = {"warnings": ["b"], "do_not_use": ["a"], "openfda": {"generic_name": ["x"]}}
+    reordered = {"openfda": {"generic_name": ["x"]}, "do_not_use": ["a"], "warnings": ["b"]}
+    assert to_prompt_json(project_label(label)) == to_prompt_json(project_label(reordered))
+    assert list(project_label(label)) == ["generic_name", "do_not_use", "warnings"]
+
+
+def test_project_label_truncates_sections_and_total():
+    label = {"warnings": ["w " * 100], "do_not_use": ["d" * 50], "pregnancy": ["p" * 50]}
+    document = project_label(label, section_max_chars=20, label_max_chars=30)
+
+    assert document["do_not_use"] == "d" * 19 + "…"
+    assert document["warnings"] == "w w w w w…"
+    assert "pregnancy" not in document
+
+
+def test_project_profile_drops_identifying_fields():
+    profile = PersonalProfile(first_name="Ann", last_name="Lee", age=41, gender="Female", phone="555")
+    medical_data = MedicalData(allergies="penicillin", conditions="asthma", preferred_medication_type=None)
+
+    assert project_profile(profile, medical_data) == {
+        "age": 41,
+        "gender": "Female",
+        "allergies": "penicillin",
+        "conditions": "asthma",
+        "preferred_medication_type": None,
+    }
+    assert project_profile(None, None)["allergies"] is None
+
+
+def test_record_size_reports_estimated_tokens():
+    metrics.reset()
+    record_size("medicine", "x" * 400, "x" * 40)
+    summaries = metrics.snapshot()["summaries"]
+    assert summaries["prompt.medicine_tokens_raw"]["sum"] == 100
+    assert summaries["prompt.medicine_tokens_compact"]["sum"] == 10
+    assert estimate_tokens("abcde") == 2
+
+
+def test_project_label_keeps_ingredients_when_budget_runs_out():
+    label = {section: ["x " * 2000] for section in LABEL_SECTIONS}
+    label["active_ingredient"] = ["Ibuprofen 200 mg"]
+    label["inactive_ingredient"] = ["corn starch, FD&C yellow no. 6"]
+    document = project_label(label, section_max_chars=1500, label_max_chars=8000)
+
+    assert document["active_ingredient"] == "Ibuprofen 200 mg"
+    assert document["inactive_ingredient"] == "corn starch, FD&C yellow no. 6"
+    assert "geriatric_use" not in document
@@ -0,0 +1,79 @@
+from typing import Any
+import pytest
+from fastapi.testclient import TestClient
+from peewee import SqliteDatabase
+
+from app.models.medicine import Medicine
+from app.models.medicine_rating import MedicineRating
+from app.models.review import Review
+from app.models.user import User
+from app.services import rating_stats
+
+def _review(client: TestClient, user_id: int, medicine_id: int, rating: int, sentiment=None):
+    return client.post(
+        "/api/v1/reviews/",
+        params={"user_id": user_id, "medicine_id": medicine_id},
+        json={"rating": rating, "comment": "ok", "sentiment_score": sentiment}
+    )
+
+@pytest.fixture
+def users(test_db: SqliteDatabase):
+    return [User.create(email=f"user{i}@example.com") for i in range(3)]
+
+def test_create_review_updates_stats(client: TestClient, users: list, test_medicine: Any):
+    _review(client, users[0].id, test_medicine.id, 5, 0.5)
+    _review(client, users[1].id, test_medicine.id, 2, None)
+    _review(client, users[2].id, test_medicine.id, 5, -0.1)
+
+    response = client.get(f"/api/v1/medicines/{test_medicine.id}/stats")
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["review_count"] == 3
+    assert stats["average_rating"] == pytest.approx(4.0)
+    assert stats["histogram"] == {"1": 0, "2": 1, "3": 0, "4": 0, "5": 2}
+    assert stats["average_sentiment"] == pytest.approx(0.2)
+
+def test_duplicate_review_leaves_stats_untouched(client: TestClient, users: list, test_medicine: Any):
+    assert _review(client, users[0].id, test_medicine.id, 4).status_code == 200
+    assert _review(client, users[0].id, test_medicine.id, 1).status_code == 400
+    row = MedicineRating.get_by_id(test_medicine.id)
+    assert (row.review_count, row.rating_sum, row.rating_1) == (1, 4, 0)
+
+def test_stats_without_reviews(client: TestClient, test_medicine: Any):
+    stats = client.get(f"/api/v1/medicines/{test_medicine.id}/stats").json()
+    assert stats["review_count"] == 0
+    assert stats["average_rating"] is None
+
+def test_stats_unknown_medicine(client: TestClient, test_db: SqliteDatabase):
+    assert client.get("/api/v1/medicines/999/stats").status_code == 404
+
+def test_rebuild_matches_incremental(client: TestClient, users: list, test_medicine: Any):
+    other = Medicine.create(name="aspirin", fda_id="777")
+    _review(client, users[0].id, test_medicine.id, 3, 0.1)
+    _review(client, users[1].id, test_medicine.id, 4, None)
+    _review(client, users[0].id, other.id, 1, -0.5)
+    incremental = [rating_stats.get_stats(m.id) for m in (test_medicine, other)]
+
+    # Rows written behind the aggregate's back are picked up by a rebuild
+    Review.create(user=users[2], medicine=other, rating=5, comment="direct")
+    assert rating_stats.rebuild() == 2
+    rebuilt = [rating_stats.get_stats(m.id) for m in (test_medicine, other)]
+    assert rebuilt[0] == incremental[0]
+    assert rebuilt[1]["review_count"] == 2
+    assert rebuilt[1]["average_rating"] == pytest.approx(3.0)
+    assert rebuilt[1]["average_sentiment"] == pytest.approx(-0.5)
+
+def test_top_rated(client: TestClient, users: list, test_medicine: Any):
+    other = Medicine.create(name="aspirin", fda_id="777")
+    _review(client, users[0].id, test_medicine.id, 3)
+    _review(client, users[0].id, other.id, 5)
+    _review(client, users[1].id, other.id, 4)
+
+    response = client.get("/api/v1/medicines/top-rated")
+    assert response.status_code == 200
+    ranked = response.json()
+    assert [item["medicine"]["id"] for item in ranked] == [other.id, test_medicine.id]
+    assert ranked[0]["stats"]["average_rating"] == pytest.approx(4.5)
+
+    response = client.get("/api/v1/medicines/top-rated", params={"min_reviews": 2})
+    assert [item["medicine"]["name"] for item in response.json()] == ["aspirin"]
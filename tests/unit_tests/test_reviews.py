@@ -119,4 +119,21 @@ def test_get_reviews_by_medicine_empty(client: TestClient, test_db: SqliteDataba
 def test_get_reviews_by_user_empty(client: TestClient, test_db: SqliteDatabase):
     response = client.get("/api/v1/reviews/user/999")
     assert response.status_code == 404
-    assert "not found" in response.json()["detail"]
\ No newline at end of file
+    assert "not found" in response.json()["detail"]
+
+def test_get_reviews_by_medicine_paginated(client: TestClient, test_medicine: Any, test_db: SqliteDatabase):
+    from app.models.user import User
+    for i in range(3):
+        user = User.create(email=f"reviewer{i}@example.com")
+        Review.create(user=user, medicine=test_medicine, rating=3, comment=f"Review {i}")
+
+    first = client.get(f"/api/v1/reviews/medicine/{test_medicine.id}", params={"limit": 2})
+    assert first.status_code == 200
+    assert [r["comment"] for r in first.json()] == ["Review 0", "Review 1"]
+
+    second = client.get(
+        f"/api/v1/reviews/medicine/{test_medicine.id}",
+        params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]}
+    )
+    assert [r["comment"] for r in second.json()] == ["Review 2"]
+    assert "X-Next-Cursor" not in second.headers
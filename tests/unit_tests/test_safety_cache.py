@@ -0,0 +1,61 @@
+import pytest
+from app.models.profile import MedicalData
+from app.services.safety_cache import SafetyVerdictCache, profile_fingerprint, is_error_verdict
+
+@pytest.fixture
+def label():
+    return {"id": "123456", "version": "1"}
+
+def test_fingerprint_ignores_non_medical_fields(test_profile):
+    medical = MedicalData.get(MedicalData.profile == test_profile)
+    before = profile_fingerprint(test_profile, medical)
+
+    test_profile.phone = "+1987654321"
+    test_profile.first_name = "Renamed"
+    medical.allergies = "  NONE "
+    assert profile_fingerprint(test_profile, medical) == before
+
+    medical.allergies = "penicillin"
+    assert profile_fingerprint(test_profile, medical) != before
+
+def test_fingerprint_without_profile():
+    assert profile_fingerprint(None, None) == profile_fingerprint(None, None)
+
+def test_cache_keyed_by_label_version(label):
+    cache = SafetyVerdictCache(max_size=8)
+    cache.set(1, label, "fp", {"can_take": True, "warning": None})
+
+    assert cache.get(1, label, "fp") == {"can_take": True, "warning": None}
+    assert cache.get(1, {**label, "version": "2"}, "fp") is None
+    assert cache.get(1, label, "other-fp") is None
+    assert cache.get(2, label, "fp") is None
+
+def test_invalidate_user_is_precise(label):
+    cache = SafetyVerdictCache(max_size=8)
+    cache.set(1, label, "fp", {"can_take": True, "warning": None})
+    cache.set(2, label, "fp", {"can_take": True, "warning": None})
+
+    assert cache.invalidate_user(1) == 1
+    assert cache.get(1, label, "fp") is None
+    assert cache.get(2, label, "fp") is not None
+
+def test_error_verdicts_not_cached(label):
+    cache = SafetyVerdictCache(max_size=8)
+    verdict = {"can_take": False, "warning": "Error analyzing medicine safety: timeout"}
+    assert is_error_verdict(verdict)
+
+    cache.set(1, label, "fp", verdict)
+    assert cache.get(1, label, "fp") is None
+
+def test_user_index_pruned_on_eviction(label):
+    cache = SafetyVerdictCache(max_size=2)
+    for version in range(5):
+        cache.set(1, {**label, "version": str(version)}, "fp", {"can_take": True, "warning": None})
+    cache.set(2, label, "fp", {"can_take": True, "warning": None})
+
+    assert len(cache._by_user[1]) == 1
+    assert cache.invalidate_user(1) == 1
+    assert cache.get(2, label, "fp") is not None
+    cache.set(3, label, "fp", {"can_take": True, "warning": None})
+    cache.set(4, label, "fp", {"can_take": True, "warning": None})
+    assert set(cache._by_user) == {3, 4}
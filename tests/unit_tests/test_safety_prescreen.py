@@ -0,0 +1,84 @@
+from unittest.mock import patch
+from app.config import settings
+from app.metrics import metrics
+from app.models.profile import PersonalProfile, MedicalData
+from app.services.safety_prescreen import KeywordMatcher, prescreen, profile_terms
+
+LABEL = {
+    "active_ingredient": ["Ibuprofen 200 mg (NSAID)"],
+    "inactive_ingredient": ["corn starch, FD&C yellow no. 6"],
+    "warnings": ["Stomach bleeding warning: the chance is higher if you have had stomach ulcers"],
+    "openfda": {"generic_name": ["IBUPROFEN"], "brand_name": ["Advil"]},
+}
+ADULT = PersonalProfile(age=30)
+
+
+def test_profile_terms():
+    assert profile_terms(None) == []
+    assert profile_terms("  None ") == []
+    assert profile_terms("No known allergies") == []
+    assert profile_terms("Allergic to penicillin, peanuts and latex; none") == ["penicillin", "peanuts", "latex"]
+    assert profile_terms("Severe sulfa allergy / asthma") == ["sulfa", "asthma"]
+
+
+def test_keyword_matcher_matches_whole_words_in_one_pass():
+    matcher = KeywordMatcher(["ulcer", "stomach ulcers", "ace", "he"])
+    found = matcher.find("The chance is higher if you've had Stomach-Ulcers.")
+    assert found == {"stomach ulcers"}
+    assert KeywordMatcher(["ace", "acetaminophen"]).find("contains acetaminophen") == {"acetaminophen"}
+    assert KeywordMatcher([]).find("anything") == set()
+
+
+def test_prescreen_clears_empty_profiles_locally():
+    metrics.reset()
+    assert prescreen(LABEL, ADULT, None) == {"can_take": True, "warning": None}
+    assert prescreen(LABEL, ADULT, MedicalData(allergies="none", conditions="")) == {"can_take": True, "warning": None}
+    assert metrics.snapshot()["counters"]["safety_prescreen.local_safe"] == 2
+
+
+def test_prescreen_flags_ingredient_allergies_locally():
+    metrics.reset()
+    verdict = prescreen(LABEL, ADULT, MedicalData(allergies="ibuprofen, yellow no 6", conditions="none"))
+    assert verdict["can_take"] is False
+    assert "ibuprofen, yellow no 6" in verdict["warning"]
+    assert metrics.snapshot()["counters"]["safety_prescreen.local_unsafe"] == 1
+
+
+def test_prescreen_escalates_ambiguous_profiles():
+    metrics.reset()
+    assert prescreen(LABEL, ADULT, MedicalData(allergies="none", conditions="stomach ulcers")) is None
+    assert prescreen(LABEL, ADULT, MedicalData(allergies="penicillin", conditions="none")) is None
+    assert metrics.snapshot()["counters"]["safety_prescreen.escalated"] == 2
+
+
+def test_prescreen_can_clear_unmatched_profiles():
+    with patch.object(settings, "SAFETY_PRESCREEN_CLEAR_UNMATCHED", True):
+        assert prescreen(LABEL, ADULT, MedicalData(allergies="penicillin", conditions="none")) == {"can_take": True, "warning": None}
+        assert prescreen(LABEL, ADULT, MedicalData(allergies="none", conditions="stomach ulcers")) is None
+
+
+def test_prescreen_escalates_children_and_older_adults():
+    metrics.reset()
+    empty = MedicalData(allergies="none", conditions="none")
+    assert prescreen(LABEL, PersonalProfile(age=12), empty) is None
+    assert prescreen(LABEL, PersonalProfile(age=70), empty) is None
+    assert prescreen(LABEL, None, empty) is None
+    assert prescreen(LABEL, PersonalProfile(age=65), empty) == {"can_take": True, "warning": None}
+    assert metrics.snapshot()["counters"]["safety_prescreen.escalated"] == 3
+
+
+def test_prescreen_escalates_age_restricted_labels():
+    empty = MedicalData(allergies="none", conditions="none")
+    for extra in (
+        {"boxed_warning": ["Serious cardiovascular events"]},
+        {"pediatric_use": ["Safety has not been established"]},
+        {"do_not_use": ["in children under 12 years of age"]},
+        {"warnings": ["Adults and children 12 years and over: ask a doctor"]},
+        {"ask_doctor": ["if you are over 60 years"]},
+    ):
+        assert prescreen({**LABEL, **extra}, ADULT, empty) is None, extra
+
+
+def test_prescreen_still_flags_allergies_for_any_age():
+    verdict = prescreen(LABEL, PersonalProfile(age=8), MedicalData(allergies="ibuprofen", conditions="none"))
+    assert verdict["can_take"] is False
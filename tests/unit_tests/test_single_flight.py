@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from app.services.single_flight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test_flight")
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "ibuprofen"
+
+    results = await asyncio.gather(*(flight.do("advil", fetch) for _ in range(5)))
+
+    assert results == ["ibuprofen"] * 5
+    assert calls == 1
+    assert flight.in_flight() == 0
+
+@pytest.mark.asyncio
+async def test_different_keys_run_separately():
+    flight = SingleFlight("test_flight")
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key
+
+    results = await asyncio.gather(
+        flight.do("a", lambda: fetch("a")),
+        flight.do("b", lambda: fetch("b")),
+    )
+
+    assert results == ["a", "b"]
+    assert sorted(calls) == ["a", "b"]
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_all_waiters():
+    flight = SingleFlight("test_flight")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("No valid drug name found in text")
+
+    results = await asyncio.gather(
+        *(flight.do("bad", fail) for _ in range(3)),
+        return_exceptions=True
+    )
+
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.in_flight() == 0
+
+@pytest.mark.asyncio
+async def test_settled_calls_are_not_cached():
+    flight = SingleFlight("test_flight")
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await flight.do("key", fetch) == 1
+    assert await flight.do("key", fetch) == 2
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight("test_flight")
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "ibuprofen"
+
+    leader = asyncio.create_task(flight.do("advil", fetch))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("advil", fetch))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await follower == "ibuprofen"
+    assert leader.cancelled()
+    assert calls == 1
+    assert flight.in_flight() == 0
+
+@pytest.mark.asyncio
+async def test_call_cancelled_when_every_caller_leaves():
+    flight = SingleFlight("test_flight")
+    cancelled = asyncio.Event()
+
+    async def fetch():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    callers = [asyncio.create_task(flight.do("advil", fetch)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert cancelled.is_set()
+    assert flight.in_flight() == 0
@@ -0,0 +1,72 @@
+import json
+import logging
+import pytest
+from unittest.mock import patch
+from app.config import settings
+from app.tracing import Trace, _current_trace, configure_logging, current_trace, span
+
+
+def test_span_is_noop_outside_a_trace():
+    assert current_trace() is None
+    with span("anything"):
+        pass
+
+
+def test_spans_are_recorded_and_summed_per_name():
+    trace = Trace()
+    token = _current_trace.set(trace)
+    try:
+        with span("db", job="load"):
+            pass
+        with span("db", job="save"):
+            pass
+        with span("gemini.extract_label"):
+            pass
+    finally:
+        _current_trace.reset(token)
+    trace.finish()
+
+    assert [s.name for s in trace.spans] == ["db", "db", "gemini.extract_label"]
+    entries = trace.server_timing().split(", ")
+    assert entries[0].startswith("total;dur=")
+    assert entries[1].startswith("db;dur=") and entries[1].endswith(';desc="x2"')
+    assert entries[2].startswith("gemini.extract_label;dur=")
+    assert trace.to_dict()["spans"][0]["job"] == "load"
+
+
+def test_server_timing_header_on_search(client, test_user, test_profile, mock_openfda_full_response):
+    with patch('app.services.gemini_service.GeminiService.extract_label') as mock_extract, \
+         patch('app.services.openfda_service.OpenFDAService.find_medicine_by_label_async') as mock_find:
+        mock_extract.return_value = "ibuprofen"
+        mock_find.return_value = mock_openfda_full_response["results"][0]
+
+        response = client.post(f"/api/v1/medicines/{test_user.id}/search/Advil")
+
+    assert response.status_code == 200
+    names = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    for name in ("total", "search.context", "db", "gemini.extract_label", "search.medicine_data",
+                 "search.safety", "serialize"):
+        assert name in names
+
+
+def test_trace_dump_logs_one_json_line_per_request(client, test_db, caplog):
+    # Default LOG_LEVEL: the trace logger must still emit at INFO on its own
+    try:
+        with patch.object(settings, "TRACE_DUMP", True), patch.object(settings, "LOG_LEVEL", "WARNING"):
+            configure_logging()
+            response = client.get("/api/v1/medicines/")
+    finally:
+        configure_logging()
+
+    assert response.status_code == 200
+    records = [json.loads(r.getMessage()) for r in caplog.records if r.name == "medipedia.trace"]
+    assert len(records) == 1
+    assert records[0]["path"] == "/api/v1/medicines/"
+    assert records[0]["status"] == 200
+    assert any(s["name"] == "db" for s in records[0]["spans"])
+
+
+def test_tracing_can_be_disabled(client, test_db):
+    with patch.object(settings, "TRACING_ENABLED", False):
+        response = client.get("/api/v1/medicines/")
+    assert "server-timing" not in response.headers
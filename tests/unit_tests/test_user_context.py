@@ -0,0 +1,37 @@
+from unittest.mock import patch
+import pytest
+from peewee import DoesNotExist
+from app.models.profile import MedicalData, PersonalProfile
+from app.models.user import User
+from app.services.user_context import load_user_context
+
+def test_loads_everything_in_one_query(test_db, test_profile):
+    with patch.object(test_db, "execute_sql", wraps=test_db.execute_sql) as execute:
+        user, profile, medical = load_user_context(test_profile.user_id)
+    assert execute.call_count == 1
+    assert user.email == "test@example.com"
+    assert profile.id == test_profile.id
+    assert medical.preferred_medication_type == "tablets"
+
+def test_user_without_profile(test_user):
+    user, profile, medical = load_user_context(test_user.id)
+    assert user.id == test_user.id
+    assert profile is None and medical is None
+
+def test_profile_without_medical_data(test_user):
+    PersonalProfile.create(user=test_user, first_name="A", last_name="B", age=40, gender="F")
+    user, profile, medical = load_user_context(test_user.id)
+    assert profile.first_name == "A"
+    assert medical is None
+
+def test_other_users_rows_are_ignored(test_profile):
+    other = User.create(email="other@example.com")
+    other_profile = PersonalProfile.create(user=other, first_name="O", last_name="P", age=50, gender="M")
+    MedicalData.create(profile=other_profile, allergies="penicillin")
+    _, profile, medical = load_user_context(test_profile.user_id)
+    assert profile.id == test_profile.id
+    assert medical.allergies == "none"
+
+def test_missing_user(test_db):
+    with pytest.raises(DoesNotExist):
+        load_user_context(12345)
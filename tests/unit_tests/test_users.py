@@ -95,4 +95,11 @@ def test_get_user_without_profile(client, test_db):
     data = response.json()
     assert data["email"] == "noprofile@example.com"
     assert data["profile"] is None
-    assert data["medical_data"] is None
\ No newline at end of file
+    assert data["medical_data"] is None
+
+def test_get_users_limit_bounds(client, test_user):
+    assert client.get("/api/v1/users/", params={"limit": 0}).status_code == 422
+    response = client.get("/api/v1/users/", params={"limit": 1})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert "X-Next-Cursor" not in response.headers